@@ -1,8 +1,13 @@
+import logging
 import warnings
 import openai
 from collections import deque
+from functools import partial
 from threading import Lock
 from global_managers.logger_manager import LoggerManager
+from utils.cancellation import close_connection
+
+logger = LoggerManager().get_logger(__name__)
 
 class LLMAdapter:
     """
@@ -42,6 +47,7 @@ class LLMAdapter:
         self.model_name = None
         self.model_params = {}
         self.lock = Lock()  # 用于线程安全的API Key轮询
+        self._current_response = None  # 正在进行的流式响应，打断时关闭
 
     def set_api_config(self, api_keys, api_base, test_connection=False):
         """
@@ -76,7 +82,7 @@ class LLMAdapter:
                     test_adapter.models.list()
                     valid_keys.append(key)
                 except Exception as e:
-                    LoggerManager().get_logger().warning(f"API Key {key[:8]}... 测试失败(llm_adapter.set_api_config): {e}")
+                    logger.warning(f"API Key {key[:8]}... 测试失败(llm_adapter.set_api_config): {e}")
             
             #去除apikeys筛选逻辑
             # if not valid_keys:
@@ -101,7 +107,7 @@ class LLMAdapter:
             models = self.adapter.models.list()
             if not models:
                 raise RuntimeError("无法获取模型列表，API 连接可能存在问题。")
-            LoggerManager().get_logger().debug("API 连接测试成功，成功获取模型列表...")
+            logger.debug("API 连接测试成功，成功获取模型列表...")
         except Exception as e:
             self.adapter = None
             raise RuntimeError(f"API 连接测试失败(test_connection): {e}")
@@ -110,7 +116,7 @@ class LLMAdapter:
         if not model_name:
             raise ValueError("模型名称不能为空。")
         self.model_name = model_name
-        LoggerManager().get_logger().debug(f"模型名称设置为: {model_name}")
+        logger.debug(f"模型名称设置为: {model_name}")
 
     def get_model_name(self):
         return self.model_name
@@ -119,7 +125,7 @@ class LLMAdapter:
         if not isinstance(params, dict):
             raise ValueError("模型参数必须是字典类型。")
         self.model_params = params
-        LoggerManager().get_logger().debug(f"模型参数设置为: {params}")
+        logger.debug(f"模型参数设置为: {params}")
         if 'stream' not in self.model_params:
             self.model_params['stream'] = True  # 默认启用
     
@@ -131,19 +137,22 @@ class LLMAdapter:
             bool: 如果成功执行API级打断则返回True，否则返回False
         """
         try:
-            if hasattr(self, '_current_response') and self._current_response:
-                if hasattr(self._current_response, 'abort'):
-                    self._current_response.abort()
-                    LoggerManager().get_logger().debug("LLM API 级打断成功")
-                    return True
-                else:
-                    LoggerManager().get_logger().debug("当前 LLM API 不支持打断操作")
+            response = self._current_response
+            if response is not None:
+                # 关闭HTTP连接，服务端停止生成，不再继续下载
+                close_connection(response)
+                logger.debug("LLM API 级打断成功")
+                return True
         except Exception as e:
-            LoggerManager().get_logger().warning(f"LLM API 级打断失败: {e}")
+            logger.warning(f"LLM API 级打断失败: {e}")
         return False
     
     #def communicate(self, messages, model_name=None, stream=False, model_params_override=None): #stream参数现已整合进params
-    def communicate(self, messages, model_name=None, model_params_override=None):
+    def communicate(self, messages, model_name=None, model_params_override=None, cancel_token=None):
+        """
+        发送消息
+        @param cancel_token: 取消令牌，取消时关闭流式响应的连接
+        """
         if not self.adapter:
             raise RuntimeError("LLMAdapter 未连接到 API，请先配置 API 连接。")
 
@@ -159,14 +168,12 @@ class LLMAdapter:
             base_url=self.api_base
         )
         stream = params.get('stream', False)
-        LoggerManager().get_logger().debug(f"--- LLM Request Parameters ---")
-        LoggerManager().get_logger().debug(f"Bae URL: {self.api_base}")
-        LoggerManager().get_logger().debug(f"API Key: {api_key}")
-        LoggerManager().get_logger().debug(f"Model Name: {final_model_name}")
-        LoggerManager().get_logger().debug(f"Model Params: {params}")
-        #LoggerManager().get_logger().debug(f"Stream: {stream}") #stream参数现已整合进params
-        LoggerManager().get_logger().debug(f"Messages: {messages}")
-        LoggerManager().get_logger().debug("-------------------------------")
+        # 完整消息列表可能很长，只在开启调试日志时格式化
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("--- LLM Request Parameters ---\n"
+                         "Base URL: %s\nAPI Key: %s...\nModel Name: %s\nModel Params: %s\nMessages: %s\n"
+                         "-------------------------------",
+                         self.api_base, (api_key or "")[:8], final_model_name, params, messages)
 
         try:
             response = self.adapter.chat.completions.create(
@@ -176,10 +183,28 @@ class LLMAdapter:
                 **params
             )
             if stream:
+                self._current_response = response
+                close = partial(close_connection, response)
+                if cancel_token is not None:
+                    cancel_token.add_callback(close)
+
                 def chunk_generator():
-                    for chunk in response:
-                        chunk_content = chunk.choices[0].delta.content or ""
-                        yield chunk_content
+                    try:
+                        for chunk in response:
+                            if cancel_token is not None and cancel_token.is_cancelled:
+                                break
+                            chunk_content = chunk.choices[0].delta.content or ""
+                            yield chunk_content
+                    except Exception:
+                        # 打断时连接被关闭，读取会出错
+                        if cancel_token is None or not cancel_token.is_cancelled:
+                            raise
+                    finally:
+                        response.close()
+                        if cancel_token is not None:
+                            cancel_token.remove_callback(close)
+                        if self._current_response is response:
+                            self._current_response = None
                 return chunk_generator()
             else:
                 return response.choices[0].message.content
@@ -61,7 +61,7 @@ class LLMService:
         self.adapter.stop_generating()
     
     def send_message(self, messages: List[Dict], model_name: str = None, 
-                    model_params: Dict = None) -> Iterator[str]:
+                    model_params: Dict = None, cancel_token=None) -> Iterator[str]:
         """
         发送消息到LLM并返回响应迭代器
         
@@ -69,6 +69,7 @@ class LLMService:
             messages: 消息列表
             model_name: 可选的模型名称
             model_params: 可选的模型参数
+            cancel_token: 可选的取消令牌，取消时关闭连接并结束迭代器
 
         Returns:
             Iterator[str]: 响应迭代器
@@ -77,7 +78,8 @@ class LLMService:
             llm_adapter=self.adapter,
             messages=messages,
             model_name=model_name,
-            model_params=model_params
+            model_params=model_params,
+            cancel_token=cancel_token
         )
         worker.start()
         #worker.join()  # 等待响应完成（此操作会导致阻塞）
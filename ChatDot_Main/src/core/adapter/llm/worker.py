@@ -1,38 +1,59 @@
 import threading
 import queue
+import time
 from typing import List, Dict, Optional, Iterator
 from global_managers.logger_manager import LoggerManager
+from global_managers.trace_manager import TraceManager
+from global_managers.metrics_manager import MetricsManager
+from utils.cancellation import CancellationToken
 
 class LLMWorker(threading.Thread):
     """LLM工作线程，使用队列实现实时数据流"""
     
     def __init__(self, llm_adapter, messages: List[Dict], model_name: str = None, 
-                 model_params: Optional[Dict] = None):
-        super().__init__()
+                 model_params: Optional[Dict] = None, cancel_token: Optional[CancellationToken] = None):
+        super().__init__(daemon=True)
         self.llm_adapter = llm_adapter
         self.messages = messages
         self.model_name = model_name
         self.model_params = model_params or {}
-        self._is_running = True
+        self.cancel_token = cancel_token or CancellationToken()
         # 使用队列进行线程间通信
         self.response_queue = queue.Queue()
         self.done = False  # 标记响应是否完成
+        self.trace_id = TraceManager().current_trace_id()  # 工作线程中记录到发起请求的那一轮
+        # 取消时立即结束响应迭代器，不等待工作线程从网络读取中返回
+        self.cancel_token.add_callback(lambda: self.response_queue.put(None))
 
     def run(self) -> None:
         """执行LLM通信，将响应放入队列"""
+        trace = TraceManager()
+        metrics = MetricsManager()
+        metrics.counter("llm_requests_total", "LLM请求次数").inc()
+        start_time = time.monotonic()
+        first_token_time = None
+        chunk_count = 0
         try:
-            response = self.llm_adapter.communicate(
-                messages=self.messages,
-                model_name=self.model_name,
-                model_params_override=self.model_params
-            )
+            with trace.span("llm.request", trace_id=self.trace_id, model=self.model_name):
+                response = self.llm_adapter.communicate(
+                    messages=self.messages,
+                    model_name=self.model_name,
+                    model_params_override=self.model_params,
+                    cancel_token=self.cancel_token
+                )
             
             # 处理响应
             if isinstance(response, Iterator):
                 for chunk in response:
-                    if not self._is_running:
+                    if self.cancel_token.is_cancelled:
                         break
                     if chunk:
+                        if not chunk_count:
+                            first_token_time = time.monotonic()
+                            trace.record("llm.first_token", start_time, first_token_time, trace_id=self.trace_id)
+                            metrics.histogram("llm_first_token_ms", "LLM请求到首个文本块的耗时(毫秒)").observe(
+                                (first_token_time - start_time) * 1000)
+                        chunk_count += 1
                         # 将每个片段放入队列
                         self.response_queue.put(chunk)
             else:
@@ -40,9 +61,19 @@ class LLMWorker(threading.Thread):
                 self.response_queue.put(response)
                 
         except Exception as e:
-            # 异常情况，发送错误消息
-            self.response_queue.put(f"Error: {str(e)}")
+            # 异常情况，发送错误消息（被取消时不再发送）
+            if not self.cancel_token.is_cancelled:
+                metrics.counter("llm_errors_total", "LLM请求失败次数").inc()
+                self.response_queue.put(f"Error: {str(e)}")
         finally:
+            end_time = time.monotonic()
+            trace.record("llm.stream", start_time, end_time, trace_id=self.trace_id,
+                         chunks=chunk_count, cancelled=self.cancel_token.is_cancelled)
+            metrics.counter("llm_chunks_total", "LLM流式返回的文本块数").inc(chunk_count)
+            # 流式接口每个文本块通常对应一个token，以首个文本块之后的块数估算生成速度
+            if first_token_time is not None and chunk_count > 1 and end_time > first_token_time:
+                metrics.histogram("llm_tokens_per_second", "LLM生成速度(文本块/秒)").observe(
+                    (chunk_count - 1) / (end_time - first_token_time))
             # 标记响应完成
             self.done = True
             # 添加结束标记
@@ -50,7 +81,7 @@ class LLMWorker(threading.Thread):
 
     def stop(self) -> None:
         """停止工作线程"""
-        self._is_running = False
+        self.cancel_token.cancel("worker.stop")
 
     def get_response(self) -> Iterator[str]:
         """
@@ -63,7 +94,7 @@ class LLMWorker(threading.Thread):
             chunk = self.response_queue.get()
             
             # None 是结束标记
-            if chunk is None:
+            if chunk is None or self.cancel_token.is_cancelled:
                 break
                 
             yield chunk
\ No newline at end of file
@@ -5,6 +5,8 @@ from chat.context_handle.service import ContextHandleService
 from adapter.llm.service import LLMService
 from live2d.service import Live2DService
 from global_managers.logger_manager import LoggerManager
+from global_managers.metrics_manager import MetricsManager
+from global_managers.persistence_manager import PersistenceManager
 from tts.service import TTSService
 from stt.service import STTService
 from rag.rag_service import RAGService
@@ -75,14 +77,22 @@ class Bootstrap:
         # 初始化服务
         for service_name, _ in self._service_registry:
             self.service_manager.initialize_service(service_name)
+        
+        # 启动指标端点与定期快照
+        MetricsManager().start()
             
         self._services_initialized = True
 
     def shutdown(self):
         """关闭所有服务"""
+        MetricsManager().stop()
+        
         # 按注册的相反顺序关闭服务
         for service_name, _ in reversed(self._service_registry):
             self.service_manager.shutdown_service(service_name)
         
+        # 写出延迟保存的设置与聊天记录
+        PersistenceManager().flush()
+        
         # 重置初始化状态，允许重新初始化
         self._services_initialized = False
\ No newline at end of file
@@ -1,8 +1,14 @@
+import logging
 from typing import Callable, Iterator, List, Dict, Optional, Tuple
 #from chat.context_handle.manager import ContextHandleManager
 from global_managers.service_manager import ServiceManager
 from global_managers.logger_manager import LoggerManager
+from global_managers.trace_manager import TraceManager
 from chat.persistence import ChatPersistence
+from chat.prefetch import RAGPrefetcher
+from utils.cancellation import CancellationToken
+
+logger = LoggerManager().get_logger(__name__)
 
 class ChatAdapter:
     def __init__(self, llm_service=None, service_manager=None, chat_persistence=None):
@@ -21,20 +27,56 @@ class ChatAdapter:
         self.rag_service = self.service_manager.get_service("rag_service")
         self.chat_persistence = chat_persistence or ChatPersistence()
         self._is_Stop_generating = False  # 停止生成标志
+        self._cancel_token = CancellationToken()  # 本轮回复的取消令牌，LLM、TTS、Live2D共用
+        self._is_responding = False  # LLM是否正在生成回复
         self.messages: List[Dict] = []
+        self.rag_prefetcher: Optional[RAGPrefetcher] = None  # 语音输入时的RAG推测预取
 
     def initialize(self):
         """初始化客户端"""
         if self.llm_service:
             self.llm_service.initialize()
             
-    def stop_generating(self):
-        """停止生成"""
+    def enable_rag_prefetch(self, **kwargs):
+        """
+        启用RAG推测预取
+        
+        Args:
+            **kwargs: RAGPrefetcher参数
+        """
+        if self.rag_prefetcher is None and self.rag_service:
+            self.rag_prefetcher = RAGPrefetcher(self.rag_service, **kwargs)
+
+    def prefetch_partial(self, text: str):
+        """
+        收到语音识别中间结果时调用，提前检索RAG上下文
+        
+        Args:
+            text: 当前语句累计的中间识别文本
+        """
+        if self.rag_prefetcher and self.rag_service and self.rag_service.is_enabled():
+            self.rag_prefetcher.on_partial(text, self.messages)
+
+    def is_busy(self) -> bool:
+        """是否正在生成回复或播放语音"""
+        if self._is_responding:
+            return True
+        return bool(self.tts_service and self.tts_service.is_tts_enabled() and self.tts_service.is_playing())
+
+    def stop_generating(self, reason: str = "stop"):
+        """
+        停止生成，同时打断本轮回复的语音播放和Live2D分发
+        
+        Args:
+            reason: 停止原因，用于日志
+        """
         self._is_Stop_generating = True
+        # 关闭LLM与TTS连接、清空播放缓冲区、丢弃Live2D待发送文本
+        self._cancel_token.cancel(reason)
         try:
             self.llm_service.stop_generating()
         except Exception as e:
-            LoggerManager().get_logger().warning(f"chat.adapter: llm_service级停止生成失败: {e}")
+            logger.warning(f"chat.adapter: llm_service级停止生成失败: {e}")
 
     def send_message(self, message: str, is_stream: bool = True) -> Tuple[List[Dict], Iterator[str]]:
         """
@@ -49,59 +91,79 @@ class ChatAdapter:
         """
         ### 初始化标志
         self._is_Stop_generating = False  # 重置停止生成标志
-        #region 消息前处理
-        ################################
-        # 消息前处理
-        #
-        # 添加用户消息到历史
-        self.add_response("user", message)
+        cancel_token = self._new_cancel_token()
+        trace = TraceManager()
+        trace_id, trace_token = trace.start_trace("chat.turn", chars=len(message))
+        try:
+            #region 消息前处理
+            ################################
+            # 消息前处理
+            #
+            # 添加用户消息到历史
+            self.add_response("user", message)
         
-        local_messages = self.messages
-        llm_messages = self.messages
+            local_messages = self.messages
+            llm_messages = self.messages
         
-        #region RAG处理
-        if self.rag_service and self.rag_service.is_enabled():
-            try:
-                #按最近的10条消息进行上下文检索
-                rag_context = self.rag_service.retrieve(
-                    query=local_messages[-10:],
-                    n_results=3,
-                )
-                #将检索到的上下文添加到消息列表中
-                llm_messages.insert(-10,
-                                    {"role": "system",
-                                     "content":
-                                        f"""
+            #region RAG处理
+            if self.rag_service and self.rag_service.is_enabled():
+                try:
+                    with trace.span("rag.retrieve") as span_attrs:
+                        #优先使用语音输入时预取的上下文
+                        rag_context = None
+                        if self.rag_prefetcher:
+                            rag_context = self.rag_prefetcher.take(message, local_messages[:-1])
+                        span_attrs["prefetch_hit"] = rag_context is not None
+                        #按最近的10条消息进行上下文检索
+                        if rag_context is None:
+                            rag_context = self.rag_service.retrieve(
+                                query=local_messages[-10:],
+                                n_results=3,
+                            )
+                    #将检索到的上下文添加到消息列表中
+                    llm_messages.insert(-10,
+                                        {"role": "system",
+                                         "content":
+                                            f"""
 [Memory Context]                                        
 按以下10条消息搜索的记忆中的相关上下文:
 {rag_context}
 [/Memory Context]
                                         """
-                                    })
-            except Exception as e:
-                LoggerManager().get_logger().error(f"RAG上下文检索失败: {e}")
-        #endregion
+                                        })
+                except Exception as e:
+                    logger.error(f"RAG上下文检索失败: {e}")
+            #endregion
         
         
-        # 使用上下文处理器处理消息
-        handler = self.context_handle_service.get_current_handler()
-        local_messages, llm_messages = (handler.process_before_send(llm_messages) 
-                                      if handler else (self.messages, self.messages))
+            # 使用上下文处理器处理消息
+            handler = self.context_handle_service.get_current_handler()
+            with trace.span("context.process_before_send"):
+                local_messages, llm_messages = (handler.process_before_send(llm_messages) 
+                                              if handler else (self.messages, self.messages))
         
-        if not self.llm_service:
-            raise RuntimeError("LLM服务未初始化")
-        #endregion 消息前处理
+            if not self.llm_service:
+                raise RuntimeError("LLM服务未初始化")
+            #endregion 消息前处理
         
-        #region 发送消息
-        ##############################
-        # 发送消息
-        #
-        # 发送消息并获取响应迭代器
-        response_iterator = self.llm_service.send_message(
-            messages=llm_messages,
-            model_params={"stream": is_stream}
-        )
-        #endregion 发送消息
+            #region 发送消息
+            ##############################
+            # 发送消息
+            #
+            # 发送消息并获取响应迭代器
+            response_iterator = self.llm_service.send_message(
+                messages=llm_messages,
+                model_params={"stream": is_stream},
+                cancel_token=cancel_token
+            )
+            #endregion 发送消息
+        except Exception as e:
+            # 没有创建响应迭代器时本轮trace不会在迭代结束时关闭，在这里结束
+            trace.end_trace(trace_id, error=str(e))
+            raise
+        finally:
+            # 之后在生成器中通过 activate 恢复本轮trace，调用方线程不保留
+            trace.reset(trace_token)
 
         #region 接收消息及后处理(阻塞)
         ##############################
@@ -110,28 +172,43 @@ class ChatAdapter:
         # 创建实时响应迭代器
         ttsenabled = self.tts_service and self.tts_service.is_tts_enabled()
         if ttsenabled:
-            LoggerManager().get_logger().info("TTS服务已启用...")
+            logger.info("TTS服务已启用...")
             
         def realtime_response():
+            # 迭代可能发生在其他线程，在生成器内恢复本轮的trace
+            with trace.activate(trace_id):
+                try:
+                    yield from _realtime_response()
+                finally:
+                    trace.end_trace(trace_id, interrupted=cancel_token.is_cancelled)
+
+        def _realtime_response():
             full_response = []
+            self._is_responding = True
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)  # 逐token的调试日志只在开启时格式化
             try:
                 for chunk in response_iterator:
+                    if not full_response:
+                        trace.event("chat.first_chunk")
                     full_response.append(chunk)  # 收集完整响应
                     # 检查是否需要停止生成
-                    if self._is_Stop_generating:#实时打断
+                    if self._is_Stop_generating or cancel_token.is_cancelled:#实时打断
                         break
                     
                     #tts
                     if ttsenabled:
-                        LoggerManager().get_logger().debug(f"实时播放文本到语音: realtime_play_text_to_speech({chunk})")
+                        if debug_enabled:
+                            logger.debug("实时播放文本到语音: realtime_play_text_to_speech(%s)", chunk)
                         self.tts_service.realtime_play_text_to_speech(chunk)
                     #live2d
                     if self.live2d_service and self.live2d_service.is_live2d_enabled():
-                        LoggerManager().get_logger().debug(f"实时播放文本到Live2D: realtime_text_to_live2d({chunk})")
+                        if debug_enabled:
+                            logger.debug("实时播放文本到Live2D: realtime_text_to_live2d(%s)", chunk)
                         self.live2d_service.realtime_text_to_live2d(chunk)
                         
                     yield chunk# 实时返回每个片段
             finally:
+                self._is_responding = False
                 # 在迭代完成或发生异常时添加到历史
                 if full_response:
                     #添加到历史前经过处理器处理
@@ -149,17 +226,17 @@ class ChatAdapter:
                                 str(local_messages[-2:])
                             )
                         except Exception as e:
-                            LoggerManager().get_logger().error(f"RAG上下文添加失败: {e}")
-                    #调用live2d服务
-                    if self.live2d_service and self.live2d_service.is_live2d_enabled():
-                        LoggerManager().get_logger().debug("调用 Live2D 服务...")
+                            logger.error(f"RAG上下文添加失败: {e}")
+                    #调用live2d服务（被打断时已由取消回调结束本轮）
+                    if self.live2d_service and self.live2d_service.is_live2d_enabled() and not cancel_token.is_cancelled:
+                        logger.debug("调用 Live2D 服务...")
                         self.live2d_service.realtime_text_to_live2d(force_process=True)
                     #调用tts服务
-                    if ttsenabled:
+                    if ttsenabled and not cancel_token.is_cancelled:
                         self.tts_service.realtime_play_text_to_speech(force_process=True)  # 处理剩余缓冲区
-                        LoggerManager().get_logger().debug("TTS流处理完成...")
+                        logger.debug("TTS流处理完成...")
                     #if self.tts_service and self.tts_service.is_tts_enabled():
-                        #LoggerManager().get_logger().debug("调用 TTS 服务...")
+                        #logger.debug("调用 TTS 服务...")
                         #self.tts_service.text_to_speech(processed_response)#调用此不会播放音频
                         # 直接播放音频
                         #self.tts_service.play_text_to_speech(processed_response)
@@ -173,6 +250,19 @@ class ChatAdapter:
 
         return local_messages, realtime_response()
 
+    def _new_cancel_token(self) -> CancellationToken:
+        """
+        创建本轮回复的取消令牌，取消时打断语音播放和Live2D分发
+        回复生成完后语音可能仍在播放，令牌一直有效到下一轮开始
+        """
+        cancel_token = CancellationToken()
+        if self.tts_service and self.tts_service.is_tts_enabled():
+            cancel_token.add_callback(self.tts_service.stop_playing)
+        if self.live2d_service and self.live2d_service.is_live2d_enabled():
+            cancel_token.add_callback(self.live2d_service.cancel)
+        self._cancel_token = cancel_token
+        return cancel_token
+
     def add_response(self, role: str, response: str):
         """添加消息到消息列表"""
         self.messages.append({"role": role, "content": response})
@@ -193,7 +283,7 @@ class ChatAdapter:
                     str(deleted_message),0.98
                 )
             except Exception as e:
-                LoggerManager().get_logger().error(f"RAG上下文删除失败: {e}")
+                logger.error(f"RAG上下文删除失败: {e}")
         
 
     def edit_message(self, index: int, new_content: str):
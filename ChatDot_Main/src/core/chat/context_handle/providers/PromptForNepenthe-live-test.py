@@ -346,7 +346,7 @@ class ContextHandler(BaseContextHandler):
                 desc = msg.get("msg", "")
                 self.game_description = desc
                 logger.debug(f"收到Game.Description: {desc}")
-            self.process_communicator.add_handler("Game.Description", game_desc_handler)
+            self.process_communicator.add_handler("Game.Description", game_desc_handler, use_executor=True)
             logger.debug("注册Game.Description处理器成功")
             # 注册Game.Choice
             def game_choice_handler(msg, topic):
@@ -0,0 +1,309 @@
+"""
+全双工语音对话
+STT识别、LLM流式生成、TTS合成与播放连续运行，麦克风在回复播放期间保持打开：
+- 用户说完一句（最终识别结果）后等待 end_of_turn_ms，期间没有继续说话才作为一轮输入提交
+- 回复生成或播放期间用户开始说话即打断（barge-in），自己播放的声音由STT的回声抑制排除
+- 每轮记录语音结束到回复出声的端到端延迟（mouth-to-ear）及各阶段耗时
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from global_managers.logger_manager import LoggerManager
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return f"{value}ms" if value is not None else "-"
+
+
+class DuplexConversation:
+    """
+    全双工语音对话引擎
+
+    STT回调在识别会话的事件循环中执行，只记录状态并唤醒后台线程；
+    每轮对话在后台线程中依次执行，回复文本通过 chat_service 驱动TTS与Live2D
+    """
+
+    def __init__(self, chat_service, stt_service, tts_service=None, end_of_turn_ms: int = 500,
+                 speech_timeout: float = 5.0, output_timeout: float = 10.0, history: int = 50):
+        """
+        Args:
+            chat_service: 聊天服务实例
+            stt_service: STT服务实例
+            tts_service: TTS服务实例，未启用TTS时为None（只统计到首个回复文本）
+            end_of_turn_ms: 最终识别结果之后等待用户继续说话的时间(毫秒)
+            speech_timeout: 用户继续说话但迟迟没有新结果时，最多等待多久(秒)后提交已识别的语句
+            output_timeout: 等待回复出声的最长时间(秒)
+            history: 保留最近多少轮的延迟记录
+        """
+        self.chat_service = chat_service
+        self.stt_service = stt_service
+        self.tts_service = tts_service
+        self.end_of_turn_ms = end_of_turn_ms
+        self.speech_timeout = speech_timeout
+        self.output_timeout = output_timeout
+        self.logger = LoggerManager().get_logger()
+
+        self.user_text_callbacks: List[Callable[[str], None]] = []
+        self.response_callbacks: List[Callable[[str], None]] = []
+        self.turn_callbacks: List[Callable[[Dict[str, Any]], None]] = []
+
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._pending: List[str] = []     # 已识别、尚未提交的语句
+        self._final_at = 0.0              # 最近一个最终识别结果到达的时间
+        self._user_speaking = False       # 用户正在说话（开始说话后尚未收到最终结果）
+        self._activity_at = 0.0           # 最近一次开始说话/中间结果的时间
+        self._turn_active = False         # 正在生成或等待回复出声
+        self._interrupted = False         # 当前这一轮被用户打断
+        self._turns: deque = deque(maxlen=history)
+        self.stats = {"turns": 0, "interrupted": 0, "merged_segments": 0}
+
+    #region 生命周期
+    def start(self) -> bool:
+        """
+        开始全双工对话：注册STT回调、启动识别与后台线程
+
+        Returns:
+            bool: 是否成功启动
+        """
+        if self._running:
+            return True
+        # 外部可能清空过segment_callbacks（文本界面的语音输入），每次启动时检查
+        if self._on_segment not in self.stt_service.segment_callbacks:
+            self.stt_service.add_segment_callback(self._on_segment)
+        if self._on_partial not in self.stt_service.partial_callbacks:
+            self.stt_service.add_partial_callback(self._on_partial)
+        if self._on_speech_start not in self.stt_service.speech_start_callbacks:
+            self.stt_service.add_speech_start_callback(self._on_speech_start)
+
+        self._running = True
+        if not self.stt_service.start_recognition():
+            self._running = False
+            self.logger.error("全双工对话: 启动语音识别失败")
+            return False
+        self._thread = threading.Thread(target=self._run, name="DuplexConversation", daemon=True)
+        self._thread.start()
+        self.logger.info("全双工对话已开始")
+        return True
+
+    def stop(self) -> None:
+        """结束全双工对话：暂停识别、打断当前回复"""
+        if not self._running:
+            return
+        with self._cond:
+            self._running = False
+            self._pending.clear()
+            self._cond.notify_all()
+        self.stt_service.pause_recognition()
+        self.chat_service.interrupt("duplex stop")
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self.logger.info("全双工对话已结束")
+
+    def is_running(self) -> bool:
+        """是否正在进行全双工对话"""
+        return self._running
+    #endregion
+
+    #region 回调注册
+    def add_user_text_callback(self, callback: Callable[[str], None]) -> None:
+        """
+        添加用户输入回调，每轮提交时调用
+
+        Args:
+            callback: 回调函数，接收本轮合并后的识别文本
+        """
+        self.user_text_callbacks.append(callback)
+
+    def add_response_callback(self, callback: Callable[[str], None]) -> None:
+        """
+        添加回复文本回调
+
+        Args:
+            callback: 回调函数，接收LLM回复的文本块
+        """
+        self.response_callbacks.append(callback)
+
+    def add_turn_callback(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        添加每轮结束回调
+
+        Args:
+            callback: 回调函数，接收本轮的延迟记录，见 _run_turn
+        """
+        self.turn_callbacks.append(callback)
+
+    def _notify(self, callbacks: list, value) -> None:
+        for callback in callbacks:
+            try:
+                callback(value)
+            except Exception as e:
+                self.logger.error(f"全双工对话回调执行错误: {e}")
+    #endregion
+
+    #region STT回调（识别会话的事件循环中执行，不能阻塞）
+    def _on_speech_start(self) -> None:
+        if not self._running:
+            return
+        with self._cond:
+            self._user_speaking = True
+            self._activity_at = time.monotonic()
+            if self._turn_active:
+                self._interrupted = True
+        # 聊天服务空闲时不做任何事
+        self.chat_service.interrupt("barge-in")
+
+    def _on_partial(self, text: str) -> None:
+        if not self._running:
+            return
+        with self._cond:
+            # 收到最终结果后又有新的中间结果，说明用户还在继续说
+            self._user_speaking = True
+            self._activity_at = time.monotonic()
+
+    def _on_segment(self, text: str) -> None:
+        if not self._running or not text.strip():
+            return
+        with self._cond:
+            if self._pending:
+                self.stats["merged_segments"] += 1
+            self._pending.append(text)
+            self._final_at = time.monotonic()
+            self._user_speaking = False
+            self._cond.notify_all()
+    #endregion
+
+    #region 轮次处理
+    def _next_turn(self) -> Optional[str]:
+        """
+        等待用户说完一轮
+
+        Returns:
+            Optional[str]: 本轮文本，停止时返回None
+        """
+        with self._cond:
+            while self._running:
+                if self._user_speaking and time.monotonic() - self._activity_at > self.speech_timeout:
+                    self._user_speaking = False
+                if self._pending and self._user_speaking:
+                    self._cond.wait(self.speech_timeout)
+                elif self._pending:
+                    remaining = self._final_at + self.end_of_turn_ms / 1000 - time.monotonic()
+                    if remaining <= 0:
+                        text = "".join(self._pending)
+                        self._pending.clear()
+                        self._turn_active = True
+                        self._interrupted = False
+                        return text
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+        return None
+
+    def _run(self) -> None:
+        while self._running:
+            text = self._next_turn()
+            if text is None:
+                return
+            try:
+                self._run_turn(text)
+            except Exception as e:
+                self.logger.error(f"全双工对话处理失败: {e}")
+            finally:
+                with self._cond:
+                    self._turn_active = False
+
+    def _run_turn(self, text: str) -> None:
+        """
+        执行一轮对话并记录延迟
+
+        记录中的时间均相对用户语音结束（最后一个语音帧）：
+        - final_ms: 最终识别结果到达
+        - commit_ms: 轮次提交（等待用户是否继续说话之后）
+        - first_token_ms: LLM首个文本块
+        - mouth_to_ear_ms: 回复开始出声，未出声时为None
+        """
+        final_at = self._final_at
+        speech_end = self.stt_service.get_last_voice_time() or final_at
+        speech_end = min(speech_end, final_at)
+        commit_at = time.monotonic()
+        self._notify(self.user_text_callbacks, text)
+        # 上一轮的语音仍在播放时先停止
+        self.chat_service.interrupt("new turn")
+
+        first_token_at = None
+        for chunk in self.chat_service.send_message(text, is_stream=True):
+            if first_token_at is None:
+                first_token_at = time.monotonic()
+            self._notify(self.response_callbacks, chunk)
+            if not self._running:
+                break
+
+        output_at = None
+        if self.tts_service and self.tts_service.is_tts_enabled() and not self._interrupted:
+            output_at = self._wait_output(commit_at)
+
+        def since_speech_end(t):
+            return round((t - speech_end) * 1000, 1) if t is not None else None
+
+        turn = {
+            "text": text,
+            "final_ms": since_speech_end(final_at),
+            "commit_ms": since_speech_end(commit_at),
+            "first_token_ms": since_speech_end(first_token_at),
+            "mouth_to_ear_ms": since_speech_end(output_at),
+            "interrupted": self._interrupted,
+        }
+        self._turns.append(turn)
+        self.stats["turns"] += 1
+        self.stats["interrupted"] += int(self._interrupted)
+        self.logger.info(f"全双工对话轮次: 识别 {_format_ms(turn['final_ms'])}, 提交 {_format_ms(turn['commit_ms'])}, "
+                         f"首字 {_format_ms(turn['first_token_ms'])}, 出声 {_format_ms(turn['mouth_to_ear_ms'])}"
+                         f"{'（被打断）' if self._interrupted else ''}")
+        self._notify(self.turn_callbacks, turn)
+
+    def _wait_output(self, since: float) -> Optional[float]:
+        """
+        等待回复开始出声；用户开始下一轮或打断时不再等待
+
+        Returns:
+            Optional[float]: 出声时间(time.monotonic)，未出声时为None
+        """
+        deadline = since + self.output_timeout
+        while self._running and not self._interrupted and not self._pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            output_at = self.tts_service.wait_output_start(since, min(remaining, 0.05))
+            if output_at is not None:
+                return output_at
+        return None
+    #endregion
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取全双工对话统计信息
+
+        Returns:
+            dict: 轮数、被打断轮数、合并的语句数、最近一轮记录，
+                  以及 mouth-to-ear 延迟的平均值/p50/p95(毫秒)
+        """
+        stats = dict(self.stats)
+        turns = list(self._turns)
+        stats["last_turn"] = turns[-1] if turns else None
+        latencies = [t["mouth_to_ear_ms"] for t in turns if t["mouth_to_ear_ms"] is not None]
+        if latencies:
+            stats["mouth_to_ear_avg_ms"] = round(sum(latencies) / len(latencies), 1)
+            stats["mouth_to_ear_p50_ms"] = _percentile(latencies, 50)
+            stats["mouth_to_ear_p95_ms"] = _percentile(latencies, 95)
+        return stats
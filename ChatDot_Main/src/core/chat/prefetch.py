@@ -0,0 +1,209 @@
+"""
+语音输入时的RAG推测预取
+利用STT的2pass-online中间结果，在用户说完之前提前检索记忆上下文，
+最终识别结果到达时若与预取的文本一致，send_message可直接使用缓存结果跳过检索
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from global_managers.logger_manager import LoggerManager
+
+_NORMALIZE_PATTERN = re.compile(r"[\W_]+")
+
+
+def _normalize(text: str) -> str:
+    """去除标点和空白，在线结果与离线结果的标点、空格常常不同"""
+    return _NORMALIZE_PATTERN.sub("", text).lower()
+
+
+def _history_key(history: List[Dict]) -> tuple:
+    """对话历史的标识，历史变化后旧的预取结果不再可用"""
+    if not history:
+        return (0, None)
+    last = history[-1]
+    return (len(history), last.get("role"), last.get("content"))
+
+
+class _PrefetchEntry:
+    """一次预取"""
+
+    def __init__(self, key: str, history_key: tuple, future: Future):
+        self.key = key
+        self.history_key = history_key
+        self.future = future
+        self.duration = 0.0  # 检索耗时(秒)，完成后填写
+
+
+class RAGPrefetcher:
+    """
+    RAG推测预取器
+
+    - on_partial: 中间识别结果在 stable_ms 内没有变化时，按"历史消息 + 当前中间结果"在后台检索
+    - take: 最终识别结果到达时查找可用的预取结果；
+      去除标点后最终文本以预取文本开头、且预取文本覆盖最终文本的比例不低于 min_coverage 即视为命中
+    - 未被使用的预取计为浪费，统计见 get_stats
+    """
+
+    def __init__(self, rag_service, stable_ms: int = 300, min_chars: int = 4,
+                 min_coverage: float = 0.8, max_entries: int = 4, n_results: int = 3):
+        """
+        Args:
+            rag_service: RAG服务实例
+            stable_ms: 中间结果保持不变多久后触发预取(毫秒)
+            min_chars: 触发预取的最少字数
+            min_coverage: 预取文本至少覆盖最终文本的比例
+            max_entries: 最多保留的预取结果数
+            n_results: 检索结果数量，与send_message保持一致
+        """
+        self.rag_service = rag_service
+        self.stable_ms = stable_ms
+        self.min_chars = min_chars
+        self.min_coverage = min_coverage
+        self.max_entries = max_entries
+        self.n_results = n_results
+        self.logger = LoggerManager().get_logger()
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="RAGPrefetch")
+        self._lock = threading.RLock()  # 完成回调可能在持锁线程中立即执行
+        self._timer: Optional[threading.Timer] = None
+        self._entries: "OrderedDict[str, _PrefetchEntry]" = OrderedDict()
+
+        self.stats = {
+            "prefetches": 0,     # 发起的预取次数
+            "hits": 0,           # 最终结果命中预取
+            "misses": 0,         # 有预取但未命中
+            "wasted": 0,         # 未被使用的预取次数
+            "saved_ms": 0.0,     # 命中后省去的检索耗时
+            "wasted_ms": 0.0,    # 浪费的检索耗时
+        }
+
+    def on_partial(self, text: str, messages: List[Dict]) -> None:
+        """
+        收到中间识别结果
+
+        Args:
+            text: 当前语句累计的中间识别文本
+            messages: 当前对话历史（不含本句）
+        """
+        if len(_normalize(text)) < self.min_chars:
+            return
+        history = list(messages)
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.stable_ms / 1000, self._prefetch, args=(text, history))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _prefetch(self, text: str, history: List[Dict]) -> None:
+        """在后台检索中间结果对应的上下文"""
+        key = _normalize(text)
+        history_key = _history_key(history)
+        query = (history + [{"role": "user", "content": text}])[-10:]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.history_key == history_key:
+                return
+            entry = _PrefetchEntry(key, history_key, None)
+
+            def run():
+                start_time = time.time()
+                try:
+                    return self.rag_service.retrieve(query=query, n_results=self.n_results)
+                finally:
+                    entry.duration = time.time() - start_time
+
+            entry.future = self._executor.submit(run)
+            self._entries[key] = entry
+            self.stats["prefetches"] += 1
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._count_wasted(evicted)
+        self.logger.debug(f"RAG推测预取: {text}")
+
+    def _count_wasted(self, entry: _PrefetchEntry) -> None:
+        self.stats["wasted"] += 1
+        if entry.future.done():
+            self.stats["wasted_ms"] += entry.duration * 1000
+        else:
+            # 仍在检索，完成后再计入耗时
+            entry.future.add_done_callback(lambda _: self._add_wasted_time(entry))
+
+    def _add_wasted_time(self, entry: _PrefetchEntry) -> None:
+        with self._lock:
+            self.stats["wasted_ms"] += entry.duration * 1000
+
+    def take(self, final_text: str, messages: List[Dict]) -> Optional[str]:
+        """
+        取出与最终识别结果匹配的预取上下文
+
+        Args:
+            final_text: 最终用户消息
+            messages: 当前对话历史（不含本句）
+
+        Returns:
+            Optional[str]: 命中时返回检索到的上下文，未命中返回None
+        """
+        final_key = _normalize(final_text)
+        history_key = _history_key(messages)
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._entries:
+                return None
+            entries = list(self._entries.values())
+            self._entries.clear()
+
+        best = None
+        for entry in entries:
+            if (entry.history_key == history_key and final_key.startswith(entry.key)
+                    and len(entry.key) >= self.min_coverage * len(final_key)
+                    and (best is None or len(entry.key) > len(best.key))):
+                best = entry
+
+        context = None
+        if best is not None:
+            try:
+                context = best.future.result()  # 仍在检索时等待，仍比重新检索快
+            except Exception as e:
+                self.logger.warning(f"RAG预取结果不可用: {e}")
+
+        with self._lock:
+            for entry in entries:
+                if entry is not best or context is None:
+                    self._count_wasted(entry)
+            if context is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["hits"] += 1
+                self.stats["saved_ms"] += best.duration * 1000
+        return context
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取预取统计信息
+
+        Returns:
+            dict: 预取/命中/未命中/浪费次数，命中率，节省与浪费的检索耗时(毫秒)
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        finished = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / finished if finished else 0.0
+        return stats
+
+    def shutdown(self) -> None:
+        """停止预取"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._entries.clear()
+        self._executor.shutdown(wait=False)
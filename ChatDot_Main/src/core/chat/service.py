@@ -4,6 +4,7 @@ from global_managers.logger_manager import LoggerManager
 from chat.adapter import ChatAdapter
 from chat.settings import ChatSettings
 from chat.persistence import ChatPersistence
+from chat.duplex import DuplexConversation
 
 class ChatService:
     def __init__(self):
@@ -11,6 +12,7 @@ class ChatService:
         self.settings = ChatSettings()
         self.persistence = ChatPersistence()
         self.adapter = None
+        self.duplex: Optional[DuplexConversation] = None  # 全双工语音对话，start_duplex时创建
 
     def initialize(self):
         """初始化服务"""
@@ -24,6 +26,31 @@ class ChatService:
         # 加载历史记录
         history = self.persistence.load_history()
         self.adapter.set_messages(history)
+        
+        # 语音输入的中间结果用于RAG推测预取
+        prefetch_config = dict(self.settings.get_setting("rag_prefetch") or {})
+        if prefetch_config.pop("enabled", False):
+            self.adapter.enable_rag_prefetch(**prefetch_config)
+            if self.service_manager.is_service_registered("stt_service"):
+                stt_service = self.service_manager.get_service("stt_service")
+                stt_service.add_partial_callback(self.adapter.prefetch_partial)
+
+        # 用户开始说话时打断正在进行的回复
+        if self.settings.get_setting("barge_in") and self.service_manager.is_service_registered("stt_service"):
+            stt_service = self.service_manager.get_service("stt_service")
+            stt_service.add_speech_start_callback(self._on_speech_start)
+
+    def shutdown(self):
+        """关闭服务"""
+        self.stop_duplex()
+        if self.adapter and self.adapter.rag_prefetcher:
+            self.adapter.rag_prefetcher.shutdown()
+
+    def get_prefetch_stats(self) -> Optional[Dict]:
+        """获取RAG推测预取的命中率与浪费统计，未启用时为None"""
+        if self.adapter and self.adapter.rag_prefetcher:
+            return self.adapter.rag_prefetcher.get_stats()
+        return None
 
     def send_message(self, message: str, is_stream: bool = True) -> Iterator[str]:
         """
@@ -46,6 +73,62 @@ class ChatService:
         if self.adapter:
             self.adapter.stop_generating()
 
+    def interrupt(self, reason: str = "interrupt") -> bool:
+        """
+        打断正在进行的回复（生成中或语音播放中），空闲时不做任何事
+        
+        Args:
+            reason: 打断原因，用于日志
+            
+        Returns:
+            bool: 是否打断了回复
+        """
+        if not self.adapter or not self.adapter.is_busy():
+            return False
+        LoggerManager().get_logger().info(f"打断当前回复: {reason}")
+        self.adapter.stop_generating(reason)
+        return True
+
+    def _on_speech_start(self):
+        """STT检测到用户开始说话"""
+        stt_service = self.service_manager.get_service("stt_service")
+        if stt_service.adapter.echo_suppressor is None:
+            # 没有回声抑制时无法区分用户说话与自己播放的语音
+            return
+        self.interrupt("barge-in")
+
+    def start_duplex(self) -> Optional[DuplexConversation]:
+        """
+        开始全双工语音对话，识别结果自动作为输入发送，回复期间用户说话即打断
+        
+        Returns:
+            Optional[DuplexConversation]: 对话引擎（可注册回调、查看延迟统计），启动失败时为None
+        """
+        if self.duplex and self.duplex.is_running():
+            return self.duplex
+        if not self.service_manager.is_service_registered("stt_service"):
+            LoggerManager().get_logger().error("全双工对话需要STT服务")
+            return None
+        if self.duplex is None:
+            tts_service = (self.service_manager.get_service("tts_service")
+                           if self.service_manager.is_service_registered("tts_service") else None)
+            self.duplex = DuplexConversation(self, self.service_manager.get_service("stt_service"),
+                                             tts_service, **(self.settings.get_setting("duplex") or {}))
+        return self.duplex if self.duplex.start() else None
+
+    def stop_duplex(self):
+        """结束全双工语音对话"""
+        if self.duplex:
+            self.duplex.stop()
+
+    def is_duplex_running(self) -> bool:
+        """是否正在进行全双工语音对话（期间麦克风由对话引擎占用，其他语音输入不应启动或暂停识别）"""
+        return self.duplex is not None and self.duplex.is_running()
+
+    def get_duplex_stats(self) -> Optional[Dict]:
+        """获取全双工对话的轮次与延迟统计，未使用时为None"""
+        return self.duplex.get_stats() if self.duplex else None
+
     def clear_context(self):
         """清空上下文"""
         self.adapter.clear_context()
@@ -3,6 +3,20 @@ from global_managers.logger_manager import LoggerManager
 
 DEFAULT_CHAT_SETTINGS = {
     "current_handler": "defaultPrompt",  # 默认的上下文处理器
+    "rag_prefetch": {                    # 语音输入时根据中间识别结果预取RAG上下文
+        "enabled": False,                # 每个稳定的中间结果都会检索一次，API嵌入模式下每次都是一次付费请求，默认关闭
+        "stable_ms": 300,                # 中间结果保持不变多久后触发预取(毫秒)
+        "min_chars": 4,                  # 触发预取的最少字数
+        "min_coverage": 0.8,             # 预取文本至少覆盖最终文本的比例
+    },
+    "barge_in": False,                   # 用户开始说话时打断正在进行的回复（LLM生成、语音播放、Live2D），
+                                         # 需要STT回声抑制，否则播放的语音传回麦克风会打断自己（全双工对话不受此设置影响）
+    "duplex": {                          # 全双工语音对话
+        "end_of_turn_ms": 500,           # 一句话识别完成后等待用户继续说话的时间(毫秒)
+        "speech_timeout": 5.0,           # 用户继续说话但没有新识别结果时最多等待(秒)
+        "output_timeout": 10.0,          # 统计延迟时等待回复出声的最长时间(秒)
+        "history": 50,                   # 保留最近多少轮的延迟记录
+    },
 }
 
 class ChatSettings:
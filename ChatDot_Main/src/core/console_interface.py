@@ -2,6 +2,8 @@ from typing import Dict, Callable
 from bootstrap import Bootstrap
 from global_managers.service_manager import ServiceManager
 from global_managers.logger_manager import LoggerManager
+from global_managers.trace_manager import TraceManager
+from global_managers.metrics_manager import MetricsManager
 import shutil
 import sys
 import msvcrt
@@ -29,6 +31,8 @@ class ConsoleInterface:
             'tts': self.configure_tts,
             'stt': self.configure_stt,
             'rag': self.configure_rag,
+            'trace': self.show_traces,
+            'metrics': self.show_metrics,
             'exit': lambda: print("退出程序...")
         }
 
@@ -70,6 +74,8 @@ class ConsoleInterface:
         print("tts     - 配置TTS语音合成服务")
         print("stt     - 配置STT语音识别服务")
         print("rag     - 管理RAG长期记忆服务")
+        print("trace   - 查看最近几轮对话的耗时瀑布图")
+        print("metrics - 查看运行指标（首字延迟、合成耗时、欠载次数等）")
         print("exit    - 退出程序")
 
     def chat_mode(self):
@@ -89,6 +95,7 @@ class ConsoleInterface:
         print("命令选项:")
         print("- 输入 'q' 返回主菜单")
         print("- 输入 'voice' 切换语音/文本输入模式")
+        print("- 输入 'duplex' 进入全双工语音对话（可随时插话打断）")
         print("- 输入 'open regex' 启用/禁用正则表达式过滤")
         print("- 按 Ctrl+C 停止语音识别或中断生成")
         #endregion
@@ -165,8 +172,8 @@ class ConsoleInterface:
                                 except KeyboardInterrupt:
                                     print("\n语音识别已停止")
                                 finally:
-                                    # 确保STT服务被停止
-                                    loop.run_until_complete(stt_service.stop_recognition_async())
+                                    # 暂停识别，会话保持运行以便下次立即恢复
+                                    stt_service.pause_recognition()
                                 
                                 # 如果有识别结果，则提交
                                 if recognized_text:
@@ -204,6 +211,9 @@ class ConsoleInterface:
                         print("警告: STT服务未启用，请先在STT配置中启用")
                         print("您可以退出聊天模式，使用'stt'命令进行配置")
                     continue
+                elif user_input.lower() == 'duplex':
+                    self._duplex_conversation(chat_service)
+                    continue
                 elif user_input.lower() == "open regex":
                     use_filter = not use_filter
                     mode_str = "已启用" if use_filter else "已禁用"
@@ -333,6 +343,76 @@ class ConsoleInterface:
     #         except Exception as e:
     #             print(f"\n错误: {str(e)}")
 
+    def _duplex_conversation(self, chat_service):
+        """全双工语音对话，按 Ctrl+C 结束"""
+        import time
+        
+        duplex = chat_service.start_duplex()
+        if duplex is None:
+            print("全双工对话启动失败，请检查STT配置")
+            return
+        if not getattr(self, "_duplex_callbacks_registered", False):
+            duplex.add_user_text_callback(lambda text: print(f"\n用户: {text}\n助手: ", end='', flush=True))
+            duplex.add_response_callback(lambda chunk: print(chunk, end='', flush=True))
+            duplex.add_turn_callback(lambda turn: print(
+                f"\n[延迟] 出声 {turn['mouth_to_ear_ms']}ms，首字 {turn['first_token_ms']}ms"
+                f"{'（被打断）' if turn['interrupted'] else ''}"))
+            self._duplex_callbacks_registered = True
+        
+        print("\n全双工语音对话已开始，直接说话即可，回复时可随时插话，按 Ctrl+C 结束")
+        try:
+            while duplex.is_running():
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            chat_service.stop_duplex()
+        
+        stats = chat_service.get_duplex_stats()
+        if stats and stats["turns"]:
+            print(f"\n共 {stats['turns']} 轮，被打断 {stats['interrupted']} 轮")
+            if "mouth_to_ear_avg_ms" in stats:
+                print(f"语音结束到回复出声: 平均 {stats['mouth_to_ear_avg_ms']}ms，"
+                      f"p50 {stats['mouth_to_ear_p50_ms']}ms，p95 {stats['mouth_to_ear_p95_ms']}ms")
+
+    def show_traces(self):
+        """显示最近几轮对话的耗时瀑布图，可导出为JSON"""
+        trace_manager = TraceManager()
+        count = input("显示最近几轮 (默认3): ").strip()
+        count = int(count) if count.isdigit() and int(count) > 0 else 3
+        traces = trace_manager.get_recent_traces(count)
+        if not traces:
+            print("暂无记录，请先进行一轮对话")
+            return
+        
+        for trace in traces:
+            print()
+            print(trace_manager.format_waterfall(trace, width=shutil.get_terminal_size().columns // 3))
+        
+        if input("\n导出为JSON文件? (y/n): ").strip().lower() == 'y':
+            path = input("文件路径 (留空使用默认路径): ").strip() or None
+            print(f"已导出到: {trace_manager.export(path, count)}")
+
+    def show_metrics(self):
+        """显示运行指标，可启动本地抓取端点"""
+        metrics_manager = MetricsManager()
+        snapshot = metrics_manager.snapshot()
+        print(f"\n运行时长: {snapshot['uptime']}s")
+        for key, value in snapshot["counters"].items():
+            print(f"  {key:<40} {value}")
+        for key, value in snapshot["gauges"].items():
+            print(f"  {key:<40} {value:.3f}")
+        for key, summary in snapshot["histograms"].items():
+            if summary["count"]:
+                print(f"  {key:<40} n={summary['count']} avg={summary['avg']} "
+                      f"p50={summary['p50']} p90={summary['p90']} p99={summary['p99']} max={summary['max']}")
+            else:
+                print(f"  {key:<40} n=0")
+        
+        if input("\n启动本地抓取端点? (y/n): ").strip().lower() == 'y':
+            http = metrics_manager.get_setting("http") or {}
+            metrics_manager.start_http_server(http.get("host", "127.0.0.1"), http.get("port", 9464))
+
     def list_handlers(self):
         """列出所有可用的上下文处理器"""
         context_service = self.service_manager.get_service("context_handle_service")
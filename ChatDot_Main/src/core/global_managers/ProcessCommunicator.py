@@ -1,11 +1,157 @@
 import socket
 import threading
 import json
+import re
+import time
+import os
+import codecs
+import struct
+from concurrent.futures import ThreadPoolExecutor
+try:
+    # 本文件也会被单独拷贝到其他进程中使用，那里没有指标模块
+    from global_managers.metrics_manager import MetricsManager
+except ImportError:
+    MetricsManager = None
+
+
+class _TopicNode:
+    """主题前缀树节点，topic按'.'分段"""
+    __slots__ = ("children", "handler", "use_executor")
+
+    def __init__(self):
+        self.children = {}
+        self.handler = None
+        self.use_executor = False
+
+
+class _TopicTrie:
+    """主题前缀树，匹配开销与主题层级数成正比，与已注册前缀数量无关"""
+
+    def __init__(self):
+        self.root = _TopicNode()
+
+    @staticmethod
+    def _split(topic: str):
+        return topic.split(".") if topic else []
+
+    def insert(self, prefix: str, handler, use_executor=False):
+        node = self.root
+        for part in self._split(prefix):
+            node = node.children.setdefault(part, _TopicNode())
+        node.handler = handler
+        node.use_executor = use_executor
+
+    def remove(self, prefix: str):
+        node = self.root
+        for part in self._split(prefix):
+            node = node.children.get(part)
+            if node is None:
+                return False
+        removed = node.handler is not None
+        node.handler = None
+        node.use_executor = False
+        return removed
+
+    def match(self, topic: str):
+        """返回匹配“此主题本身”及其所有父前缀（含全局''）的 (handler, use_executor) 列表"""
+        node = self.root
+        matched = []
+        if node.handler is not None:
+            matched.append((node.handler, node.use_executor))
+        for part in self._split(topic):
+            node = node.children.get(part)
+            if node is None:
+                break
+            if node.handler is not None:
+                matched.append((node.handler, node.use_executor))
+        return matched
+
+
+class _SharedMemoryRing:
+    """
+    共享内存环形缓冲区，用于同机进程间传递大数据块（游戏画面、大状态等）
+    每个发送方拥有一块自己的环形缓冲区，写入后仅通过socket发送一个很小的“门铃”消息，
+    接收方按门铃中的偏移直接从共享内存拷贝，数据本身不经过JSON序列化和socket传输。
+    每条记录前有16字节记录头(seq, size)。写入方没有读取确认，环绕后会覆盖未读的记录，
+    接收方在拷贝前后各检查一次记录头，被覆盖（包括拷贝过程中被覆盖）的数据会被丢弃而不是交给handler。
+    """
+    HEADER = struct.Struct("<QQ")
+
+    def __init__(self, name, size=None, create=False):
+        from multiprocessing import shared_memory
+        if create:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            except FileExistsError:
+                # 上次运行异常退出留下的同名共享内存，释放后重新创建
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self._untrack()
+        self.name = name
+        self.owner = create
+        self.capacity = self.shm.size
+        self.write_pos = 0
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    def _untrack(self):
+        # 仅附加的一方不应在退出时释放共享内存（Python<3.13的resource_tracker会这样做）
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        except Exception:
+            pass
+
+    def write(self, data) -> dict:
+        """写入数据块，返回门铃描述 {"name", "offset", "size", "seq"}"""
+        view = memoryview(data).cast("B")
+        size = view.nbytes
+        total = self.HEADER.size + size
+        if total > self.capacity:
+            raise ValueError(f"数据大小 {size} 超出共享内存容量 {self.capacity}")
+        with self.lock:
+            if self.write_pos + total > self.capacity:
+                self.write_pos = 0
+            offset = self.write_pos
+            self.seq += 1
+            self.HEADER.pack_into(self.shm.buf, offset, self.seq, size)
+            self.shm.buf[offset + self.HEADER.size:offset + total] = view
+            self.write_pos = offset + total
+            return {"name": self.name, "offset": offset, "size": size, "seq": self.seq}
+
+    def read(self, offset, size, seq):
+        """按门铃描述拷贝出数据，数据已被覆盖时返回None"""
+        if self.HEADER.unpack_from(self.shm.buf, offset) != (seq, size):
+            return None
+        start = offset + self.HEADER.size
+        data = bytes(self.shm.buf[start:start + size])
+        # 写入方先写记录头再顺序写数据，拷贝期间被覆盖时记录头必然已经改变
+        if self.HEADER.unpack_from(self.shm.buf, offset) != (seq, size):
+            return None
+        return data
+
+    def close(self):
+        try:
+            self.shm.close()
+        except BufferError:
+            # 仍有视图引用时无法解除映射，但共享内存本身仍需释放
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
 
 class ProcessCommunicator:
     _instance = None
 
-    def __init__(self, is_server, host='127.0.0.1', port=5000):
+    def __init__(self, is_server, host='127.0.0.1', port=5000, handler_workers=1,
+                 transport="tcp", shm_name=None, shm_size=64 * 1024 * 1024):
         if ProcessCommunicator._instance is not None:
             raise Exception("请使用 ProcessCommunicator.instance() 获取单例")
         self.is_server = is_server
@@ -19,13 +165,32 @@ class ProcessCommunicator:
         self.lock = threading.Lock()
         self.conn = None  # 客户端模式下使用
         self.topic_handlers = {}  # 主题前缀: 回调函数
+        self._topic_trie = _TopicTrie()
+        self.handler_workers = handler_workers  # 后台handler线程数，默认1以保证同主题消息按序处理
+        self._executor = None  # 延迟创建，仅在有handler需要后台执行时使用
+        self.topic_stats = {}  # topic: {"count", "total_latency", "max_latency", "errors"}
+        self._stats_lock = threading.Lock()
+        self._queued = 0  # 已提交到后台线程池、尚未执行完的handler数
+        if MetricsManager is not None:
+            MetricsManager().gauge("process_communicator_queue_depth",
+                                   "等待后台handler处理的消息数").set_function(self.get_queue_depth)
+        # 传输方式: "tcp" 全部走JSON socket；"shm" 大数据走共享内存，socket仅作门铃
+        if transport not in ("tcp", "shm"):
+            raise ValueError(f"不支持的传输方式: {transport}")
+        self.transport = transport
+        self.shm_name = shm_name or f"chatdot_pc_{port}"
+        self.shm_size = shm_size
+        self._send_ring = None  # 本进程发送用的环形缓冲区
+        self._peer_rings = {}  # name: 已附加的对端环形缓冲区
 
     @classmethod
-    def instance(cls, is_server=None, host='127.0.0.1', port=5000):
+    def instance(cls, is_server=None, host='127.0.0.1', port=5000, handler_workers=1,
+                 transport="tcp", shm_name=None, shm_size=64 * 1024 * 1024):
         if cls._instance is None:
             if is_server is None:
                 raise Exception("首次调用必须指定 is_server")
-            cls._instance = cls(is_server, host, port)
+            cls._instance = cls(is_server, host, port, handler_workers,
+                                transport, shm_name, shm_size)
         return cls._instance
 
     @property
@@ -43,6 +208,9 @@ class ProcessCommunicator:
 
     def _init_connection(self):
         try:
+            if self.transport == "shm" and self._send_ring is None:
+                role = "server" if self.is_server else f"client_{os.getpid()}"
+                self._send_ring = _SharedMemoryRing(f"{self.shm_name}_{role}", self.shm_size, create=True)
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             if self.is_server:
                 self.sock.bind((self.host, self.port))
@@ -86,6 +254,12 @@ class ProcessCommunicator:
                     self.conn.close()
             if self.sock:
                 self.sock.close()
+            for ring in self._peer_rings.values():
+                ring.close()
+            self._peer_rings.clear()
+            if self._send_ring:
+                self._send_ring.close()
+                self._send_ring = None
             self.status = "已关闭"
         except Exception as e:
             self.status = f"关闭异常: {e}"
@@ -97,63 +271,259 @@ class ProcessCommunicator:
             self.status = "未连接，无法发送"
             return
         try:
-            data = {"msg": msg, "topic": topic}
-            if self.is_server:
-                with self.lock:
-                    for conn in self.clients.values():
-                        conn.sendall(json.dumps(data).encode('utf-8'))
+            self._send_data({"msg": msg, "topic": topic})
+        except Exception as e:
+            self.status = f"发送失败: {e}"
+
+    def send_blob(self, data, topic: str, msg: str = ""):
+        """
+        发送大数据块（bytes/bytearray/memoryview/numpy数组等支持缓冲区协议的对象）
+        shm传输下数据写入共享内存，socket只发送门铃；tcp传输下退化为latin-1字符串随JSON发送
+        接收方handler中通过 msg["data"] 获取数据（bytes）
+        """
+        if not self._active:
+            self.status = "未连接，无法发送"
+            return
+        try:
+            if self._send_ring is not None:
+                self._send_data({"msg": msg, "topic": topic, "shm": self._send_ring.write(data)})
             else:
-                if self.conn:
-                    self.conn.sendall(json.dumps(data).encode('utf-8'))
+                payload = bytes(memoryview(data).cast("B")).decode("latin-1")
+                self._send_data({"msg": msg, "topic": topic, "blob": payload})
         except Exception as e:
             self.status = f"发送失败: {e}"
 
-    def add_handler(self, prefix: str, handler):
-        """注册主题前缀对应的回调函数，handler(msg: dict, topic: str)"""
+    def _send_data(self, data: dict):
+        encoded = json.dumps(data).encode('utf-8')
+        if self.is_server:
+            with self.lock:
+                for conn in self.clients.values():
+                    conn.sendall(encoded)
+        else:
+            if self.conn:
+                self.conn.sendall(encoded)
+
+    def _resolve_blob(self, msg):
+        """将门铃/内联数据解析为 msg["data"]，数据不可用时返回None"""
+        if "shm" in msg:
+            desc = msg["shm"]
+            ring = self._peer_rings.get(desc["name"])
+            if ring is None:
+                ring = _SharedMemoryRing(desc["name"])
+                self._peer_rings[desc["name"]] = ring
+            view = ring.read(desc["offset"], desc["size"], desc["seq"])
+            if view is None:
+                self.status = f"共享内存数据已被覆盖[{msg.get('topic', '')}]，请增大shm_size"
+                return None
+            return {**msg, "data": view}
+        if "blob" in msg:
+            return {**msg, "data": msg["blob"].encode("latin-1")}
+        return msg
+
+    def add_handler(self, prefix: str, handler, use_executor=False):
+        """
+        注册主题前缀对应的回调函数，handler(msg: dict, topic: str)
+        use_executor=True 时handler在后台线程池中执行，不阻塞socket接收线程
+        """
         self.topic_handlers[prefix] = handler
+        self._topic_trie.insert(prefix, handler, use_executor)
+        if use_executor and self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, self.handler_workers),
+                thread_name_prefix="ProcessCommunicatorHandler"
+            )
+
+    def remove_handler(self, prefix: str):
+        """移除主题前缀对应的回调函数"""
+        self.topic_handlers.pop(prefix, None)
+        return self._topic_trie.remove(prefix)
 
     def _dispatch_message(self, msg, topic):
         # 匹配所有“此主题本身”及“此主题的子主题”的handler，全部调用
-        for prefix, handler in self.topic_handlers.items():
-            if prefix == "" or topic == prefix or topic.startswith(prefix + "."):
-                handler(msg, topic)
+        received_at = time.perf_counter()
+        if "shm" in msg or "blob" in msg:
+            try:
+                msg = self._resolve_blob(msg)
+            except Exception as e:
+                self.status = f"读取共享内存失败: {e}"
+                msg = None
+            if msg is None:
+                return
+        for handler, use_executor in self._topic_trie.match(topic):
+            if use_executor and self._executor is not None:
+                with self._stats_lock:
+                    self._queued += 1
+                self._executor.submit(self._run_queued_handler, handler, msg, topic, received_at)
+            else:
+                self._run_handler(handler, msg, topic, received_at)
+
+    def _run_handler(self, handler, msg, topic, received_at):
+        """执行handler并记录该主题的消息数与延迟（含排队时间）"""
+        failed = False
+        try:
+            handler(msg, topic)
+        except Exception as e:
+            failed = True
+            self.status = f"处理消息异常[{topic}]: {e}"
+        finally:
+            self._record_stats(topic, time.perf_counter() - received_at, failed)
+
+    def _run_queued_handler(self, handler, msg, topic, received_at):
+        try:
+            self._run_handler(handler, msg, topic, received_at)
+        finally:
+            with self._stats_lock:
+                self._queued -= 1
+
+    def get_queue_depth(self):
+        """后台线程池中排队或正在执行的handler数"""
+        return self._queued
+
+    def _record_stats(self, topic, latency, failed=False):
+        with self._stats_lock:
+            stats = self.topic_stats.get(topic)
+            if stats is None:
+                stats = {"count": 0, "total_latency": 0.0, "max_latency": 0.0, "errors": 0}
+                self.topic_stats[topic] = stats
+            stats["count"] += 1
+            stats["total_latency"] += latency
+            if latency > stats["max_latency"]:
+                stats["max_latency"] = latency
+            if failed:
+                stats["errors"] += 1
+
+    def get_topic_stats(self):
+        """
+        获取各主题的统计信息
+        :return: {topic: {"count", "avg_latency_ms", "max_latency_ms", "errors"}}
+        """
+        with self._stats_lock:
+            return {
+                topic: {
+                    "count": stats["count"],
+                    "avg_latency_ms": stats["total_latency"] * 1000 / stats["count"] if stats["count"] else 0.0,
+                    "max_latency_ms": stats["max_latency"] * 1000,
+                    "errors": stats["errors"],
+                }
+                for topic, stats in self.topic_stats.items()
+            }
+
+    def reset_topic_stats(self):
+        """清空主题统计信息"""
+        with self._stats_lock:
+            self.topic_stats.clear()
+
+    _json_decoder = json.JSONDecoder()
+
+    def _decode_messages(self, buffer: str):
+        """
+        从接收缓冲区中解析出所有完整的JSON消息
+        单次recv可能包含多条消息（门铃消息较小且频繁时很常见），也可能只有半条
+        :return: (消息列表, 剩余未完整的缓冲区)
+        """
+        messages = []
+        pos = 0
+        length = len(buffer)
+        while pos < length:
+            while pos < length and buffer[pos].isspace():
+                pos += 1
+            if pos >= length:
+                break
+            try:
+                msg, end = self._json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if self._is_truncated(buffer, e):
+                    # 消息尚未接收完整
+                    break
+                # 无效的消息直接丢弃，否则会一直留在缓冲区中阻塞后续消息
+                self.status = f"丢弃无效消息: {e}"
+                end = self._message_end(buffer, pos)
+                if end is None:
+                    end = buffer.find("{", pos + 1)
+                    end = end if end != -1 else length
+                pos = end
+                continue
+            messages.append(msg)
+            pos = end
+        return messages, buffer[pos:]
+
+    _literal_tail = re.compile(r"[-+.\w]*")
+
+    @classmethod
+    def _is_truncated(cls, buffer: str, error: json.JSONDecodeError) -> bool:
+        """解析错误是否只是因为数据尚未接收完整（在末尾中断，或停在未闭合的字符串/数字/字面量中）"""
+        return (error.pos >= len(buffer)
+                or error.msg.startswith("Unterminated string")
+                or cls._literal_tail.fullmatch(buffer, error.pos) is not None)
+
+    # 字符串整体作为一个记号（含转义），其余只关心括号；未闭合的引号说明字符串尚未接收完整
+    _json_token = re.compile(r'"(?:[^"\\]|\\.)*"|"|[{}\[\]]')
+
+    @classmethod
+    def _message_end(cls, buffer: str, pos: int):
+        """
+        找到从pos开始的一条无效消息的结束位置（括号配平），以便跳过它
+        :return: 结束位置；括号无法配平时返回None
+        """
+        if buffer[pos] not in "{[":
+            # 不是消息开头，跳到下一个 { 处
+            next_start = buffer.find("{", pos + 1)
+            return next_start if next_start != -1 else len(buffer)
+        depth = 0
+        for match in cls._json_token.finditer(buffer, pos):
+            token = match.group()
+            if token == '"':
+                return None
+            if token in "{[":
+                depth += 1
+            elif token in "}]":
+                depth -= 1
+                if depth == 0:
+                    return match.end()
+        return None
 
     def _receive_server(self, conn, client_id):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        buffer = ""
         while self._active:
             try:
-                data = conn.recv(1024)
+                data = conn.recv(65536)
                 if not data:
                     self.status = f"客户端断开"
                     break
-                msg = json.loads(data.decode('utf-8'))
-                topic = msg.get("topic", "")
-                print(f"\n收到消息: {msg}")
-                # 广播给所有其他客户端
-                with self.lock:
-                    for cid, cconn in self.clients.items():
-                        if cid != client_id:
-                            try:
-                                cconn.sendall(json.dumps(msg).encode('utf-8'))
-                            except Exception:
-                                pass  # 忽略单个客户端异常
-                # 本地分发（服务器本地handler）
-                self._dispatch_message(msg, topic)
+                messages, buffer = self._decode_messages(buffer + decoder.decode(data))
+                for msg in messages:
+                    topic = msg.get("topic", "")
+                    print(f"\n收到消息: {msg}")
+                    # 广播给所有其他客户端
+                    with self.lock:
+                        for cid, cconn in self.clients.items():
+                            if cid != client_id:
+                                try:
+                                    cconn.sendall(json.dumps(msg).encode('utf-8'))
+                                except Exception:
+                                    pass  # 忽略单个客户端异常
+                    # 本地分发（服务器本地handler）
+                    self._dispatch_message(msg, topic)
             except Exception as e:
                 self.status = f"接收异常: {e}"
                 break
 
     def _receive_client(self, conn):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        buffer = ""
         while self._active:
             try:
-                data = conn.recv(1024)
+                data = conn.recv(65536)
                 if not data:
                     self.status = "服务器断开"
                     self.active = False
                     break
-                msg = json.loads(data.decode('utf-8'))
-                topic = msg.get("topic", "")
-                print(f"\n收到消息: {msg}")
-                self._dispatch_message(msg, topic)
+                messages, buffer = self._decode_messages(buffer + decoder.decode(data))
+                for msg in messages:
+                    topic = msg.get("topic", "")
+                    print(f"\n收到消息: {msg}")
+                    self._dispatch_message(msg, topic)
             except Exception as e:
                 self.status = f"接收异常: {e}"
                 self.active = False
@@ -206,6 +576,11 @@ if __name__ == "__main__":
    # 说明：
    # - 收到消息时，所有匹配“此主题本身”及“此主题的子主题”的handler都会被调用
    # - handler的标准写法：def handler(msg: dict, topic: str):
+   # - 耗时较长的handler可指定 use_executor=True，在后台线程中执行，不阻塞接收线程
+   app.add_handler('game', slow_handler, use_executor=True)
+
+   # - 后台线程数可在首次获取实例时指定（默认1，保证消息按序处理）
+   app = ProcessCommunicator.instance(is_server=True, handler_workers=2)
 
 6. 示例：完整注册流程
    app = ProcessCommunicator.instance(is_server=False)
@@ -217,4 +592,17 @@ if __name__ == "__main__":
    app.add_handler('', global_handler)
    app.active = True
    app.send("hello", "tts.a.b")
+
+7. 同机进程间传递大数据（共享内存传输）
+   # 首次获取实例时指定 transport="shm"，双方的 shm_name 需一致（默认按端口生成）
+   app = ProcessCommunicator.instance(is_server=False, transport="shm", shm_size=64 * 1024 * 1024)
+   app.active = True
+   app.send_blob(frame_bytes, "Game.Frame")  # 数据写入共享内存，socket仅发送门铃
+   def frame_handler(msg, topic):
+       frame = msg["data"]  # bytes，读取时已从共享内存拷贝出来
+   app.add_handler("Game.Frame", frame_handler)
+
+8. 查看各主题的消息数与处理延迟
+   app.get_topic_stats()
+   # {'tts.a.b': {'count': 1, 'avg_latency_ms': 0.05, 'max_latency_ms': 0.05, 'errors': 0}}
 """
@@ -1,12 +1,29 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 import threading
+from global_managers.settings_manager import SettingsManager
 
 #替换print用的正则表达式
 #查找：print\((.*?)\)
 #替换为：logger.debug(\1)
 
+DEFAULT_LOGGING_SETTINGS = {
+    "level": "DEBUG",   # 默认日志级别
+    "levels": {},       # 按模块名前缀设置级别，例如 {"tts.audio_player": "INFO", "chat": "DEBUG"}，最长前缀优先
+    "async_output": True,  # 日志由后台线程写出，调用方只负责入队
+}
+
 class LoggerManager:
+    """
+    日志管理
+    - 所有logger共用一个 QueueHandler，由 QueueListener 后台线程写到控制台，调用方不会被输出阻塞
+    - logger按名称缓存；热路径上建议在模块级保存 logger = LoggerManager().get_logger(__name__)，
+      并使用 logger.debug("...%s", value) 的惰性格式化，级别关闭时不会构造消息
+    - 级别可以按模块名前缀单独设置（见 set_level/configure）
+    """
     _instance = None
     _lock = threading.Lock()  # 确保线程安全
 
@@ -14,37 +31,120 @@ class LoggerManager:
         if not cls._instance:
             with cls._lock:
                 if not cls._instance:
-                    cls._instance = super(LoggerManager, cls).__new__(cls)
-                    cls._instance._loggers = {}
+                    instance = super(LoggerManager, cls).__new__(cls)
+                    instance._loggers = {}
+                    instance._default_level = logging.DEBUG
+                    instance._levels = {}  # 模块名前缀: 级别
+                    instance._listener = None
+                    formatter = logging.Formatter(
+                        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S'
+                    )
+                    instance._console_handler = logging.StreamHandler(sys.stdout)
+                    instance._console_handler.setFormatter(formatter)
+                    instance._handler = instance._console_handler
+                    cls._instance = instance
+                    SettingsManager().register_module("logging", dict(DEFAULT_LOGGING_SETTINGS))
+                    instance.apply_settings()
         return cls._instance
 
-    def get_logger(self, name=None, level=logging.DEBUG):
+    #region 配置
+    def configure(self, level=None, levels: dict = None, async_output: bool = None):
+        """
+        调整日志设置，已创建的logger立即生效
+        :param level: 默认级别，名称或数值
+        :param levels: 按模块名前缀设置的级别（整体替换）
+        :param async_output: 是否使用后台线程写日志
+        """
+        if level is not None:
+            self._default_level = logging._checkLevel(level)
+        if levels is not None:
+            self._levels = {prefix: logging._checkLevel(value) for prefix, value in levels.items()}
+        if async_output is not None:
+            self._set_async(async_output)
+        for name, logger in self._loggers.items():
+            logger.setLevel(self._resolve_level(name))
+
+    def apply_settings(self):
+        """按 logging 设置模块重新配置"""
+        settings = SettingsManager()
+        self.configure(**{key: settings.get_setting("logging", key) for key in DEFAULT_LOGGING_SETTINGS})
+
+    def set_level(self, prefix: str, level):
+        """
+        设置某个子系统的日志级别
+        :param prefix: 模块名前缀，例如 tts 或 tts.audio_player
+        :param level: 级别名称或数值，None 表示恢复默认级别
+        """
+        if level is None:
+            self._levels.pop(prefix, None)
+        else:
+            self._levels[prefix] = logging._checkLevel(level)
+        for name, logger in self._loggers.items():
+            logger.setLevel(self._resolve_level(name))
+
+    def get_levels(self) -> dict:
+        """获取默认级别与各子系统级别（级别名称）"""
+        return {"level": logging.getLevelName(self._default_level),
+                "levels": {prefix: logging.getLevelName(value) for prefix, value in self._levels.items()}}
+
+    def _resolve_level(self, name: str) -> int:
+        best = None
+        for prefix in self._levels:
+            if (name == prefix or name.startswith(prefix + ".")) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self._levels[best] if best is not None else self._default_level
+
+    def _set_async(self, enabled: bool):
+        if enabled and self._listener is None:
+            log_queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(log_queue, self._console_handler)
+            self._listener.start()
+            self._swap_handler(logging.handlers.QueueHandler(log_queue))
+            atexit.register(self.flush)
+        elif not enabled and self._listener is not None:
+            self._swap_handler(self._console_handler)
+            self.flush()
+
+    def _swap_handler(self, handler):
+        for logger in self._loggers.values():
+            logger.removeHandler(self._handler)
+            logger.addHandler(handler)
+        self._handler = handler
+
+    def flush(self):
+        """写出队列中剩余的日志并停止后台线程（程序退出时自动调用）"""
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            if isinstance(self._handler, logging.handlers.QueueHandler):
+                self._swap_handler(self._console_handler)
+            listener.stop()
+    #endregion
+
+    def get_logger(self, name=None, level=None):
         """
         获取一个logger实例。如果未指定名称，则自动识别调用者模块名称。
+        频繁调用的地方请传入 __name__ 或在模块级缓存logger，避免每次读取调用栈
         :param name: 日志名称（可选）
-        :param level: 日志级别
+        :param level: 日志级别（可选，仅在首次创建时生效，默认按 configure 的设置）
         :return: logger实例
         """
         if not name:
             # 自动获取调用者模块的名称
-            frame = sys._getframe(1)
-            name = frame.f_globals.get("__name__", "unknown")
-
-        if name not in self._loggers:
-            # 创建新的logger
-            logger = logging.getLogger(name)
-            logger.setLevel(level)
-
-            # 如果logger没有处理器，则添加控制台处理器
-            if not logger.handlers:
-                formatter = logging.Formatter(
-                    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                    datefmt='%Y-%m-%d %H:%M:%S'
-                )
-                console_handler = logging.StreamHandler(sys.stdout)
-                console_handler.setFormatter(formatter)
-                logger.addHandler(console_handler)
-
-            self._loggers[name] = logger
-
-        return self._loggers[name]
\ No newline at end of file
+            name = sys._getframe(1).f_globals.get("__name__", "unknown")
+
+        logger = self._loggers.get(name)
+        if logger is not None:
+            return logger
+
+        with self._lock:
+            logger = self._loggers.get(name)
+            if logger is None:
+                # 创建新的logger
+                logger = logging.getLogger(name)
+                logger.setLevel(level if level is not None else self._resolve_level(name))
+                # 如果logger没有处理器，则添加共用的处理器
+                if not logger.handlers:
+                    logger.addHandler(self._handler)
+                self._loggers[name] = logger
+        return logger
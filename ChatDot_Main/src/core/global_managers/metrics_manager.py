@@ -0,0 +1,389 @@
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from global_managers.logger_manager import LoggerManager
+from global_managers.settings_manager import SettingsManager
+from utils.path_utils import get_core_path
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(get_core_path(), "SECRETS", "metrics")
+
+DEFAULT_METRICS_SETTINGS = {
+    "enabled": True,
+    "http": {                       # 本地抓取端点（Prometheus文本格式 /metrics，JSON格式 /metrics.json）
+        "enabled": False,
+        "host": "127.0.0.1",        # 只监听本机
+        "port": 9464,
+    },
+    "snapshot": {                   # 定期把快照追加到 SECRETS/metrics/metrics-日期.jsonl
+        "enabled": True,
+        "interval": 60,             # 间隔(秒)
+        "dir": None,                # 默认 SECRETS/metrics
+    },
+}
+
+
+def _format_key(name: str, labels: tuple) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    """只增计数器"""
+
+    def __init__(self, name: str, labels: tuple = ()):
+        self.name = name
+        self.labels = labels
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+
+class Gauge:
+    """可增可减的瞬时值；设置了取值函数时在采集时调用"""
+
+    def __init__(self, name: str, labels: tuple = ()):
+        self.name = name
+        self.labels = labels
+        self._value = 0.0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """
+        采集时调用 function() 取值（例如队列长度），避免在热路径上维护
+        """
+        self._function = function
+
+    @property
+    def value(self):
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception:
+                return float("nan")
+        return self._value
+
+
+class Histogram:
+    """
+    HDR风格的对数-线性直方图
+    - 每个2的幂区间再等分为 sub_buckets 个桶，相对误差约为 1/sub_buckets，与数值范围无关
+    - 只保存非空桶，记录一次只是一次字典计数，可以在音频回调等热路径中使用
+    """
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, name: str, labels: tuple = (), sub_buckets: int = 32):
+        self.name = name
+        self.labels = labels
+        self.sub_buckets = sub_buckets
+        self._buckets = {}  # 桶序号: 数量，小于等于0的值记在 None 中
+        self._count = 0
+        self._sum = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+        self._lock = threading.Lock()
+
+    def _index(self, value: float):
+        if value <= 0:
+            return None
+        mantissa, exponent = math.frexp(value)  # value = mantissa * 2**exponent, mantissa ∈ [0.5, 1)
+        return exponent * self.sub_buckets + int((mantissa - 0.5) * 2 * self.sub_buckets)
+
+    def _bucket_value(self, index) -> float:
+        """桶的中点"""
+        if index is None:
+            return 0.0
+        exponent, sub = divmod(index, self.sub_buckets)
+        return math.ldexp(0.5 + (sub + 0.5) / (2 * self.sub_buckets), exponent)
+
+    def observe(self, value: float):
+        index = self._index(value)
+        with self._lock:
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+            self._count += 1
+            self._sum += value
+            if value < self._min:
+                self._min = value
+            if value > self._max:
+                self._max = value
+
+    def time(self):
+        """
+        记录代码块耗时(毫秒)的上下文管理器
+        """
+        return _HistogramTimer(self)
+
+    def get_summary(self) -> dict:
+        """
+        :return: {"count", "sum", "min", "max", "avg", "p50", "p90", "p99"}
+        """
+        with self._lock:
+            count, total = self._count, self._sum
+            low, high = self._min, self._max
+            buckets = sorted(self._buckets.items(), key=lambda item: -1 if item[0] is None else item[0])
+        summary = {"count": count, "sum": round(total, 3)}
+        if not count:
+            return summary
+        summary.update({"min": round(low, 3), "max": round(high, 3), "avg": round(total / count, 3)})
+        for quantile in self.QUANTILES:
+            rank = quantile * count
+            seen = 0
+            for index, bucket_count in buckets:
+                seen += bucket_count
+                if seen >= rank:
+                    # 桶中点可能超出实际范围，限制在最小值与最大值之间
+                    summary[f"p{int(quantile * 100)}"] = round(min(high, max(low, self._bucket_value(index))), 3)
+                    break
+        return summary
+
+
+class _HistogramTimer:
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe((time.monotonic() - self.start) * 1000)
+        return False
+
+
+class MetricsManager:
+    """
+    运行指标注册表（计数器、直方图、瞬时值）
+    - 各模块按名称获取指标后直接记录，同名同标签返回同一对象，延迟直方图统一以毫秒为单位并以 _ms 结尾
+    - 可选的本地HTTP端点输出Prometheus文本格式，也可定期把快照追加写入磁盘，便于长时间无人值守运行后分析
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:
+                    cls._instance = super(MetricsManager, cls).__new__(cls)
+                    cls._instance._metrics = {}  # (name, labels): 指标
+                    cls._instance._help = {}     # name: 说明
+                    cls._instance._server = None
+                    cls._instance._snapshot_thread = None
+                    cls._instance._stop_event = threading.Event()
+                    cls._instance.start_time = time.time()
+                    SettingsManager().register_module("metrics", DEFAULT_METRICS_SETTINGS)
+        return cls._instance
+
+    #region 注册与获取
+    def _get(self, kind, name: str, help: str, labels: dict, **kwargs):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = kind(name, key[1], **kwargs)
+                    self._metrics[key] = metric
+                    if help:
+                        self._help.setdefault(name, help)
+        if not isinstance(metric, kind):
+            raise ValueError(f"指标 {name} 已注册为 {type(metric).__name__}")
+        return metric
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        """
+        获取计数器
+        :param name: 名称，以 _total 结尾，例如 llm_requests_total
+        :param help: 说明
+        :param labels: 标签
+        """
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", **labels) -> Gauge:
+        """
+        获取瞬时值
+        :param name: 名称，例如 process_communicator_queue_depth
+        :param help: 说明
+        :param labels: 标签
+        """
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str = "", **labels) -> Histogram:
+        """
+        获取直方图
+        :param name: 名称，例如 llm_first_token_ms
+        :param help: 说明
+        :param labels: 标签
+        """
+        return self._get(Histogram, name, help, labels)
+    #endregion
+
+    #region 采集与输出
+    def snapshot(self) -> dict:
+        """
+        获取所有指标的当前值
+        :return: {"time", "uptime", "counters": {...}, "gauges": {...}, "histograms": {key: 摘要}}，
+                 key 为带标签的名称，例如 tts_synthesize_ms{provider="gpt-sovits"}
+        """
+        result = {"time": time.time(), "uptime": round(time.time() - self.start_time, 1),
+                  "counters": {}, "gauges": {}, "histograms": {}}
+        for (name, labels), metric in sorted(self._metrics.items(), key=lambda item: item[0]):
+            key = _format_key(name, labels)
+            if isinstance(metric, Counter):
+                result["counters"][key] = metric.value
+            elif isinstance(metric, Gauge):
+                result["gauges"][key] = metric.value
+            else:
+                result["histograms"][key] = metric.get_summary()
+        return result
+
+    def format_prometheus(self) -> str:
+        """
+        输出Prometheus文本格式，直方图以 summary 类型输出分位数
+        """
+        lines = []
+        typed = set()
+        for (name, labels), metric in sorted(self._metrics.items(), key=lambda item: item[0]):
+            metric_name = "chatdot_" + name
+            if name not in typed:
+                typed.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {metric_name} {self._help[name]}")
+                kind = {Counter: "counter", Gauge: "gauge"}.get(type(metric), "summary")
+                lines.append(f"# TYPE {metric_name} {kind}")
+            if isinstance(metric, Histogram):
+                summary = metric.get_summary()
+                for quantile in Histogram.QUANTILES:
+                    value = summary.get(f"p{int(quantile * 100)}", float("nan"))
+                    lines.append(f"{_format_key(metric_name, labels + (('quantile', str(quantile)),))} {value}")
+                lines.append(f"{_format_key(metric_name + '_sum', labels)} {summary['sum']}")
+                lines.append(f"{_format_key(metric_name + '_count', labels)} {summary['count']}")
+            else:
+                lines.append(f"{_format_key(metric_name, labels)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path: str = None) -> str:
+        """
+        把当前快照追加写入JSON Lines文件
+        :param path: 文件路径，默认按日期写入 SECRETS/metrics
+        :return: 文件路径
+        """
+        if path is None:
+            directory = (self.get_setting("snapshot") or {}).get("dir") or DEFAULT_SNAPSHOT_DIR
+            path = os.path.join(directory, time.strftime("metrics-%Y%m%d.jsonl"))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        line = json.dumps(self.snapshot(), ensure_ascii=False, default=str)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        return path
+    #endregion
+
+    #region 端点与定期快照
+    def get_setting(self, key):
+        return SettingsManager().get_setting("metrics", key)
+
+    def start(self):
+        """按设置启动HTTP端点与定期快照（由 Bootstrap 在服务初始化后调用）"""
+        if not self.get_setting("enabled"):
+            return
+        http = self.get_setting("http") or {}
+        if http.get("enabled"):
+            self.start_http_server(http.get("host", "127.0.0.1"), http.get("port", 9464))
+        snapshot = self.get_setting("snapshot") or {}
+        if snapshot.get("enabled"):
+            self.start_snapshots(snapshot.get("interval", 60))
+
+    def stop(self):
+        """停止HTTP端点与定期快照，并写入最后一次快照"""
+        self._stop_event.set()
+        if self._snapshot_thread:
+            self._snapshot_thread.join(timeout=2)
+            self._snapshot_thread = None
+            self._write_snapshot_safely()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def start_http_server(self, host: str = "127.0.0.1", port: int = 9464) -> bool:
+        """
+        启动本地抓取端点：/metrics 为Prometheus文本格式，/metrics.json 为JSON快照
+        :return: 是否启动成功
+        """
+        if self._server:
+            return True
+        manager = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics":
+                    body, content_type = manager.format_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body, content_type = json.dumps(manager.snapshot(), ensure_ascii=False), "application/json; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            LoggerManager().get_logger().error(f"指标端点启动失败 {host}:{port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="MetricsHTTPServer", daemon=True).start()
+        LoggerManager().get_logger().info(f"指标端点已启动: http://{host}:{self._server.server_port}/metrics")
+        return True
+
+    def start_snapshots(self, interval: float = 60):
+        """
+        启动定期快照线程
+        :param interval: 间隔(秒)
+        """
+        if self._snapshot_thread:
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(interval):
+                self._write_snapshot_safely()
+
+        self._snapshot_thread = threading.Thread(target=run, name="MetricsSnapshot", daemon=True)
+        self._snapshot_thread.start()
+
+    def _write_snapshot_safely(self):
+        try:
+            self.write_snapshot()
+        except Exception as e:
+            LoggerManager().get_logger().error(f"写入指标快照失败: {e}")
+    #endregion
@@ -1,30 +1,177 @@
+import atexit
 import json
 import os
+import tempfile
+import threading
+import time
+from global_managers.logger_manager import LoggerManager
 from utils.path_utils import get_core_path
 
+PERSISTENCE_DIR = os.path.join(get_core_path(), "SECRETS", "persistence")
+
 class PersistenceManager:
+    """
+    模块数据的JSON持久化
+    - load 使用内存缓存，文件的修改时间或大小变化（例如被手动编辑）时重新读取；
+      缓存的是JSON文本，每次返回新的对象，调用方修改返回值不会影响缓存
+    - save 立即更新缓存，写盘延迟 write_delay 秒由后台线程执行，期间的多次保存只写最后一次
+    - 写盘先写同目录下的临时文件再替换，中途崩溃不会留下半个文件
+    - 退出前调用 flush() 写出所有待写数据（也注册在 atexit 中）
+    """
     _instance = None
+    _lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
-            cls._instance = super(PersistenceManager, cls).__new__(cls, *args, **kwargs)
-            cls._instance.data = {}
+            with cls._lock:
+                if not cls._instance:
+                    instance = super(PersistenceManager, cls).__new__(cls)
+                    instance.data = {}
+                    instance.write_delay = 0.5        # 写盘延迟(秒)，0 表示同步写入
+                    instance._cache = {}              # 文件路径: (JSON文本, mtime_ns, size)
+                    instance._pending = {}            # 文件路径: (JSON文本, 最早写盘时间, 版本)
+                    instance._versions = {}           # 文件路径: 最近一次保存的版本
+                    instance._written = {}            # 文件路径: 已写盘的版本，避免旧数据覆盖新数据
+                    instance._writing = {}            # 文件路径: 正在写盘的次数
+                    instance._directories = set()     # 已创建的目录
+                    instance._cond = threading.Condition()
+                    instance._write_lock = threading.Lock()
+                    instance._writer = None
+                    atexit.register(instance.flush)
+                    cls._instance = instance
         return cls._instance
 
+    def _filepath(self, module_name, filename):
+        return os.path.join(PERSISTENCE_DIR, module_name, filename)
+
     def save(self, module_name, data, filename="data.json"):
-        """保存模块的数据到文件"""
-        core_path = get_core_path()
-        directory = os.path.join(core_path, "SECRETS", "persistence", module_name)
-        os.makedirs(directory, exist_ok=True)
-        filepath = os.path.join(directory, filename)
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        """保存模块的数据到文件（延迟写盘，见 write_delay）"""
+        filepath = self._filepath(module_name, filename)
+        # 在调用方线程中序列化，之后调用方再修改data不影响要写入的内容
+        text = json.dumps(data, ensure_ascii=False, indent=4)
+        with self._cond:
+            version = self._versions.get(filepath, 0) + 1
+            self._versions[filepath] = version
+            self._cache[filepath] = (text, None, None)
+            if self.write_delay <= 0:
+                self._pending.pop(filepath, None)
+                self._writing[filepath] = self._writing.get(filepath, 0) + 1
+        if self.write_delay <= 0:
+            self._write_file(filepath, text, version)
+            return
+
+        with self._cond:
+            self._pending[filepath] = (text, time.monotonic() + self.write_delay, version)
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="PersistenceWriter", daemon=True)
+                self._writer.start()
+            self._cond.notify()
 
     def load(self, module_name, filename="data.json"):
         """从文件加载模块的数据"""
-        core_path = get_core_path()
-        filepath = os.path.join(core_path, "SECRETS", "persistence", module_name, filename)
-        if os.path.exists(filepath):
-            with open(filepath, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
\ No newline at end of file
+        filepath = self._filepath(module_name, filename)
+        with self._cond:
+            if filepath in self._pending or filepath in self._writing:
+                # 尚未写盘的数据以内存中为准
+                return json.loads(self._cache[filepath][0])
+            cached = self._cache.get(filepath)
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return {}
+        if cached and cached[1] == stat.st_mtime_ns and cached[2] == stat.st_size:
+            return json.loads(cached[0])
+
+        with open(filepath, "r", encoding="utf-8") as f:
+            text = f.read()
+        data = json.loads(text)
+        with self._cond:
+            if filepath not in self._pending:
+                self._cache[filepath] = (text, stat.st_mtime_ns, stat.st_size)
+        return data
+
+    def flush(self, module_name=None, filename="data.json"):
+        """
+        立即写出待写数据
+        :param module_name: 只写出该模块的文件，默认全部
+        :param filename: 与 module_name 一起指定文件
+        """
+        with self._cond:
+            if module_name is None:
+                items = list(self._pending.items())
+                self._pending.clear()
+            else:
+                filepath = self._filepath(module_name, filename)
+                items = [(filepath, self._pending.pop(filepath))] if filepath in self._pending else []
+            for filepath, _ in items:
+                self._writing[filepath] = self._writing.get(filepath, 0) + 1
+        for filepath, (text, _, version) in items:
+            self._write_file_safely(filepath, text, version)
+        # 等待后台线程中正在进行的写入完成
+        with self._cond:
+            while self._writing:
+                self._cond.wait(0.1)
+
+    def _write_loop(self):
+        """后台写盘线程：等待最早到期的文件并写出"""
+        while True:
+            with self._cond:
+                while True:
+                    if not self._pending:
+                        # 空闲一段时间后退出，下次保存时重新启动
+                        if not self._cond.wait(5) and not self._pending:
+                            self._writer = None
+                            return
+                        continue
+                    now = time.monotonic()
+                    filepath, (text, due, version) = min(self._pending.items(), key=lambda item: item[1][1])
+                    if due <= now:
+                        del self._pending[filepath]
+                        self._writing[filepath] = self._writing.get(filepath, 0) + 1
+                        break
+                    self._cond.wait(due - now)
+            self._write_file_safely(filepath, text, version)
+
+    def _write_file_safely(self, filepath, text, version):
+        try:
+            self._write_file(filepath, text, version)
+        except Exception as e:
+            # 延迟写盘失败时无法返回给调用方，只能记录
+            LoggerManager().get_logger(__name__).error(f"写入 {filepath} 失败: {e}")
+
+    def _write_file(self, filepath, text, version):
+        """先写临时文件再替换目标文件，并记录新文件的修改时间供 load 校验缓存"""
+        try:
+            with self._write_lock:
+                if version <= self._written.get(filepath, 0):
+                    # 更新的版本已经写入（flush与后台线程同时写同一文件）
+                    return
+                directory = os.path.dirname(filepath)
+                if directory not in self._directories:
+                    os.makedirs(directory, exist_ok=True)
+                    self._directories.add(directory)
+                fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filepath) + ".", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        f.write(text)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(temp_path, filepath)
+                except BaseException:
+                    try:
+                        os.remove(temp_path)
+                    except OSError:
+                        pass
+                    raise
+                self._written[filepath] = version
+                stat = os.stat(filepath)
+                with self._cond:
+                    # 写盘期间又有新的保存时保留新数据
+                    if self._versions.get(filepath) == version:
+                        self._cache[filepath] = (text, stat.st_mtime_ns, stat.st_size)
+        finally:
+            with self._cond:
+                self._writing[filepath] -= 1
+                if not self._writing[filepath]:
+                    del self._writing[filepath]
+                self._cond.notify_all()
@@ -0,0 +1,221 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from utils.path_utils import get_core_path
+
+DEFAULT_EXPORT_DIR = os.path.join(get_core_path(), "SECRETS", "traces")
+
+# 当前线程/上下文所属的trace，新线程不会继承，需要显式传递trace_id或使用 activate
+_current_trace = contextvars.ContextVar("chatdot_trace_id", default=None)
+
+
+class TraceManager:
+    """
+    轻量级耗时追踪（span）
+    - 每轮对话一个trace，trace_id 通过 contextvars 在同一线程的调用链中传递，
+      跨线程时由调用方捕获 current_trace_id() 后显式传入
+    - 时间使用 time.monotonic()，导出时换算为相对trace开始的毫秒数
+    - 已结束的span存放在定长环形缓冲区中，只做 deque.append，可以在音频回调中调用
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:
+                    cls._instance = super(TraceManager, cls).__new__(cls)
+                    cls._instance.enabled = True
+                    cls._instance._spans = deque(maxlen=4096)
+                    cls._instance._traces = deque(maxlen=64)  # 最近的trace（根span信息）
+        return cls._instance
+
+    def configure(self, enabled: bool = None, capacity: int = None, max_traces: int = None):
+        """
+        调整设置
+        :param enabled: 是否记录
+        :param capacity: 环形缓冲区保存的span数
+        :param max_traces: 保留的trace数
+        """
+        if enabled is not None:
+            self.enabled = enabled
+        if capacity is not None:
+            self._spans = deque(self._spans, maxlen=capacity)
+        if max_traces is not None:
+            self._traces = deque(self._traces, maxlen=max_traces)
+
+    #region 记录
+    def start_trace(self, name: str, **attrs) -> tuple:
+        """
+        开始一个trace并设为当前trace
+        :param name: 名称，例如 chat.turn
+        :param attrs: 附加属性
+        :return: (trace_id, token)，不再需要当前trace时用 reset(token) 恢复之前的值
+        """
+        trace_id = uuid.uuid4().hex[:16]
+        if self.enabled:
+            self._traces.append({"trace_id": trace_id, "name": name, "start": time.monotonic(),
+                                 "wall_time": time.time(), "end": None, "attrs": attrs})
+        return trace_id, _current_trace.set(trace_id)
+
+    def reset(self, token):
+        """
+        恢复 start_trace 之前的当前trace
+        :param token: start_trace 返回的token
+        """
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # token在其他上下文中创建
+            pass
+
+    def end_trace(self, trace_id: str = None, **attrs):
+        """
+        结束trace
+        :param trace_id: 默认为当前trace
+        :param attrs: 追加的属性
+        """
+        trace_id = trace_id or _current_trace.get()
+        for trace in reversed(self._traces):
+            if trace["trace_id"] == trace_id:
+                if trace["end"] is None:
+                    trace["end"] = time.monotonic()
+                trace["attrs"].update(attrs)
+                return
+
+    def current_trace_id(self):
+        """
+        当前上下文的trace_id，没有时为None
+        """
+        return _current_trace.get()
+
+    @contextmanager
+    def activate(self, trace_id: str):
+        """
+        在代码块中把 trace_id 设为当前trace（用于其他线程或生成器中）
+        """
+        token = _current_trace.set(trace_id)
+        try:
+            yield trace_id
+        finally:
+            try:
+                _current_trace.reset(token)
+            except ValueError:
+                # 生成器在其他上下文中被关闭
+                pass
+
+    @contextmanager
+    def span(self, name: str, trace_id: str = None, **attrs):
+        """
+        记录代码块的耗时
+        :param name: 名称，按 模块.操作 命名，例如 llm.request
+        :param trace_id: 默认为当前trace，没有trace时不记录
+        :param attrs: 附加属性
+        :return: 属性字典，代码块中可以继续添加属性
+        """
+        trace_id = trace_id or _current_trace.get()
+        start = time.monotonic()
+        try:
+            yield attrs
+        finally:
+            if trace_id:
+                self.record(name, start, time.monotonic(), trace_id=trace_id, **attrs)
+
+    def record(self, name: str, start: float, end: float = None, trace_id: str = None, **attrs):
+        """
+        记录一个已经结束的span，end为None时记为瞬时事件
+        :param name: 名称
+        :param start: 开始时间(time.monotonic)
+        :param end: 结束时间(time.monotonic)
+        :param trace_id: 默认为当前trace，没有trace时不记录
+        :param attrs: 附加属性
+        """
+        trace_id = trace_id or _current_trace.get()
+        if not self.enabled or not trace_id:
+            return
+        self._spans.append({"trace_id": trace_id, "name": name, "start": start,
+                            "end": start if end is None else end,
+                            "thread": threading.current_thread().name, "attrs": attrs})
+
+    def event(self, name: str, trace_id: str = None, **attrs):
+        """
+        记录当前时刻的瞬时事件，例如首个token到达
+        """
+        self.record(name, time.monotonic(), trace_id=trace_id, **attrs)
+    #endregion
+
+    #region 查询与导出
+    def get_trace(self, trace_id: str):
+        """
+        获取一个trace的瀑布图数据
+        :param trace_id: trace_id
+        :return: {"trace_id", "name", "wall_time", "duration_ms", "attrs", "spans": [...]}，
+                 span的 start_ms/duration_ms 相对trace开始；不存在时返回None
+        """
+        root = next((t for t in reversed(self._traces) if t["trace_id"] == trace_id), None)
+        if root is None:
+            return None
+        spans = sorted((s for s in list(self._spans) if s["trace_id"] == trace_id), key=lambda s: s["start"])
+        end = root["end"] or max([s["end"] for s in spans] + [root["start"]])
+        return {
+            "trace_id": trace_id,
+            "name": root["name"],
+            "wall_time": root["wall_time"],
+            "duration_ms": round((end - root["start"]) * 1000, 2),
+            "finished": root["end"] is not None,
+            "attrs": dict(root["attrs"]),
+            "spans": [{
+                "name": s["name"],
+                "start_ms": round((s["start"] - root["start"]) * 1000, 2),
+                "duration_ms": round((s["end"] - s["start"]) * 1000, 2),
+                "thread": s["thread"],
+                "attrs": dict(s["attrs"]),
+            } for s in spans],
+        }
+
+    def get_recent_traces(self, count: int = 10) -> list:
+        """
+        获取最近的trace
+        :param count: 数量
+        :return: get_trace 的结果列表，按时间先后排列
+        """
+        roots = list(self._traces)[-count:]
+        return [trace for trace in (self.get_trace(t["trace_id"]) for t in roots) if trace]
+
+    def export(self, path: str = None, count: int = 10) -> str:
+        """
+        导出最近的trace为JSON文件
+        :param path: 文件路径，默认保存到 SECRETS/traces 下按时间命名
+        :param count: 导出的trace数
+        :return: 文件路径
+        """
+        if path is None:
+            path = os.path.join(DEFAULT_EXPORT_DIR, time.strftime("trace-%Y%m%d-%H%M%S.json"))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.get_recent_traces(count), f, ensure_ascii=False, indent=2, default=str)
+        return path
+
+    @staticmethod
+    def format_waterfall(trace: dict, width: int = 40) -> str:
+        """
+        把trace格式化为文本瀑布图
+        :param trace: get_trace 的结果
+        :param width: 时间轴宽度(字符)
+        :return: 多行文本
+        """
+        total = max(trace["duration_ms"], max([s["start_ms"] + s["duration_ms"] for s in trace["spans"]] + [0]))
+        scale = width / total if total else 0
+        lines = [f"{trace['name']} {trace['trace_id']}  {trace['duration_ms']:.1f}ms"]
+        for s in trace["spans"]:
+            offset = int(s["start_ms"] * scale)
+            bar = "|" if not s["duration_ms"] else "█" * max(1, int(s["duration_ms"] * scale))
+            lines.append(f"  {s['name']:<24}{' ' * offset}{bar:<{width - offset + 1}} "
+                         f"{s['start_ms']:>8.1f}ms +{s['duration_ms']:.1f}ms")
+        return "\n".join(lines)
+    #endregion
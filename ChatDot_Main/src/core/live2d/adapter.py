@@ -1,14 +1,34 @@
+import time
 import requests
 from global_managers.logger_manager import LoggerManager
+from live2d.transport import ChunkedHttpTransport, WebSocketTransport
+
+logger = LoggerManager().get_logger(__name__)
 
 class Live2DAdapter:
-    def __init__(self, server_url: str = None, enable_emotion: bool = True):
+    def __init__(self, server_url: str = None, enable_emotion: bool = True, timeout: float = 2.0,
+                 transport: str = "http", stream_url: str = None, retry_interval: float = 30.0,
+                 emotion_engine=None):
         """
         初始化 Live2D 客户端
         :param server_url: Live2D 后端的服务器地址（可选）
         :param enable_emotion: 是否启用情感分析
+        :param timeout: 请求超时时间(秒)
+        :param transport: 传输方式 http / websocket / chunked
+        :param stream_url: 流式传输地址，默认由 server_url 推导
+        :param retry_interval: 流式传输失败后回退到 HTTP 的时长(秒)
+        :param emotion_engine: 本地情感分析引擎，设置后只向后端发送情感变化 {"emotion": ...}
         """
         self.server_url = server_url
+        self.timeout = timeout
+        # 复用 TCP 连接，避免每个文本块都重新建立连接
+        self.session = requests.Session()
+        self.transport = transport
+        self.stream_url = stream_url
+        self.retry_interval = retry_interval
+        self.stream = None  # 流式传输通道，延迟创建
+        self._stream_disabled_until = 0.0
+        self.emotion_engine = emotion_engine
 
     def set_server_url(self, server_url: str):
         """
@@ -16,33 +36,122 @@ class Live2DAdapter:
         :param server_url: Live2D 后端的服务器地址
         """
         self.server_url = server_url
+        self._close_stream()
+
+    def _get_stream(self):
+        """
+        获取流式传输通道，使用 HTTP 或处于回退期时返回 None
+        """
+        if self.transport not in ("websocket", "chunked") or not self.server_url:
+            return None
+        if time.monotonic() < self._stream_disabled_until:
+            return None
+        if self.stream is None:
+            if self.transport == "websocket":
+                url = self.stream_url or self.server_url.replace("http", "ws", 1)
+                self.stream = WebSocketTransport(url, timeout=self.timeout)
+            else:
+                url = self.stream_url or self.server_url
+                self.stream = ChunkedHttpTransport(url, self.session, timeout=self.timeout)
+        return self.stream
+
+    def _close_stream(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def send_stream(self, text: str):
+        """
+        通过流式通道发送增量文本，空字符串表示本轮回复结束
+        流式通道不可用时回退到逐块 HTTP 请求
+        :param text: 增量文本
+        :return: 是否发送成功
+        """
+        if self.emotion_engine:
+            return self.emotion_to_live2d(text)
+
+        stream = self._get_stream()
+        if stream is None:
+            return self.text_to_live2d(text)
+
+        ok = stream.end_response() if text == "" else stream.send_chunk(text)
+        if ok:
+            return True
+
+        logger.warning(
+            f"Live2D {self.transport} 传输不可用，{self.retry_interval}秒内回退到 HTTP")
+        self._stream_disabled_until = time.monotonic() + self.retry_interval
+        pending = "".join(stream.drain_unsent())
+        self._close_stream()
+        if text:
+            return self.text_to_live2d(pending + text)
+        if pending:
+            self.text_to_live2d(pending)
+        return self.text_to_live2d("")
+
+    def reset_response(self):
+        """
+        丢弃本轮回复中尚未处理的文本（回复被打断时调用）
+        """
+        if self.emotion_engine:
+            self.emotion_engine.reset()
 
     def text_to_live2d(self, text: str):
         """
         接收文本并发送到 Live2D 后端
         :param text: 输入的文本
+        :return: 是否发送成功
         """
         if not self.server_url:
-            LoggerManager().get_logger().warning("警告: Live2D 后端 URL 未设置，无法处理请求")
-            return
+            logger.warning("警告: Live2D 后端 URL 未设置，无法处理请求")
+            return False
 
-        try:
-            #直接发送给后端
+        #直接发送给后端
+        return self._post({"chunk": text})
+
+    def emotion_to_live2d(self, text: str):
+        """
+        在本地分析情感，只把情感变化发送到 Live2D 后端
+        :param text: 增量文本，空字符串表示本轮回复结束
+        :return: 是否发送成功
+        """
+        if not self.server_url:
+            logger.warning("警告: Live2D 后端 URL 未设置，无法处理请求")
+            return False
+
+        ok = True
+        for emotion in self.emotion_engine.process(text, flush=(text == "")):
+            logger.debug("情感变化: %s", emotion)
+            ok = self._post({"emotion": emotion}) and ok
+        return ok
 
-            # 构造请求数据
-            payload = {"chunk": text}
-            LoggerManager().get_logger().debug(f"发送数据到 Live2D 后端: {payload}")
+    def _post(self, payload: dict):
+        """
+        发送 POST 请求到 Live2D 后端
+        :param payload: 请求数据
+        :return: 是否发送成功
+        """
+        try:
+            logger.debug("发送数据到 Live2D 后端: %s", payload)
 
             # 发送 POST 请求到 Live2D 后端
-            response = requests.post(self.server_url, json=payload)
+            response = self.session.post(self.server_url, json=payload, timeout=self.timeout)
 
             # 检查响应状态
             if response.status_code == 200:
-                LoggerManager().get_logger().debug("成功发送数据到 Live2D 后端")
-            else:
-                LoggerManager().get_logger().warning(f"发送失败，状态码: {response.status_code}, 响应: {response.text}")
+                logger.debug("成功发送数据到 Live2D 后端")
+                return True
+            logger.warning(f"发送失败，状态码: {response.status_code}, 响应: {response.text}")
         except Exception as e:
-            LoggerManager().get_logger().warning(f"发送数据时发生错误: {e}")
+            logger.warning(f"发送数据时发生错误: {e}")
+        return False
+
+    def close(self):
+        """
+        关闭连接
+        """
+        self._close_stream()
+        self.session.close()
 
 # 示例用法
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+import queue
+import threading
+import time
+from global_managers.logger_manager import LoggerManager
+from global_managers.trace_manager import TraceManager
+
+_FLUSH = object()  # 立即发送缓冲内容并发送结束块
+_STOP = object()   # 停止后台线程
+_CANCEL = object() # 丢弃未发送的文本并结束本轮
+
+
+class Live2DDispatcher:
+    """
+    Live2D 文本块后台分发器
+    调用方只把文本块放入队列即可返回，后台线程在 window_ms 时间窗口内合并文本块，
+    再通过 send 函数一次发送，聊天流不会等待 Live2D 后端的网络往返
+    """
+    def __init__(self, send, window_ms: int = 50, max_chars: int = 200, max_queue: int = 1000, on_cancel=None):
+        """
+        :param send: 发送函数，接收合并后的文本，返回False表示发送失败
+        :param window_ms: 合并文本块的时间窗口(毫秒)
+        :param max_chars: 单次发送的最大字符数，达到后不再等待窗口结束
+        :param max_queue: 队列最大长度，后端不可用导致积压时丢弃新文本块
+        :param on_cancel: 取消时在后台线程中调用，用于清理发送端的状态
+        """
+        self.send = send
+        self.on_cancel = on_cancel
+        self.window_ms = window_ms
+        self.max_chars = max_chars
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._trace_id = None  # 最近提交的文本所属的trace
+        self.stats = {
+            "chunks": 0,       # 提交的文本块数
+            "sends": 0,        # 实际发送次数
+            "dropped": 0,      # 队列满时丢弃的文本块数
+            "cancelled": 0,    # 被打断而未发送的文本块数
+            "errors": 0,       # 发送失败次数
+            "send_time": 0.0,  # 发送总耗时(秒)
+        }
+
+    def start(self):
+        """
+        启动后台线程
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="Live2DDispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """
+        停止后台线程，已入队的文本会先发送完
+        :param timeout: 最长等待时间(秒)
+        """
+        if not self._thread:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def submit(self, text: str = None, flush: bool = False, trace_id: str = None):
+        """
+        提交文本块（不阻塞）
+        :param text: 文本块，None或空字符串表示不添加新文本
+        :param flush: 是否立即发送缓冲内容，并像以前一样发送一个空文本块表示本轮结束
+        :param trace_id: 所属的trace，发送耗时记录为 live2d.send
+        """
+        if trace_id:
+            self._trace_id = trace_id
+        if text:
+            self._put(text)
+            self.stats["chunks"] += 1
+        if flush:
+            self._put(_FLUSH)
+
+    def cancel(self):
+        """
+        打断本轮回复：丢弃尚未发送的文本块，然后发送结束块（不阻塞）
+        """
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put_nowait(_STOP)
+                return
+            if isinstance(item, str):
+                self.stats["cancelled"] += 1
+        self._put(_CANCEL)
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if item is _CANCEL:
+                self._cancel()
+                continue
+
+            parts = []
+            flush = item is _FLUSH
+            stop = False
+            cancel = False
+            if not flush:
+                parts.append(item)
+                # 在时间窗口内继续收集文本块
+                deadline = time.monotonic() + self.window_ms / 1000
+                size = len(item)
+                while size < self.max_chars:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is _CANCEL:
+                        cancel = True
+                        break
+                    if item is _FLUSH or item is _STOP:
+                        flush = True
+                        stop = item is _STOP
+                        break
+                    parts.append(item)
+                    size += len(item)
+
+            if cancel:
+                self.stats["cancelled"] += len(parts)
+                self._cancel()
+                continue
+            if parts:
+                self._send("".join(parts))
+            if flush and not stop:
+                self._send("")
+            if stop:
+                return
+
+    def _cancel(self):
+        if self.on_cancel:
+            try:
+                self.on_cancel()
+            except Exception as e:
+                LoggerManager().get_logger().warning(f"Live2D 取消处理失败: {e}")
+        self._send("")
+
+    def _send(self, text: str):
+        start_time = time.time()
+        span_start = time.monotonic()
+        try:
+            ok = self.send(text)
+            self.stats["sends"] += 1
+            if ok is False:
+                self.stats["errors"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            LoggerManager().get_logger().warning(f"Live2D 分发失败: {e}")
+        finally:
+            self.stats["send_time"] += time.time() - start_time
+            TraceManager().record("live2d.send", span_start, time.monotonic(), trace_id=self._trace_id, chars=len(text))
+
+    def get_stats(self) -> dict:
+        """
+        获取分发统计信息
+        :return: 文本块数、发送次数、合并比例、平均发送耗时(毫秒)等
+        """
+        stats = dict(self.stats)
+        stats["pending"] = self._queue.qsize()
+        stats["coalesce_ratio"] = stats["chunks"] / stats["sends"] if stats["sends"] else 0.0
+        stats["avg_send_ms"] = stats["send_time"] * 1000 / stats["sends"] if stats["sends"] else 0.0
+        return stats
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from global_managers.logger_manager import LoggerManager
+
+MODEL_NAME = "SchuylerH/bert-multilingual-go-emtions"
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "models", "bert-multilingual-go-emtions")
+
+# 句末标点，在此处切分句子
+_SENTENCE_END = re.compile(r"[^。！？!?；;…\n]*[。！？!?；;…\n]+")
+
+
+class EmotionEngine:
+    """
+    本地情感分析引擎
+    - 按句子粒度分析，一次前向推理处理一批句子
+    - CPU 推理，优先使用 ONNX 导出模型，否则使用动态量化(int8)的 PyTorch 模型
+    - 按句子哈希缓存结果，相同句子不重复推理
+    - 只在情感发生变化时返回新的情感，减少发往后端的请求
+    """
+    def __init__(self, backend: str = "onnx", num_threads: int = 2, cache_size: int = 1024,
+                 max_length: int = 128):
+        """
+        :param backend: 推理后端 onnx / torch
+        :param num_threads: CPU 推理线程数
+        :param cache_size: 句子结果缓存数量
+        :param max_length: 单句最大 token 数
+        """
+        self.backend = backend
+        self.num_threads = num_threads
+        self.cache_size = cache_size
+        self.max_length = max_length
+        self.tokenizer = None
+        self.model = None
+        self.labels = {}
+        self._cache = OrderedDict()
+        self._buffer = ""
+        self.last_emotion = None
+        self._ready = threading.Event()
+        self.stats = {"sentences": 0, "cache_hits": 0, "batches": 0, "transitions": 0}
+        threading.Thread(target=self._initialize_model, daemon=True).start()  # 异步加载模型
+
+    def _initialize_model(self):
+        """
+        异步加载模型，首次使用时下载到本地
+        """
+        try:
+            LoggerManager().get_logger().debug("正在初始化情感分析模型...")
+            import torch
+            from transformers import AutoTokenizer, AutoModelForSequenceClassification
+            torch.set_num_threads(self.num_threads)
+
+            if not os.path.exists(os.path.join(MODEL_DIR, "config.json")):
+                LoggerManager().get_logger().debug("正在下载模型到本地，首次下载可能需要几分钟...")
+                os.makedirs(MODEL_DIR, exist_ok=True)
+                AutoTokenizer.from_pretrained(MODEL_NAME).save_pretrained(MODEL_DIR)
+                AutoModelForSequenceClassification.from_pretrained(MODEL_NAME).save_pretrained(MODEL_DIR)
+
+            self.tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
+            model = None
+            if self.backend == "onnx":
+                try:
+                    from optimum.onnxruntime import ORTModelForSequenceClassification
+                    onnx_dir = os.path.join(MODEL_DIR, "onnx")
+                    if os.path.exists(os.path.join(onnx_dir, "model.onnx")):
+                        model = ORTModelForSequenceClassification.from_pretrained(onnx_dir)
+                    else:
+                        model = ORTModelForSequenceClassification.from_pretrained(MODEL_DIR, export=True)
+                        model.save_pretrained(onnx_dir)
+                except ImportError:
+                    LoggerManager().get_logger().warning("未安装 optimum[onnxruntime]，改用量化的 PyTorch 模型")
+            if model is None:
+                model = AutoModelForSequenceClassification.from_pretrained(MODEL_DIR)
+                model.eval()
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+            self.model = model
+            self.labels = model.config.id2label
+            LoggerManager().get_logger().debug("情感分析模型初始化完成")
+        except Exception as e:
+            LoggerManager().get_logger().warning(f"情感分析模型初始化失败: {e}")
+        finally:
+            self._ready.set()
+
+    def is_ready(self) -> bool:
+        """
+        模型是否可用
+        """
+        return self._ready.is_set() and self.model is not None
+
+    def split_sentences(self, text: str, flush: bool = False) -> list:
+        """
+        累积文本并切出完整的句子
+        :param text: 新的文本块
+        :param flush: 是否把剩余的不完整句子也切出
+        :return: 句子列表
+        """
+        self._buffer += text
+        sentences = []
+        end = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            sentence = match.group().strip()
+            if sentence:
+                sentences.append(sentence)
+            end = match.end()
+        self._buffer = self._buffer[end:]
+        if flush:
+            if self._buffer.strip():
+                sentences.append(self._buffer.strip())
+            self._buffer = ""
+        return sentences
+
+    def classify(self, sentences: list) -> list:
+        """
+        批量分析句子情感
+        :param sentences: 句子列表
+        :return: 情感标签列表，模型不可用时为空
+        """
+        if not sentences or not self.is_ready():
+            return []
+
+        results = [None] * len(sentences)
+        pending = {}
+        for index, sentence in enumerate(sentences):
+            key = hashlib.sha1(sentence.encode("utf-8")).hexdigest()
+            label = self._cache.get(key)
+            if label is not None:
+                self._cache.move_to_end(key)
+                results[index] = label
+                self.stats["cache_hits"] += 1
+            else:
+                pending.setdefault(key, (sentence, []))[1].append(index)
+        self.stats["sentences"] += len(sentences)
+
+        if pending:
+            import torch
+            keys = list(pending)
+            inputs = self.tokenizer([pending[key][0] for key in keys], padding=True, truncation=True,
+                                    max_length=self.max_length, return_tensors="pt")
+            with torch.no_grad():
+                logits = self.model(**inputs).logits
+            self.stats["batches"] += 1
+            for key, label_id in zip(keys, logits.argmax(dim=-1).tolist()):
+                label = self.labels.get(label_id, "neutral")
+                for index in pending[key][1]:
+                    results[index] = label
+                self._cache[key] = label
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
+
+    def reset(self):
+        """
+        丢弃未完成的句子（回复被打断时调用）
+        """
+        self._buffer = ""
+
+    def process(self, text: str, flush: bool = False) -> list:
+        """
+        处理文本块，返回需要发送的情感变化
+        :param text: 新的文本块
+        :param flush: 是否处理剩余的不完整句子（一轮回复结束时）
+        :return: 情感变化列表，只包含与上一个情感不同的标签
+        """
+        transitions = []
+        for emotion in self.classify(self.split_sentences(text, flush)):
+            if emotion != self.last_emotion:
+                self.last_emotion = emotion
+                transitions.append(emotion)
+        self.stats["transitions"] += len(transitions)
+        return transitions
+
+    def get_stats(self) -> dict:
+        """
+        获取统计信息
+        :return: 句子数、缓存命中数、推理批次数、情感变化数
+        """
+        return dict(self.stats)
@@ -1,19 +1,23 @@
-import asyncio
 from live2d.adapter import Live2DAdapter
+from live2d.dispatcher import Live2DDispatcher
+from live2d.emotion import EmotionEngine
 from live2d.settings import Live2DSettings
 from live2d.persistence import Live2DPersistence
 from global_managers.logger_manager import LoggerManager
+from global_managers.trace_manager import TraceManager
 
 class Live2DService:
     """
     Live2D 服务类
-    使用异步方式调用 Live2DAdapter 的功能，但提供同步接口
+    文本块交给后台分发器合并后发送，提供不阻塞的同步接口
     """
     def __init__(self):
         self._initialized = False  # 初始化标记
         self.settings = Live2DSettings()
         self.persistence = Live2DPersistence()
         self.adapter = None  # 延迟初始化
+        self.dispatcher = None  # 延迟初始化
+        self.emotion_engine = None  # 本地情感分析，模型常驻，禁用/重新启用服务时复用
 
     def initialize(self):
         """
@@ -36,7 +40,19 @@ class Live2DService:
         # 设置客户端 URL 和情感分析状态
         url = self.settings.get_setting("url")
         enable_emotion = self.settings.get_setting("initialize")
-        self.adapter = Live2DAdapter(server_url=url, enable_emotion=enable_emotion)
+        if self.settings.get_setting("local_emotion") and self.emotion_engine is None:
+            self.emotion_engine = EmotionEngine(backend=self.settings.get_setting("emotion_backend"),
+                                                num_threads=self.settings.get_setting("emotion_threads"))
+        self.adapter = Live2DAdapter(server_url=url, enable_emotion=enable_emotion,
+                                     timeout=self.settings.get_setting("request_timeout"),
+                                     transport=self.settings.get_setting("transport"),
+                                     stream_url=self.settings.get_setting("stream_url"),
+                                     retry_interval=self.settings.get_setting("stream_retry_interval"),
+                                     emotion_engine=self.emotion_engine if self.settings.get_setting("local_emotion") else None)
+        self.dispatcher = Live2DDispatcher(self.adapter.send_stream,
+                                           window_ms=self.settings.get_setting("dispatch_window_ms"),
+                                           on_cancel=self.adapter.reset_response)
+        self.dispatcher.start()
 
         if url:
             self.adapter.set_server_url(url)
@@ -59,26 +75,15 @@ class Live2DService:
         """
         self.adapter.set_server_url(server_url)
         self.settings.update_setting("url", server_url)
-        self.persistence.save_config({
-            "url": server_url,
-            "initialize": self.settings.get_setting("initialize")
-        })
-
-    async def _text_to_live2d_async(self, text: str):
-        """
-        异步处理文本并调用 Live2DAdapter 的 text_to_live2d 方法
-        :param text: 输入的文本
-        """
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self.adapter.text_to_live2d, text)
+        self.save_config()
 
-    def text_to_live2d(self, text: str):
+    def _submit(self, text: str = None, flush: bool = False):
         """
-        此方法不会阻塞主线程
-        同步处理文本并调用 Live2DAdapter 的 text_to_live2d 方法
+        检查状态后把文本交给分发器
         :param text: 输入的文本
+        :param flush: 是否立即发送并结束本轮
         """
-        if not self.settings.get_setting("initialize"):
+        if not self.settings.get_setting("initialize") or not self.dispatcher:
             LoggerManager().get_logger().warning("Live2D 未初始化，无法处理请求")
             return
 
@@ -87,17 +92,46 @@ class Live2DService:
             LoggerManager().get_logger().warning("警告: Live2D URL 未设置，无法处理请求")
             return
 
-        asyncio.run(self._text_to_live2d_async(text))
+        self.dispatcher.submit(text, flush=flush, trace_id=TraceManager().current_trace_id())
+
+    def text_to_live2d(self, text: str):
+        """
+        此方法不会阻塞主线程
+        把文本交给后台分发器发送
+        :param text: 输入的文本
+        """
+        self._submit(text)
         
     def realtime_text_to_live2d(self, text_chunk=None, force_process=False):
         """
-        实时文本转live2d处理,直接发送给live2d后端而不做处理
+        实时文本转live2d处理,文本块在后台按时间窗口合并后发送给live2d后端，不阻塞调用方
         
         Args:
             text_chunk: 新的文本块，None表示不添加新文本
             force_process: 是否强制处理缓冲区中的所有文本，不论是否遇到标点
         """
-        self.text_to_live2d(text_chunk if text_chunk is not None else "")
+        self._submit(text_chunk, flush=force_process)
+
+    def cancel(self):
+        """
+        打断本轮回复，丢弃尚未发送的文本，不阻塞调用方
+        """
+        if self.dispatcher:
+            self.dispatcher.cancel()
+
+    def get_dispatch_stats(self) -> dict:
+        """
+        获取分发统计信息
+        :return: 分发器统计，未初始化时为空字典
+        """
+        return self.dispatcher.get_stats() if self.dispatcher else {}
+
+    def get_emotion_stats(self) -> dict:
+        """
+        获取本地情感分析统计信息
+        :return: 情感引擎统计，未启用时为空字典
+        """
+        return self.emotion_engine.get_stats() if self.emotion_engine else {}
 
     def save_config(self):
         """
@@ -105,7 +139,15 @@ class Live2DService:
         """
         config = {
             "url": self.settings.get_setting("url"),
-            "initialize": self.settings.get_setting("initialize")
+            "initialize": self.settings.get_setting("initialize"),
+            "dispatch_window_ms": self.settings.get_setting("dispatch_window_ms"),
+            "request_timeout": self.settings.get_setting("request_timeout"),
+            "transport": self.settings.get_setting("transport"),
+            "stream_url": self.settings.get_setting("stream_url"),
+            "stream_retry_interval": self.settings.get_setting("stream_retry_interval"),
+            "local_emotion": self.settings.get_setting("local_emotion"),
+            "emotion_backend": self.settings.get_setting("emotion_backend"),
+            "emotion_threads": self.settings.get_setting("emotion_threads")
         }
         self.persistence.save_config(config)
 
@@ -123,11 +165,24 @@ class Live2DService:
                 self.initialize()
             else:  # 如果禁用
                 LoggerManager().get_logger().debug("正在禁用 Live2D 服务...")
-                self.adapter = None  # 清理客户端实例
+                self._close()
                 self._initialized = False
 
+    def _close(self):
+        """
+        停止分发器并清理客户端实例
+        """
+        if self.dispatcher:
+            self.dispatcher.stop()
+            self.dispatcher = None
+        if self.adapter:
+            self.adapter.close()
+            self.adapter = None
+
     def shutdown(self):
         """
         关闭服务（可选）
         """
+        self._close()
+        self._initialized = False
         LoggerManager().get_logger().debug("Live2DService 已关闭")
\ No newline at end of file
@@ -3,7 +3,15 @@ from global_managers.logger_manager import LoggerManager
 
 DEFAULT_LIVE2D_SETTINGS = {
     "url": None,  # Live2D 后端的 URL，默认为 None
-    "initialize": True  # 是否初始化 Live2D，默认为 True
+    "initialize": True,  # 是否初始化 Live2D，默认为 True
+    "dispatch_window_ms": 50,  # 合并文本块的时间窗口(毫秒)
+    "request_timeout": 2.0,  # 请求超时时间(秒)
+    "transport": "http",  # 传输方式: http(每块一个请求) / websocket / chunked(分块 HTTP)
+    "stream_url": None,  # 流式传输地址，默认由 url 推导
+    "stream_retry_interval": 30,  # 流式传输失败后回退到 HTTP 的时长(秒)
+    "local_emotion": False,  # 在本地分析情感，只向后端发送情感变化 {"emotion": ...}
+    "emotion_backend": "onnx",  # 情感模型推理后端: onnx / torch(动态量化)
+    "emotion_threads": 2  # 情感模型 CPU 推理线程数
 }
 
 class Live2DSettings:
@@ -0,0 +1,172 @@
+import json
+import queue
+import threading
+from global_managers.logger_manager import LoggerManager
+
+
+class StreamTransport:
+    """
+    Live2D 流式传输基类
+    一轮回复期间保持一个通道，逐块发送增量文本，回复结束时发送结束标记
+    """
+    def send_chunk(self, text: str) -> bool:
+        """
+        发送增量文本
+        :param text: 文本块
+        :return: 是否发送成功，失败时由调用方回退到 HTTP
+        """
+        raise NotImplementedError
+
+    def end_response(self) -> bool:
+        """
+        发送本轮回复的结束标记
+        :return: 是否发送成功
+        """
+        raise NotImplementedError
+
+    def drain_unsent(self) -> list:
+        """
+        取出因通道故障未能发出的文本块，供调用方用 HTTP 补发
+        :return: 文本块列表
+        """
+        return []
+
+    def close(self):
+        """
+        关闭通道
+        """
+        pass
+
+
+class WebSocketTransport(StreamTransport):
+    """
+    WebSocket 传输
+    连接在多轮回复之间复用；消息格式:
+        {"type": "chunk", "text": "..."}  增量文本
+        {"type": "end"}                   回复结束
+    """
+    def __init__(self, url: str, timeout: float = 2.0):
+        """
+        :param url: WebSocket 地址 (ws:// 或 wss://)
+        :param timeout: 连接超时时间(秒)
+        """
+        self.url = url
+        self.timeout = timeout
+        self._ws = None
+
+    def _connect(self):
+        if self._ws is None:
+            from websockets.sync.client import connect
+            self._ws = connect(self.url, open_timeout=self.timeout)
+            LoggerManager().get_logger().debug(f"已连接 Live2D WebSocket: {self.url}")
+        return self._ws
+
+    def _send(self, message: dict) -> bool:
+        try:
+            self._connect().send(json.dumps(message, ensure_ascii=False))
+            return True
+        except Exception as e:
+            LoggerManager().get_logger().warning(f"Live2D WebSocket 发送失败: {e}")
+            self.close()
+            return False
+
+    def send_chunk(self, text: str) -> bool:
+        return self._send({"type": "chunk", "text": text})
+
+    def end_response(self) -> bool:
+        return self._send({"type": "end"})
+
+    def close(self):
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+            self._ws = None
+
+
+class ChunkedHttpTransport(StreamTransport):
+    """
+    分块 HTTP 传输
+    每轮回复发起一个 Transfer-Encoding: chunked 的 POST 请求，请求体为逐行 JSON (NDJSON):
+        {"chunk": "..."}  增量文本
+        {"end": true}     回复结束
+    回复结束后请求体结束，等待后端响应
+    """
+    def __init__(self, url: str, session, timeout: float = 2.0):
+        """
+        :param url: 流式接口地址
+        :param session: requests.Session
+        :param timeout: 连接/响应超时时间(秒)
+        """
+        self.url = url
+        self.session = session
+        self.timeout = timeout
+        self._queue = None
+        self._thread = None
+        self._failed = False
+        self._ok = False
+
+    def _open(self):
+        self._queue = queue.Queue()
+        self._failed = False
+        self._ok = False
+        self._thread = threading.Thread(target=self._post, args=(self._queue,),
+                                        name="Live2DChunkedHttp", daemon=True)
+        self._thread.start()
+
+    def _post(self, lines: queue.Queue):
+        def body():
+            while True:
+                item = lines.get()
+                if item is None:
+                    return
+                yield (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+
+        try:
+            response = self.session.post(self.url, data=body(), timeout=self.timeout,
+                                         headers={"Content-Type": "application/x-ndjson"})
+            self._ok = response.status_code == 200
+            if not self._ok:
+                LoggerManager().get_logger().warning(f"Live2D 流式请求失败，状态码: {response.status_code}")
+        except Exception as e:
+            LoggerManager().get_logger().warning(f"Live2D 流式请求失败: {e}")
+        if not self._ok:
+            self._failed = True
+
+    def send_chunk(self, text: str) -> bool:
+        if self._thread is None:
+            self._open()
+        if self._failed:
+            return False
+        self._queue.put({"chunk": text})
+        return True
+
+    def end_response(self) -> bool:
+        if self._thread is None:
+            return True
+        if not self._failed:
+            self._queue.put({"end": True})
+        self._queue.put(None)
+        self._thread.join(timeout=self.timeout * 2)
+        ok = self._ok and not self._thread.is_alive()
+        self._thread = None
+        return ok
+
+    def drain_unsent(self) -> list:
+        texts = []
+        if self._queue is not None:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item and "chunk" in item:
+                    texts.append(item["chunk"])
+        return texts
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=self.timeout)
+            self._thread = None
@@ -10,6 +10,7 @@ DEFAULT_SETTINGS = {
     "enabled": False,  # 服务启用状态
     "embedding": {
         "mode": "local",  # local 或 api
+        "cache_size": 256,  # 查询嵌入的LRU缓存条数，0为不缓存（预取与正式检索常使用同一查询）
         "local_model": {
             "model_name": "all-MiniLM-L6-v2",
             "cache_dir": os.path.join(get_core_path(), "rag", "models")
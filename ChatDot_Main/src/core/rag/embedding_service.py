@@ -1,10 +1,13 @@
 from sentence_transformers import SentenceTransformer
 from global_managers.logger_manager import LoggerManager
+from global_managers.metrics_manager import MetricsManager
 from .config import get_embedding_settings, get_api_key
 import os
 import requests
 import json
+import threading
 import time
+from collections import OrderedDict
 
 class EmbeddingService:
     _instance = None
@@ -16,6 +19,13 @@ class EmbeddingService:
             cls._instance.settings = get_embedding_settings()
             cls._instance.mode = cls._instance.settings["mode"]
             cls._instance.model = None
+            cls._instance.cache_size = cls._instance.settings.get("cache_size", 256)
+            cls._instance._cache = OrderedDict()  # (模式, 文本): 向量
+            cls._instance._cache_lock = threading.Lock()
+            metrics = MetricsManager()
+            cls._instance._cache_hits = metrics.counter("embedding_cache_hits_total", "查询嵌入缓存命中次数")
+            cls._instance._cache_misses = metrics.counter("embedding_cache_misses_total", "查询嵌入缓存未命中次数")
+            metrics.gauge("embedding_cache_hit_ratio", "查询嵌入缓存命中率").set_function(cls._instance.get_cache_hit_ratio)
             cls._instance._initialize()
         return cls._instance
 
@@ -66,14 +76,38 @@ class EmbeddingService:
         if not text:
             self.logger.warning("尝试嵌入空文本")
             return None
+        
+        # 检索时传入的可能是消息列表，按规范化的JSON文本作为缓存键
+        key = (self.mode, text if isinstance(text, str) else json.dumps(text, ensure_ascii=False, sort_keys=True, default=str))
+        if self.cache_size:
+            with self._cache_lock:
+                embedding = self._cache.get(key)
+                if embedding is not None:
+                    self._cache.move_to_end(key)
+            if embedding is not None:
+                self._cache_hits.inc()
+                return embedding
+            self._cache_misses.inc()
             
         if self.mode == "local":
-            return self._local_embed_text(text)
+            embedding = self._local_embed_text(text)
         elif self.mode == "api":
-            return self._api_embed_text(text)
+            embedding = self._api_embed_text(text)
         else:
             self.logger.error(f"不支持的嵌入模式: {self.mode}")
             return None
+        
+        if embedding and self.cache_size:
+            with self._cache_lock:
+                self._cache[key] = embedding
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return embedding
+
+    def get_cache_hit_ratio(self) -> float:
+        """查询嵌入缓存命中率，尚无查询时为0"""
+        total = self._cache_hits.value + self._cache_misses.value
+        return self._cache_hits.value / total if total else 0.0
 
     def _local_embed_text(self, text: str) -> list[float] | None:
         """使用本地模型嵌入文本"""
@@ -2,6 +2,7 @@ from .embedding_service import get_embedding_service
 from .vector_store import VectorStore
 from .config import get_vector_store_settings, update_settings
 from global_managers.logger_manager import LoggerManager
+from global_managers.metrics_manager import MetricsManager
 from global_managers.service_manager import ServiceManager
 from global_managers.settings_manager import SettingsManager
 from global_managers.persistence_manager import PersistenceManager
@@ -320,14 +321,14 @@ class RAGService:
         if n_results is None:
             n_results = get_vector_store_settings()["search_results"]
 
-        # 生成查询嵌入
-        query_embedding = self.embedding_service.embed_text(query)
-        if not query_embedding:
-            self.logger.error("生成查询嵌入失败")
-            return ""
+        # 生成查询嵌入并搜索相似项
+        with MetricsManager().histogram("rag_retrieve_ms", "RAG检索耗时，含查询嵌入(毫秒)").time():
+            query_embedding = self.embedding_service.embed_text(query)
+            if not query_embedding:
+                self.logger.error("生成查询嵌入失败")
+                return ""
 
-        # 搜索相似项
-        similar_items = self.vector_store.search_similar(query_embedding, n_results=n_results)
+            similar_items = self.vector_store.search_similar(query_embedding, n_results=n_results)
 
         if not similar_items:
             self.logger.info(f"在集合 '{self.collection_name}' 中未找到相关记忆")
@@ -5,10 +5,12 @@ FunASR 客户端
 
 import asyncio
 import json
+import random
 import pyaudio
 import websockets
 import time
-from typing import Callable, List, Optional
+from collections import deque
+from typing import Callable, Iterable, List, Optional
 from global_managers.logger_manager import LoggerManager
 
 class STTAdapter:
@@ -16,6 +18,10 @@ class STTAdapter:
     STT客户端，处理与FunASR服务器的通信
     """
     
+    RATE = 16000
+    CHANNELS = 1
+    CHUNK_MS = 60  # 每个音频块的毫秒数
+    
     def __init__(self):
         """初始化STT客户端"""
         self.host = "localhost"
@@ -24,6 +30,20 @@ class STTAdapter:
         self.websocket = None
         self.is_running = False
         self.segment_callbacks: List[Callable[[str], None]] = []
+        self.partial_callbacks: List[Callable[[str], None]] = []
+        self.speech_start_callbacks: List[Callable[[], None]] = []
+        self._partial_text = ""  # 当前语句累计的2pass-online中间结果
+        self.frame_gate = None  # 可选的本地预VAD门控，见 set_frame_gate
+        self.echo_suppressor = None  # 可选的回声抑制，见 set_echo_suppressor
+        self.last_voice_time = 0.0  # 最近一次检测到语音的时间(time.monotonic)
+        self.is_paused = False
+        
+        # 会话参数，见 configure_session
+        self.reconnect_base_delay = 0.5
+        self.reconnect_max_delay = 10.0
+        self.max_buffered_ms = 3000
+        self._frame_queue: Optional[asyncio.Queue] = None
+        self._pending_frames: deque = deque()
         self.logger = LoggerManager().get_logger()
         
     def set_server(self, host: str, port: int, use_ssl: bool = False) -> None:
@@ -48,67 +68,205 @@ class STTAdapter:
         """
         self.segment_callbacks.append(callback)
 
-    async def record_microphone(self, websocket) -> None:
+    def add_partial_callback(self, callback: Callable[[str], None]) -> None:
         """
-        从麦克风录制音频并发送到服务器
+        添加中间结果回调函数
         
         Args:
-            websocket: WebSocket连接
+            callback: 回调函数，接收当前语句累计的中间识别文本（2pass-online）
         """
-        FORMAT = pyaudio.paInt16
-        CHANNELS = 1
-        RATE = 16000
-        CHUNK_MS = 60  # 每个音频块的毫秒数
-        CHUNK = int(RATE / 1000 * CHUNK_MS)
+        self.partial_callbacks.append(callback)
 
-        p = pyaudio.PyAudio()
-        stream = None
+    def add_speech_start_callback(self, callback: Callable[[], None]) -> None:
+        """
+        添加开始说话回调函数，用于打断正在进行的回复
+        有本地预VAD门控时在门控打开时触发，否则在一句话的第一个中间结果时触发
+        
+        Args:
+            callback: 无参数的回调函数，在事件循环中执行，不应阻塞
+        """
+        self.speech_start_callbacks.append(callback)
+
+    def _on_speech_start(self) -> None:
+        """通知开始说话"""
+        for callback in self.speech_start_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error(f"开始说话回调执行错误: {e}")
+
+    def set_frame_gate(self, gate) -> None:
+        """
+        设置本地预VAD门控，用于在客户端跳过静音帧
         
+        Args:
+            gate: 具有 process(frame: bytes) -> Iterable[bytes] 方法的对象，
+                  返回本帧对应需要发送的音频帧（可为空、也可包含缓存的预录帧）；
+                  None表示不过滤，所有帧都发送
+        """
+        self.frame_gate = gate
+
+    def set_echo_suppressor(self, suppressor) -> None:
+        """
+        设置回声抑制，在门控之前处理每一帧
+        
+        Args:
+            suppressor: 具有 process(frame: bytes) -> bytes 方法的对象，
+                        返回原始帧或等长静音；None表示不抑制
+        """
+        self.echo_suppressor = suppressor
+
+    def _gate_frames(self, frame: bytes) -> Iterable[bytes]:
+        """经过回声抑制和门控后需要发送的音频帧"""
+        if self.echo_suppressor is not None:
+            frame = self.echo_suppressor.process(frame)
+        if self.frame_gate is None:
+            return (frame,)
+        frames = self.frame_gate.process(frame)
+        if self.frame_gate.last_voiced:
+            self.last_voice_time = time.monotonic()
+        return frames
+
+    def configure_session(self, reconnect_base_delay: float = None, reconnect_max_delay: float = None,
+                          max_buffered_ms: int = None) -> None:
+        """
+        设置会话参数
+        
+        Args:
+            reconnect_base_delay: 重连初始等待时间(秒)
+            reconnect_max_delay: 重连最长等待时间(秒)
+            max_buffered_ms: 连接不可用时最多缓存的音频时长(毫秒)
+        """
+        if reconnect_base_delay is not None:
+            self.reconnect_base_delay = reconnect_base_delay
+        if reconnect_max_delay is not None:
+            self.reconnect_max_delay = reconnect_max_delay
+        if max_buffered_ms is not None:
+            self.max_buffered_ms = max_buffered_ms
+
+    def pause(self) -> None:
+        """暂停采集（连接与麦克风保持打开，恢复时无需重新建立）"""
+        if not self.is_paused:
+            self.is_paused = True
+            self.logger.debug("已暂停语音采集")
+
+    def resume(self) -> None:
+        """恢复采集"""
+        if self.is_paused:
+            self.is_paused = False
+            self.logger.debug("已恢复语音采集")
+
+    def _open_microphone(self, loop: asyncio.AbstractEventLoop):
+        """
+        打开麦克风（回调模式），采集到的音频帧放入 self._frame_queue
+        
+        麦克风在整个会话期间保持打开，断线重连时采集不中断，
+        重连期间的音频暂存在队列中，连接恢复后继续发送
+        
+        Returns:
+            tuple: (PyAudio实例, 音频流)
+        """
+        def enqueue_frame(data: bytes) -> None:
+            # 在事件循环线程中执行
+            if self._frame_queue.full():
+                self._frame_queue.get_nowait()  # 丢弃最旧的帧，保持实时性
+            self._frame_queue.put_nowait(data)
+        
+        def on_audio(in_data, frame_count, time_info, status):
+            # 在PortAudio线程中执行
+            if not self.is_running:
+                return (None, pyaudio.paComplete)
+            if not self.is_paused:
+                loop.call_soon_threadsafe(enqueue_frame, in_data)
+            return (None, pyaudio.paContinue)
+        
+        p = pyaudio.PyAudio()
         try:
-            # 打开麦克风流
             stream = p.open(
-                format=FORMAT,
-                channels=CHANNELS,
-                rate=RATE,
+                format=pyaudio.paInt16,
+                channels=self.CHANNELS,
+                rate=self.RATE,
                 input=True,
-                frames_per_buffer=CHUNK
+                frames_per_buffer=int(self.RATE / 1000 * self.CHUNK_MS),
+                stream_callback=on_audio
             )
-
-            # 发送初始配置消息
-            config = {
-                "mode": "2pass",
-                "chunk_size": [5, 10, 5],
-                "chunk_interval": 10,
-                "encoder_chunk_look_back": 4,
-                "decoder_chunk_look_back": 0,
-                "wav_name": "microphone",
-                "is_speaking": True,
-                "hotwords": "",
-                "itn": True
-            }
-            
-            await websocket.send(json.dumps(config))
-            self.logger.debug("已发送FunASR初始配置")
-
-            # 持续发送音频数据
-            while self.is_running:
-                if stream.is_stopped():
-                    stream.start_stream()
-                    
-                data = stream.read(CHUNK, exception_on_overflow=False)
-                if self.is_running:  # 避免在关闭后仍继续发送数据
-                    await websocket.send(data)
-                    
-                await asyncio.sleep(0.01)
-                
-        except Exception as e:
-            self.logger.error(f"录音错误: {e}")
-        finally:
-            if stream:
-                stream.stop_stream()
-                stream.close()
+        except Exception:
             p.terminate()
-            self.logger.debug("已停止录音")
+            raise
+        if stream.is_stopped():
+            stream.start_stream()
+        return p, stream
+
+    def _discard_buffered_audio(self) -> None:
+        """丢弃尚未发送的音频（暂停时调用，恢复后不会回放旧音频）"""
+        self._pending_frames.clear()
+        while not self._frame_queue.empty():
+            self._frame_queue.get_nowait()
+        if self.frame_gate is not None:
+            self.frame_gate.reset()
+
+    async def record_microphone(self, websocket) -> None:
+        """
+        将麦克风音频发送到服务器
+        
+        采集在PyAudio回调线程中完成，音频帧通过asyncio.Queue交给本协程发送，
+        事件循环不会因为读取麦克风而阻塞，发送与接收消息真正并发。
+        发送失败的帧保留在待发送队列中，重连后优先发送
+        
+        Args:
+            websocket: WebSocket连接
+        """
+        # 发送初始配置消息
+        config = {
+            "mode": "2pass",
+            "chunk_size": [5, 10, 5],
+            "chunk_interval": 10,
+            "encoder_chunk_look_back": 4,
+            "decoder_chunk_look_back": 0,
+            "wav_name": "microphone",
+            "is_speaking": True,
+            "hotwords": "",
+            "itn": True
+        }
+        
+        await websocket.send(json.dumps(config))
+        self.logger.debug("已发送FunASR初始配置")
+
+        # 服务器端的说话状态；暂停或门控关闭时通知服务器，使其及时结束当前语句
+        speaking = True
+        gate_open = False  # 本地门控上一次的状态，用于检测开始说话
+
+        # 持续发送音频数据
+        while self.is_running:
+            if not self._pending_frames:
+                try:
+                    data = await asyncio.wait_for(self._frame_queue.get(), timeout=0.2)
+                    self._pending_frames.extend(self._gate_frames(data))
+                except asyncio.TimeoutError:
+                    pass
+
+            if self.is_paused:
+                self._discard_buffered_audio()
+                want_speaking = False
+            elif self.frame_gate is not None:
+                want_speaking = self.frame_gate.is_open or bool(self._pending_frames)
+                if self.frame_gate.is_open and not gate_open:
+                    self._on_speech_start()
+            else:
+                want_speaking = True
+
+            if want_speaking and not speaking:
+                await websocket.send(json.dumps({"is_speaking": True}))
+                speaking = True
+
+            while self._pending_frames and self.is_running:
+                await websocket.send(self._pending_frames[0])
+                self._pending_frames.popleft()  # 发送成功后才移出，断线时保留
+
+            if speaking and not want_speaking:
+                await websocket.send(json.dumps({"is_speaking": False}))
+                speaking = False
+            gate_open = self.frame_gate is not None and self.frame_gate.is_open and not self.is_paused
 
     async def handle_messages(self, websocket) -> None:
         """
@@ -126,7 +284,23 @@ class STTAdapter:
                 is_final = data.get("is_final", False)
                 mode = data.get("mode", "")
                 
+                # 2pass-online中间结果为增量文本，累计后通知
+                if mode == "2pass-online" and text:
+                    if self.frame_gate is None:
+                        self.last_voice_time = time.monotonic()
+                    if not self._partial_text and self.frame_gate is None:
+                        # 没有本地门控时，以一句话的第一个中间结果作为开始说话
+                        self._on_speech_start()
+                    self._partial_text += text
+                    for callback in self.partial_callbacks:
+                        try:
+                            callback(self._partial_text)
+                        except Exception as e:
+                            self.logger.error(f"中间结果回调执行错误: {e}")
+                
                 # 只处理2pass-offline模式的最终结果
+                if mode == "2pass-offline":
+                    self._partial_text = ""
                 if is_final and mode == "2pass-offline" and text:
                     # 触发所有回调函数
                     for callback in self.segment_callbacks:
@@ -135,6 +309,9 @@ class STTAdapter:
                         except Exception as e:
                             self.logger.error(f"回调函数执行错误: {e}")
                         
+            except websockets.ConnectionClosed:
+                # 连接断开，交给start()重连
+                return
             except Exception as e:
                 if self.is_running:
                     self.logger.error(f"处理消息错误: {e}")
@@ -171,64 +348,128 @@ class STTAdapter:
             self.logger.error(f"连接FunASR服务失败: {e}")
             return False
 
+    async def wait_connected(self, timeout: float = 5.0) -> bool:
+        """
+        等待识别会话连接到服务器
+
+        Args:
+            timeout: 最长等待时间(秒)
+
+        Returns:
+            bool: 是否已连接
+        """
+        deadline = time.monotonic() + timeout
+        while self.websocket is None:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def check_health(self, timeout: float = 2.0) -> Optional[dict]:
+        """
+        通过独立连接查询服务器状态
+
+        Args:
+            timeout: 最长等待时间(秒)
+
+        Returns:
+            Optional[dict]: 服务器返回的状态（ready、models_loaded、connections等），不可用时为None
+        """
+        uri = f"ws://{self.host}:{self.port}" if not self.use_ssl else f"wss://{self.host}:{self.port}"
+        try:
+            async with websockets.connect(uri, subprotocols=["binary"], ping_interval=None) as websocket:
+                await websocket.send(json.dumps({"health": True}))
+                while True:
+                    data = json.loads(await asyncio.wait_for(websocket.recv(), timeout=timeout))
+                    if data.get("mode") == "health":
+                        return data
+        except Exception as e:
+            self.logger.debug(f"FunASR健康检查失败: {e}")
+            return None
+
+    def _reconnect_delay(self, attempt: int) -> float:
+        """指数退避加随机抖动，避免多个客户端同时重连"""
+        delay = min(self.reconnect_max_delay, self.reconnect_base_delay * (2 ** (attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
     async def start(self) -> None:
-        """启动语音识别"""
+        """
+        启动语音识别会话
+        
+        会话持续到 stop() 为止：麦克风只打开一次，连接断开后以抖动退避无限重连，
+        期间采集的音频会在连接恢复后补发；pause()/resume() 只切换采集状态，不断开连接
+        """
         self.is_running = True
+        loop = asyncio.get_running_loop()
+        max_frames = max(1, self.max_buffered_ms // self.CHUNK_MS)
+        self._frame_queue = asyncio.Queue(maxsize=max_frames)
+        self._pending_frames = deque()
         
-        # 重试逻辑
-        max_retries = 3
-        retry_count = 0
-        retry_delay = 1  # 秒
+        try:
+            p, stream = self._open_microphone(loop)
+        except Exception as e:
+            self.logger.error(f"打开麦克风失败: {e}")
+            self.is_running = False
+            return
         
-        while retry_count < max_retries and self.is_running:
-            try:
-                async with websockets.connect(
-                    f"ws://{self.host}:{self.port}" if not self.use_ssl else f"wss://{self.host}:{self.port}",
-                    subprotocols=["binary"],
-                    ping_interval=None
-                ) as websocket:
-                    self.logger.info(f"已成功连接到FunASR服务: {self.host}:{self.port}")
-                    
-                    # 并行运行音频录制和消息处理
-                    record_task = asyncio.create_task(self.record_microphone(websocket))
-                    message_task = asyncio.create_task(self.handle_messages(websocket))
-                    
-                    # 等待任务完成或取消
-                    done, pending = await asyncio.wait(
-                        [record_task, message_task],
-                        return_when=asyncio.FIRST_COMPLETED
-                    )
-                    
-                    # 取消未完成的任务
-                    for task in pending:
-                        task.cancel()
-                    
-                    # 如果正常退出，结束重试循环
-                    if not self.is_running:
-                        break
-                    
-                    # 否则，准备重试
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        self.logger.warning(f"连接中断，{retry_delay}秒后重试 ({retry_count}/{max_retries})...")
-                        await asyncio.sleep(retry_delay)
-                        retry_delay = min(retry_delay * 2, 5)
+        uri = f"ws://{self.host}:{self.port}" if not self.use_ssl else f"wss://{self.host}:{self.port}"
+        attempt = 0
+        
+        try:
+            while self.is_running:
+                try:
+                    async with websockets.connect(
+                        uri,
+                        subprotocols=["binary"],
+                        ping_interval=None
+                    ) as websocket:
+                        self.websocket = websocket
+                        if attempt:
+                            self.logger.info(f"已重新连接到FunASR服务: {self.host}:{self.port}")
+                        else:
+                            self.logger.info(f"已成功连接到FunASR服务: {self.host}:{self.port}")
+                        attempt = 0
+                        
+                        # 并行运行音频发送和消息处理
+                        record_task = asyncio.create_task(self.record_microphone(websocket))
+                        message_task = asyncio.create_task(self.handle_messages(websocket))
+                        
+                        # 等待任务完成或取消
+                        done, pending = await asyncio.wait(
+                            [record_task, message_task],
+                            return_when=asyncio.FIRST_COMPLETED
+                        )
+                        
+                        # 取消未完成的任务
+                        for task in pending:
+                            task.cancel()
+                        for task in done:
+                            if task.exception() and self.is_running:
+                                self.logger.warning(f"FunASR连接中断: {task.exception()}")
                     
-            except ConnectionRefusedError:
-                retry_count += 1
-                if retry_count >= max_retries:
-                    self.logger.error(f"无法连接到FunASR服务: {self.host}:{self.port}，已达最大重试次数")
-                    self.is_running = False
-                    break
+                except (OSError, websockets.WebSocketException) as e:
+                    self.logger.warning(f"无法连接到FunASR服务 {self.host}:{self.port}: {e}")
+                except Exception as e:
+                    self.logger.error(f"STT客户端错误: {e}")
+                finally:
+                    self.websocket = None
                 
-                self.logger.warning(f"无法连接到FunASR服务，{retry_delay}秒后重试 ({retry_count}/{max_retries})...")
-                await asyncio.sleep(retry_delay)
-                retry_delay = min(retry_delay * 2, 5)
+                if not self.is_running:
+                    break
                 
-            except Exception as e:
-                self.logger.error(f"STT客户端错误: {e}")
-                self.is_running = False
-                break
+                attempt += 1
+                delay = self._reconnect_delay(attempt)
+                self.logger.warning(f"{delay:.1f}秒后重连FunASR服务 (第{attempt}次)...")
+                # 分段等待，便于stop()时及时退出
+                deadline = time.monotonic() + delay
+                while self.is_running and time.monotonic() < deadline:
+                    await asyncio.sleep(0.1)
+        finally:
+            self.is_running = False
+            stream.stop_stream()
+            stream.close()
+            p.terminate()
+            self.logger.debug("已停止录音")
 
     def stop(self) -> None:
         """停止语音识别"""
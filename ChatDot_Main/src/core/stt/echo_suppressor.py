@@ -0,0 +1,79 @@
+"""
+回声抑制
+扬声器播放的语音会被麦克风重新采集，全双工对话时会被当作用户说话（识别出自己的话、误触发打断）。
+没有参考信号对齐的自适应滤波（AEC），这里按播放电平抑制麦克风输入：
+- mute: 播放期间（含混响尾音）麦克风输入一律替换为静音
+- duck: 只有麦克风电平明显高于播放音频的回声估计时才放行（用户插话），其余替换为静音；
+  回声耦合系数（麦克风电平/播放电平）在被判定为回声的帧上自适应估计
+"""
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+
+class EchoSuppressor:
+    """
+    基于播放电平的回声抑制，放在客户端VAD门控之前
+    被抑制的帧替换为等长静音而不是丢弃，门控和服务器VAD的时间轴保持连续
+    """
+
+    def __init__(self, playback_level: Callable[[int], float], mode: str = "duck", tail_ms: int = 300,
+                 margin: float = 2.0, initial_coupling: float = 1.0, smoothing: float = 0.1,
+                 **_ignored):
+        """
+        Args:
+            playback_level: 返回最近 window_ms 毫秒内播放电平（int16 RMS）的函数，未播放时为0
+            mode: mute 或 duck
+            tail_ms: 播放电平的统计窗口(毫秒)，覆盖回声路径延迟与房间混响
+            margin: duck模式下麦克风电平需超过回声估计的倍数
+            initial_coupling: 回声耦合系数初值，偏大时开始阶段更保守
+            smoothing: 耦合系数的滑动平均系数
+        """
+        self.playback_level = playback_level
+        self.mode = mode
+        self.tail_ms = tail_ms
+        self.margin = margin
+        self.coupling = initial_coupling
+        self.smoothing = smoothing
+        self.stats = {"frames_total": 0, "frames_during_playback": 0, "frames_suppressed": 0, "frames_double_talk": 0}
+
+    def process(self, frame: bytes) -> bytes:
+        """
+        处理一帧麦克风音频
+
+        Args:
+            frame: 16bit单声道PCM音频帧
+
+        Returns:
+            bytes: 原始帧，或被抑制时的等长静音
+        """
+        self.stats["frames_total"] += 1
+        level = self.playback_level(self.tail_ms)
+        if level <= 0:
+            return frame
+        self.stats["frames_during_playback"] += 1
+
+        if self.mode == "duck":
+            samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+            mic_level = float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+            if mic_level > self.coupling * level * self.margin:
+                # 明显高于回声估计，视为用户插话
+                self.stats["frames_double_talk"] += 1
+                return frame
+            # 视为回声，更新耦合系数估计
+            ratio = min(mic_level / level, 10.0)
+            self.coupling = max(0.01, (1 - self.smoothing) * self.coupling + self.smoothing * ratio)
+
+        self.stats["frames_suppressed"] += 1
+        return bytes(len(frame))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取回声抑制统计信息
+
+        Returns:
+            dict: 总帧数、播放期间帧数、被抑制帧数、插话放行帧数、当前耦合系数
+        """
+        stats = dict(self.stats)
+        stats["coupling"] = self.coupling
+        return stats
@@ -7,9 +7,131 @@ import json
 import websockets
 import threading
 import time
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Set, Dict, Any
+import numpy as np
 from global_managers.logger_manager import LoggerManager
 
+# 服务器持有的模型（对应 model_<name> 属性）
+MODEL_NAMES = ("asr", "asr_streaming", "vad", "punc")
+
+
+class AudioFrameBuffer:
+    """
+    单个连接的音频帧缓冲区
+    
+    所有到达的音频帧依次写入一块预分配的bytearray，历史帧、当前语音段和在线ASR分块
+    只是其中的不同区间，通过memoryview切片读取，不再为每个分块/语音段拼接bytes。
+    空间不足时先把仍需要的区间整体前移，仍不够才扩容。
+    """
+    
+    def __init__(self, capacity: int = 32 * 1000 * 30, max_history_frames: int = 500):
+        """
+        Args:
+            capacity: 初始容量(字节)，默认约30秒16k/16bit单声道音频
+            max_history_frames: 语音段之外最多保留的历史帧数，用于VAD回溯语音起点
+        """
+        self._buf = bytearray(capacity)
+        self._end = 0
+        self._frame_starts = deque(maxlen=max_history_frames)
+        self.asr_start = None  # 当前语音段起点，None表示未在语音段内
+        self.online_start = 0  # 当前在线ASR分块起点
+        self.online_frames = 0  # 当前在线ASR分块包含的帧数
+        
+    def __len__(self):
+        """历史帧数"""
+        return len(self._frame_starts)
+        
+    def append(self, data: bytes) -> None:
+        """追加一帧音频"""
+        size = len(data)
+        self._ensure_space(size)
+        start = self._end
+        self._buf[start:start + size] = data
+        self._end = start + size
+        self._frame_starts.append(start)
+        self.online_frames += 1
+        
+    def _ensure_space(self, size: int) -> None:
+        if self._end + size <= len(self._buf):
+            return
+        live_start = self.online_start
+        if self._frame_starts:
+            live_start = min(live_start, self._frame_starts[0])
+        if self.asr_start is not None:
+            live_start = min(live_start, self.asr_start)
+        live = self._end - live_start
+        
+        if live + size <= len(self._buf):
+            # 等长切片赋值，不改变bytearray大小
+            self._buf[0:live] = self._buf[live_start:self._end]
+        else:
+            new_buf = bytearray(max(len(self._buf) * 2, live + size))
+            new_buf[0:live] = self._buf[live_start:self._end]
+            self._buf = new_buf
+            
+        self._end = live
+        self.online_start -= live_start
+        if self.asr_start is not None:
+            self.asr_start -= live_start
+        shifted = [start - live_start for start in self._frame_starts]
+        self._frame_starts.clear()
+        self._frame_starts.extend(shifted)
+        
+    def online_view(self) -> memoryview:
+        """当前在线ASR分块的视图"""
+        return memoryview(self._buf)[self.online_start:self._end]
+        
+    def reset_online(self) -> None:
+        """开始新的在线ASR分块"""
+        self.online_start = self._end
+        self.online_frames = 0
+        
+    def start_utterance(self, pre_frames: int) -> None:
+        """
+        从最近的pre_frames帧处开始语音段（含当前帧）
+        pre_frames为0时与列表切片frames[-0:]一致，从最早的历史帧开始
+        """
+        if not self._frame_starts:
+            self.asr_start = self._end
+        elif pre_frames > 0:
+            self.asr_start = self._frame_starts[-min(pre_frames, len(self._frame_starts))]
+        else:
+            self.asr_start = self._frame_starts[0]
+            
+    def utterance_view(self) -> memoryview:
+        """当前语音段的视图，未在语音段内时为空"""
+        if self.asr_start is None:
+            return memoryview(b"")
+        return memoryview(self._buf)[self.asr_start:self._end]
+        
+    def end_utterance(self) -> None:
+        """结束当前语音段"""
+        self.asr_start = None
+        
+    def keep_last_frames(self, count: int) -> None:
+        """只保留最近count帧历史"""
+        while len(self._frame_starts) > count:
+            self._frame_starts.popleft()
+            
+    def clear(self) -> None:
+        """清空所有音频"""
+        self._frame_starts.clear()
+        self.asr_start = None
+        self._end = 0
+        self.online_start = 0
+        self.online_frames = 0
+
+
+def pcm16_to_model_input(view) -> np.ndarray:
+    """
+    将16bit PCM视图转换为模型输入的float32数组
+    与FunASR内部处理bytes输入的方式一致（除以32768归一化），只在此处产生一次拷贝
+    """
+    return np.multiply(np.frombuffer(view, dtype=np.int16), 1 / 32768, dtype=np.float32)
+
 class FunASRServer:
     """FunASR WebSocket服务器类"""
     
@@ -32,6 +154,13 @@ class FunASRServer:
         }
         self.server_thread = None
         self.is_running = False
+        self.warmup = True            # 加载模型后执行一次预热推理
+        self.startup_timeout = 30.0   # 等待服务器就绪的最长时间(秒)
+        self.ready_event = threading.Event()    # 服务器开始监听后置位
+        self.stopped_event = threading.Event()  # 服务器线程退出后置位
+        self._loop = None
+        self._stop_event = None
+        self._models_key = None       # 已加载模型对应的配置，用于判断能否复用
         self.websocket_users = set()
         self.logger = LoggerManager().get_logger()
         
@@ -41,8 +170,27 @@ class FunASRServer:
         self.model_vad = None
         self.model_punc = None
         
+        # 跨连接离线ASR批处理（默认关闭，开启后每个离线请求最多多等待asr_batch_wait_ms）
+        self.asr_batch_size = 1
+        self.asr_batch_wait_ms = 10
+        self._asr_queue = None
+        self._asr_batch_task = None
+        self.asr_batch_stats = {"batches": 0, "requests": 0, "max_batch": 0}
+        
+        # 推理线程池，避免模型推理阻塞WebSocket事件循环
+        self.inference_executor = None
+        # 每个模型一把锁：FunASR的AutoModel实例带有内部状态，不能被多个线程同时调用
+        self._model_locks = {name: threading.Lock() for name in MODEL_NAMES}
+        self.inference_stats = {
+            "pending": 0,          # 已提交未完成的推理任务数（队列深度）
+            "max_pending": 0,      # 队列深度峰值
+            "total": 0,            # 已完成的推理任务数
+            "total_time": 0.0,     # 推理总耗时（含排队）
+        }
+        
     def set_config(self, host="localhost", port=10095, device="cuda", 
-                   ngpu=1, ncpu=4, models=None):
+                   ngpu=1, ncpu=4, models=None, asr_batch_size=1, asr_batch_wait_ms=10,
+                   warmup=True, startup_timeout=30.0):
         """
         设置服务器配置
         
@@ -53,12 +201,21 @@ class FunASRServer:
             ngpu: GPU数量
             ncpu: CPU核心数
             models: 模型配置
+            asr_batch_size: 跨连接离线ASR批处理的最大批大小，1表示不批处理；
+                大于1时每个请求都可能多等待asr_batch_wait_ms，只在多个连接同时识别时才有收益
+            asr_batch_wait_ms: 凑批的最长等待时间(毫秒)
+            warmup: 加载模型后是否执行预热推理
+            startup_timeout: 等待服务器就绪的最长时间(秒)
         """
         self.host = host
         self.port = port
         self.device = device
         self.ngpu = ngpu
         self.ncpu = ncpu
+        self.asr_batch_size = asr_batch_size
+        self.asr_batch_wait_ms = asr_batch_wait_ms
+        self.warmup = warmup
+        self.startup_timeout = startup_timeout
         
         if models:
             self.models.update(models)
@@ -70,6 +227,11 @@ class FunASRServer:
         Returns:
             bool: 是否成功加载模型
         """
+        models_key = json.dumps([self.device, self.ngpu, self.ncpu, self.models], sort_keys=True)
+        if self.models_loaded() and self._models_key == models_key:
+            self.logger.info("FunASR模型已常驻内存，跳过加载")
+            return True
+        
         self.logger.info("正在加载FunASR模型...")
         
         try:
@@ -129,12 +291,124 @@ class FunASRServer:
             self.logger.debug("标点模型加载完成")
                 
             self.logger.info("所有FunASR模型加载完成")
+            self._models_key = models_key
+            
+            if self.warmup:
+                self.warmup_models()
             return True
             
         except Exception as e:
             self.logger.error(f"加载FunASR模型失败: {str(e)}")
             return False
             
+    def models_loaded(self) -> bool:
+        """模型是否已加载"""
+        return all(model is not None for model in
+                   (self.model_asr, self.model_asr_streaming, self.model_vad, self.model_punc))
+
+    def release_models(self):
+        """释放模型"""
+        self.model_asr = None
+        self.model_asr_streaming = None
+        self.model_vad = None
+        self.model_punc = None
+        self._models_key = None
+        self.logger.info("FunASR模型已释放")
+
+    def warmup_models(self):
+        """
+        用一段低幅噪声对各模型执行一次推理
+        
+        FunASR/PyTorch首次推理时才完成算子初始化、显存分配等工作，
+        预热后第一句话不必再承担这部分延迟
+        """
+        start_time = time.time()
+        audio = np.random.default_rng(0).normal(0, 0.01, 16000).astype(np.float32)
+        warmups = [
+            ("VAD", lambda: self.model_vad.generate(
+                input=audio, cache={}, is_final=True, chunk_size=60)),
+            ("在线ASR", lambda: self.model_asr_streaming.generate(
+                input=audio[:9600], cache={}, is_final=True, chunk_size=[5, 10, 5],
+                encoder_chunk_look_back=4, decoder_chunk_look_back=0)),
+            ("ASR", lambda: self.model_asr.generate(input=audio)),
+            ("标点", lambda: self.model_punc.generate(input="预热", cache={})),
+        ]
+        for name, run in warmups:
+            try:
+                run()
+            except Exception as e:
+                self.logger.warning(f"{name}模型预热失败: {e}")
+        self.logger.info(f"FunASR模型预热完成，耗时 {time.time() - start_time:.2f}秒")
+
+    def _start_inference_executor(self):
+        """
+        创建推理线程池
+        同一模型的调用由模型锁串行化，线程数与模型数相同即可让不同模型并行；
+        单次推理已由PyTorch使用ncpu个线程，线程池再按ncpu扩大只会超额占用CPU
+        """
+        if self.inference_executor is None:
+            self.inference_executor = ThreadPoolExecutor(
+                max_workers=len(MODEL_NAMES),
+                thread_name_prefix="FunASRInference"
+            )
+
+    def _stop_inference_executor(self):
+        """关闭推理线程池"""
+        if self.inference_executor is not None:
+            self.inference_executor.shutdown(wait=False)
+            self.inference_executor = None
+
+    def _generate(self, name, **kwargs):
+        """
+        在模型锁内调用指定模型的generate（在推理线程中执行）
+        
+        Args:
+            name: 模型名称，见MODEL_NAMES
+        """
+        with self._model_locks[name]:
+            return getattr(self, f"model_{name}").generate(**kwargs)
+
+    async def _run_inference(self, func, *args, **kwargs):
+        """
+        在推理线程池中执行模型推理
+        同一连接内的调用由handle_websocket依次await，因此保持了每个连接的处理顺序；
+        不同模型的推理可以并行（同一模型由_generate加锁串行），事件循环在推理期间可以继续服务其他连接
+        
+        Args:
+            func: 推理函数
+            
+        Returns:
+            推理函数的返回值
+        """
+        stats = self.inference_stats
+        stats["pending"] += 1
+        stats["max_pending"] = max(stats["max_pending"], stats["pending"])
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.inference_executor, functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            stats["pending"] -= 1
+            stats["total"] += 1
+            stats["total_time"] += time.perf_counter() - start
+
+    def get_inference_stats(self) -> Dict[str, Any]:
+        """
+        获取推理统计信息
+        
+        Returns:
+            dict: 当前队列深度、峰值、完成数和平均耗时(ms)
+        """
+        stats = dict(self.inference_stats)
+        stats["avg_time_ms"] = stats["total_time"] * 1000 / stats["total"] if stats["total"] else 0.0
+        batch = self.asr_batch_stats
+        stats["asr_batches"] = batch["batches"]
+        stats["asr_max_batch"] = batch["max_batch"]
+        stats["asr_avg_batch"] = batch["requests"] / batch["batches"] if batch["batches"] else 0.0
+        return stats
+
     async def ws_reset(self, websocket):
         """
         重置WebSocket连接
@@ -168,7 +442,9 @@ class FunASRServer:
         Returns:
             tuple: (speech_start, speech_end)
         """
-        segments_result = self.model_vad.generate(input=audio_in, **websocket.status_dict_vad)[0]["value"]
+        segments_result = (await self._run_inference(
+            self._generate, "vad", input=audio_in, **websocket.status_dict_vad
+        ))[0]["value"]
         
         speech_start = -1
         speech_end = -1
@@ -190,13 +466,10 @@ class FunASRServer:
             audio_in: 音频数据
         """
         if len(audio_in) > 0:
-            rec_result = self.model_asr.generate(input=audio_in, **websocket.status_dict_asr)[0]
-            
-            # 如果有标点模型且识别到文本，应用标点
-            if self.model_punc is not None and len(rec_result["text"]) > 0:
-                rec_result = self.model_punc.generate(
-                    input=rec_result["text"], **websocket.status_dict_punc
-                )[0]
+            if self._asr_queue is not None:
+                rec_result = await self._submit_asr(websocket, audio_in)
+            else:
+                rec_result = await self._run_inference(self._asr_with_punc, websocket, audio_in)
                 
             # 发送结果
             if len(rec_result["text"]) > 0:
@@ -223,6 +496,120 @@ class FunASRServer:
             )
             await websocket.send(message)
 
+    def _asr_with_punc(self, websocket, audio_in):
+        """离线ASR及标点恢复（在推理线程中执行）"""
+        rec_result = self._generate("asr", input=audio_in, **websocket.status_dict_asr)[0]
+        
+        # 如果有标点模型且识别到文本，应用标点
+        if self.model_punc is not None and len(rec_result["text"]) > 0:
+            rec_result = self._generate(
+                "punc", input=rec_result["text"], **websocket.status_dict_punc
+            )[0]
+        return rec_result
+
+    async def _submit_asr(self, websocket, audio_in):
+        """
+        将离线ASR请求提交给批处理调度器，并等待该请求的结果
+        
+        Args:
+            websocket: WebSocket连接
+            audio_in: 音频数据
+            
+        Returns:
+            dict: 识别结果（已加标点）
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._asr_queue.put((websocket, audio_in, future))
+        return await future
+
+    async def _asr_batch_loop(self):
+        """
+        离线ASR批处理调度循环
+        收到第一个请求后，在asr_batch_wait_ms内继续收集其他连接的请求（最多asr_batch_size个），
+        然后合并为一次generate调用，并把结果分发回各请求
+        """
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._asr_queue.get()]
+                deadline = loop.time() + self.asr_batch_wait_ms / 1000
+                while len(batch) < self.asr_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._asr_queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            
+                # 热词不同的请求不能合并到同一次调用
+                groups = {}
+                for item in batch:
+                    key = json.dumps(item[0].status_dict_asr, sort_keys=True, default=str)
+                    groups.setdefault(key, []).append(item)
+                
+                for items in groups.values():
+                    try:
+                        results = await self._run_inference(self._asr_batch, items)
+                    except Exception as e:
+                        for _, _, future in items:
+                            if not future.done():
+                                future.set_exception(e)
+                        continue
+                    for (_, _, future), result in zip(items, results):
+                        if not future.done():
+                            future.set_result(result)
+                        
+                stats = self.asr_batch_stats
+                stats["batches"] += 1
+                stats["requests"] += len(batch)
+                stats["max_batch"] = max(stats["max_batch"], len(batch))
+        except asyncio.CancelledError:
+            # 服务器关闭时结束所有等待中的请求，避免调用方一直await
+            self._fail_pending_asr(batch)
+            raise
+
+    def _fail_pending_asr(self, batch=()):
+        """让当前批次及队列中尚未完成的离线ASR请求以异常结束"""
+        pending = list(batch)
+        if self._asr_queue is not None:
+            while not self._asr_queue.empty():
+                pending.append(self._asr_queue.get_nowait())
+        for _, _, future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError("FunASR服务器已关闭"))
+
+    def _asr_batch(self, items):
+        """
+        批量离线ASR及标点恢复（在推理线程中执行）
+        
+        Args:
+            items: [(websocket, audio_in, future), ...]，热词配置相同
+            
+        Returns:
+            list: 与items一一对应的识别结果
+        """
+        if len(items) == 1:
+            websocket, audio_in, _ = items[0]
+            return [self._asr_with_punc(websocket, audio_in)]
+            
+        inputs = [audio_in for _, audio_in, _ in items]
+        results = self._generate(
+            "asr", input=inputs, batch_size=len(inputs), **items[0][0].status_dict_asr
+        )
+        if len(results) != len(inputs):
+            # 结果数量对不上时退回逐条识别，保证结果与请求对应
+            return [self._asr_with_punc(websocket, audio_in) for websocket, audio_in, _ in items]
+            
+        # 实时标点模型带有各连接自己的上下文缓存，按连接逐条处理
+        for i, (websocket, _, _) in enumerate(items):
+            if self.model_punc is not None and len(results[i]["text"]) > 0:
+                results[i] = self._generate(
+                    "punc", input=results[i]["text"], **websocket.status_dict_punc
+                )[0]
+        return results
+
     async def async_asr_online(self, websocket, audio_in):
         """
         在线ASR处理
@@ -232,9 +619,9 @@ class FunASRServer:
             audio_in: 音频数据
         """
         if len(audio_in) > 0:
-            rec_result = self.model_asr_streaming.generate(
-                input=audio_in, **websocket.status_dict_asr_online
-            )[0]
+            rec_result = (await self._run_inference(
+                self._generate, "asr_streaming", input=audio_in, **websocket.status_dict_asr_online
+            ))[0]
             
             # 2pass模式下，如果是最终结果，不发送在线结果
             if websocket.mode == "2pass" and websocket.status_dict_asr_online.get("is_final", False):
@@ -261,9 +648,7 @@ class FunASRServer:
             websocket: WebSocket连接
             path: 路径
         """
-        frames = []
-        frames_asr = []
-        frames_asr_online = []
+        audio_buffer = AudioFrameBuffer()
         
         # 添加到用户集合
         self.websocket_users.add(websocket)
@@ -279,7 +664,6 @@ class FunASRServer:
         websocket.mode = "2pass"
         websocket.is_speaking = True
         
-        speech_start = False
         speech_end_i = -1
         
         self.logger.debug(f"新WebSocket连接，当前连接数: {len(self.websocket_users)}")
@@ -291,6 +675,17 @@ class FunASRServer:
                     try:
                         messagejson = json.loads(message)
                         
+                        # 健康检查，直接回复服务器状态
+                        if "health" in messagejson:
+                            await websocket.send(json.dumps({
+                                "mode": "health",
+                                "ready": self.ready_event.is_set(),
+                                "models_loaded": self.models_loaded(),
+                                "connections": len(self.websocket_users),
+                                "inference": self.get_inference_stats(),
+                            }))
+                            continue
+                        
                         # 处理各种配置参数
                         if "is_speaking" in messagejson:
                             websocket.is_speaking = messagejson["is_speaking"]
@@ -330,70 +725,58 @@ class FunASRServer:
                         websocket.status_dict_vad["chunk_size"] = 60
                 
                 # 处理二进制音频数据
-                if (len(frames_asr_online) > 0 or len(frames_asr) >= 0 
-                    or (not isinstance(message, str) and message)):
+                if not isinstance(message, str) and message:
+                    audio_buffer.append(message)
+                    duration_ms = len(message) // 32
+                    websocket.vad_pre_idx += duration_ms
+                    
+                    # ASR在线处理
+                    websocket.status_dict_asr_online["is_final"] = speech_end_i != -1
                     
-                    if not isinstance(message, str) and message:
-                        frames.append(message)
-                        duration_ms = len(message) // 32
-                        websocket.vad_pre_idx += duration_ms
+                    if (audio_buffer.online_frames % websocket.chunk_interval == 0
+                        or websocket.status_dict_asr_online["is_final"]):
                         
-                        # ASR在线处理
-                        frames_asr_online.append(message)
-                        websocket.status_dict_asr_online["is_final"] = speech_end_i != -1
+                        if websocket.mode == "2pass" or websocket.mode == "online":
+                            audio_in = pcm16_to_model_input(audio_buffer.online_view())
+                            try:
+                                await self.async_asr_online(websocket, audio_in)
+                            except Exception as e:
+                                self.logger.error(f"在线ASR处理出错: {e}")
+                        audio_buffer.reset_online()
                         
-                        if (len(frames_asr_online) % websocket.chunk_interval == 0
-                            or websocket.status_dict_asr_online["is_final"]):
-                            
-                            if websocket.mode == "2pass" or websocket.mode == "online":
-                                audio_in = b"".join(frames_asr_online)
-                                try:
-                                    await self.async_asr_online(websocket, audio_in)
-                                except Exception as e:
-                                    self.logger.error(f"在线ASR处理出错: {e}")
-                            frames_asr_online = []
+                    # VAD处理
+                    try:
+                        speech_start_i, speech_end_i = await self.async_vad(websocket, message)
+                    except Exception as e:
+                        self.logger.error(f"VAD处理出错: {e}")
+                        speech_start_i, speech_end_i = -1, -1
                         
-                        # 如果检测到语音开始，就累积帧
-                        if speech_start:
-                            frames_asr.append(message)
-                            
-                        # VAD处理
+                    # 如果检测到语音开始，从回溯的起点开始累积语音段
+                    if speech_start_i != -1:
+                        beg_bias = (websocket.vad_pre_idx - speech_start_i) // duration_ms
+                        audio_buffer.start_utterance(beg_bias)
+                        
+                # 如果检测到语音结束或用户停止说话
+                if speech_end_i != -1 or not websocket.is_speaking:
+                    # 离线ASR处理
+                    if websocket.mode == "2pass" or websocket.mode == "offline":
+                        audio_in = pcm16_to_model_input(audio_buffer.utterance_view())
                         try:
-                            speech_start_i, speech_end_i = await self.async_vad(websocket, message)
+                            await self.async_asr(websocket, audio_in)
                         except Exception as e:
-                            self.logger.error(f"VAD处理出错: {e}")
-                            speech_start_i, speech_end_i = -1, -1
-                            
-                        # 如果检测到语音开始
-                        if speech_start_i != -1:
-                            speech_start = True
-                            beg_bias = (websocket.vad_pre_idx - speech_start_i) // duration_ms
-                            frames_pre = frames[-min(beg_bias, len(frames)):]
-                            frames_asr = []
-                            frames_asr.extend(frames_pre)
+                            self.logger.error(f"离线ASR处理出错: {e}")
                             
-                    # 如果检测到语音结束或用户停止说话
-                    if speech_end_i != -1 or not websocket.is_speaking:
-                        # 离线ASR处理
-                        if websocket.mode == "2pass" or websocket.mode == "offline":
-                            audio_in = b"".join(frames_asr)
-                            try:
-                                await self.async_asr(websocket, audio_in)
-                            except Exception as e:
-                                self.logger.error(f"离线ASR处理出错: {e}")
-                                
-                        # 重置状态
-                        frames_asr = []
-                        speech_start = False
-                        frames_asr_online = []
-                        websocket.status_dict_asr_online["cache"] = {}
-                        
-                        if not websocket.is_speaking:
-                            websocket.vad_pre_idx = 0
-                            frames = []
-                            websocket.status_dict_vad["cache"] = {}
-                        else:
-                            frames = frames[-min(20, len(frames)):]  # 保留最近的几帧
+                    # 重置状态
+                    audio_buffer.end_utterance()
+                    audio_buffer.reset_online()
+                    websocket.status_dict_asr_online["cache"] = {}
+                    
+                    if not websocket.is_speaking:
+                        websocket.vad_pre_idx = 0
+                        audio_buffer.clear()
+                        websocket.status_dict_vad["cache"] = {}
+                    else:
+                        audio_buffer.keep_last_frames(20)  # 保留最近的几帧
                         
         except websockets.ConnectionClosed:
             self.logger.debug(f"WebSocket连接已关闭，当前连接数: {len(self.websocket_users) - 1}")
@@ -420,15 +803,32 @@ class FunASRServer:
                 ping_interval=None
             )
             
+            # 启动跨连接ASR批处理调度
+            if self.asr_batch_size > 1:
+                self._asr_queue = asyncio.Queue()
+                self._asr_batch_task = asyncio.create_task(self._asr_batch_loop())
+            
+            self._loop = asyncio.get_running_loop()
+            self._stop_event = asyncio.Event()
             self.is_running = True
+            self.ready_event.set()
             self.logger.info(f"FunASR服务器已启动，监听地址: {self.host}:{self.port}")
             
-            # 保持服务器运行
-            while self.is_running:
-                await asyncio.sleep(1)
+            # 保持服务器运行，直到stop()通知退出
+            await self._stop_event.wait()
                 
             # 关闭服务器
             self.logger.info("正在关闭FunASR服务器...")
+            if self._asr_batch_task:
+                self._asr_batch_task.cancel()
+                try:
+                    await self._asr_batch_task
+                except asyncio.CancelledError:
+                    pass
+                self._asr_batch_task = None
+            # 等待调度任务退出期间可能又有请求入队
+            self._fail_pending_asr()
+            self._asr_queue = None
             server.close()
             await server.wait_closed()
             self.logger.info("FunASR服务器已关闭")
@@ -436,6 +836,11 @@ class FunASRServer:
         except Exception as e:
             self.logger.error(f"服务器运行时出错: {str(e)}")
             self.is_running = False
+        finally:
+            self.ready_event.clear()
+            self._loop = None
+            self._stop_event = None
+            self.stopped_event.set()
 
     def start(self):
         """
@@ -452,6 +857,10 @@ class FunASRServer:
         if not self.load_models():
             return False
             
+        self._start_inference_executor()
+        self.ready_event.clear()
+        self.stopped_event.clear()
+            
         # 创建并启动新线程运行服务器
         def run_server():
             asyncio.run(self.run_server())
@@ -462,22 +871,51 @@ class FunASRServer:
         )
         self.server_thread.start()
         
-        # 等待服务器启动
-        time.sleep(2)
+        # 等待服务器开始监听（或启动失败退出）
+        return self.wait_until_ready(self.startup_timeout)
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """
+        等待服务器就绪
+        
+        Args:
+            timeout: 最长等待时间(秒)，None表示一直等待
+            
+        Returns:
+            bool: 服务器是否已就绪
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while not self.ready_event.is_set():
+            if self.stopped_event.is_set():
+                self.logger.error("FunASR服务器启动失败")
+                return False
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                self.logger.error(f"等待FunASR服务器就绪超时({timeout}秒)")
+                return False
+            self.ready_event.wait(0.05 if remaining is None else min(0.05, remaining))
         return True
 
-    def stop(self):
-        """停止服务器"""
+    def stop(self, release_models: bool = True):
+        """
+        停止服务器
+        
+        Args:
+            release_models: 是否释放模型；为False时模型常驻内存，下次start()无需重新加载
+        """
         if not self.is_running:
             return
             
         self.is_running = False
-        time.sleep(2)  # 等待服务器关闭
+        loop, stop_event = self._loop, self._stop_event
+        if loop is not None and stop_event is not None:
+            loop.call_soon_threadsafe(stop_event.set)
+        if not self.stopped_event.wait(timeout=5):  # 等待服务器关闭
+            self.logger.warning("等待FunASR服务器关闭超时")
+        self._stop_inference_executor()
         
         # 释放资源
-        self.model_asr = None
-        self.model_asr_streaming = None
-        self.model_vad = None
-        self.model_punc = None
+        if release_models:
+            self.release_models()
         
-        self.logger.info("FunASR服务器资源已释放")
\ No newline at end of file
+        self.logger.info("FunASR服务器已停止")
\ No newline at end of file
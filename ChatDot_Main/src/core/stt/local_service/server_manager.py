@@ -11,14 +11,33 @@ from .funasr_server import FunASRServer
 class ServerManager:
     """FunASR服务器管理器"""
     
-    def __init__(self):
-        """初始化服务器管理器"""
-        self.server = FunASRServer()
+    # 常驻模式下所有管理器共用的服务器实例，模型在STT服务重启之间保持加载
+    _shared_server = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, persistent: bool = False):
+        """
+        初始化服务器管理器
+        
+        Args:
+            persistent: 是否使用常驻模型；为True时停止服务器只关闭监听，
+                        模型保留在内存中，下次启动无需重新加载
+        """
+        self.persistent = persistent
+        if persistent:
+            with ServerManager._shared_lock:
+                if ServerManager._shared_server is None:
+                    ServerManager._shared_server = FunASRServer()
+                self.server = ServerManager._shared_server
+        else:
+            self.server = FunASRServer()
         self.logger = LoggerManager().get_logger()
         
     def set_config(self, host: str = "localhost", port: int = 10095, 
                   device: str = "cuda", ngpu: int = 1, ncpu: int = 4,
-                  models: Dict[str, str] = None) -> None:
+                  models: Dict[str, str] = None, asr_batch_size: int = 1,
+                  asr_batch_wait_ms: int = 10, warmup: bool = True,
+                  startup_timeout: float = 30.0) -> None:
         """
         设置服务器配置
         
@@ -29,6 +48,10 @@ class ServerManager:
             ngpu: GPU数量
             ncpu: CPU核心数
             models: 模型配置
+            asr_batch_size: 跨连接离线ASR最大批大小（默认1，不批处理）
+            asr_batch_wait_ms: 凑批最长等待时间(毫秒)
+            warmup: 加载模型后是否执行预热推理
+            startup_timeout: 等待服务器就绪的最长时间(秒)
         """
         self.server.set_config(
             host=host,
@@ -36,12 +59,16 @@ class ServerManager:
             device=device,
             ngpu=ngpu,
             ncpu=ncpu,
-            models=models
+            models=models,
+            asr_batch_size=asr_batch_size,
+            asr_batch_wait_ms=asr_batch_wait_ms,
+            warmup=warmup,
+            startup_timeout=startup_timeout
         )
         
     def start(self) -> bool:
         """
-        启动服务器
+        启动服务器，返回时服务器已开始监听
         
         Returns:
             bool: 是否成功启动
@@ -57,7 +84,7 @@ class ServerManager:
         """停止服务器"""
         try:
             self.logger.info("停止本地FunASR服务器...")
-            self.server.stop()
+            self.server.stop(release_models=not self.persistent)
             self.logger.info("服务器已停止")
         except Exception as e:
             self.logger.error(f"停止FunASR服务器失败: {e}")
@@ -69,4 +96,25 @@ class ServerManager:
         Returns:
             bool: 服务器是否在运行
         """
-        return self.server.is_running
\ No newline at end of file
+        return self.server.is_running
+        
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """
+        等待服务器就绪
+        
+        Args:
+            timeout: 最长等待时间(秒)
+            
+        Returns:
+            bool: 服务器是否已就绪
+        """
+        return self.server.wait_until_ready(timeout)
+        
+    def get_inference_stats(self) -> Dict[str, Any]:
+        """
+        获取服务器推理统计信息
+        
+        Returns:
+            Dict[str, Any]: 推理队列深度、完成数和平均耗时
+        """
+        return self.server.get_inference_stats()
\ No newline at end of file
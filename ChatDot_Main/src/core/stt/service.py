@@ -3,13 +3,15 @@ STT服务类，提供语音识别功能
 """
 import asyncio
 import threading
-import time
 from typing import Callable, List, Dict, Any, Optional, Union
 
 from global_managers.logger_manager import LoggerManager
+from global_managers.service_manager import ServiceManager
 from .settings import STTSettings
 from .persistence import STTPersistence
 from .adapter import STTAdapter
+from .vad_gate import VoiceActivityGate
+from .echo_suppressor import EchoSuppressor
 
 # 导入本地服务器管理
 try:
@@ -31,8 +33,15 @@ class STTService:
         self.is_initialized = False
         self.logger = LoggerManager().get_logger()
         self.segment_callbacks: List[Callable[[str], None]] = []
+        self.partial_callbacks: List[Callable[[str], None]] = []
+        self.speech_start_callbacks: List[Callable[[], None]] = []
         self.last_text = ""
         
+        # 客户端回调只注册一次，识别会话暂停/恢复时不会重复添加
+        self.adapter.add_segment_callback(self._on_segment)
+        self.adapter.add_partial_callback(self._on_partial)
+        self.adapter.add_speech_start_callback(self._on_speech_start)
+        
         # 从持久化存储加载设置
         self._load_persisted_settings()
 
@@ -54,6 +63,18 @@ class STTService:
             # 服务器设置
             "use_local_server": self.settings.get_setting("use_local_server"),
             "auto_start_server": self.settings.get_setting("auto_start_server"),
+            "persistent_models": self.settings.get_setting("persistent_models"),
+            
+            # 会话设置
+            "reconnect_base_delay": self.settings.get_setting("reconnect_base_delay"),
+            "reconnect_max_delay": self.settings.get_setting("reconnect_max_delay"),
+            "max_buffered_ms": self.settings.get_setting("max_buffered_ms"),
+            
+            # 客户端VAD门控
+            "client_vad": self.settings.get_setting("client_vad"),
+            
+            # 回声抑制
+            "echo_suppression": self.settings.get_setting("echo_suppression"),
             
             # 服务器配置
             "server_config": self.settings.get_setting("server_config")
@@ -88,7 +109,9 @@ class STTService:
                     
                     if auto_start:
                         # 创建服务器管理器
-                        self.server_manager = ServerManager()
+                        self.server_manager = ServerManager(
+                            persistent=self.settings.get_setting("persistent_models")
+                        )
                         
                         # 配置服务器
                         host = self.settings.get_setting("host")
@@ -101,14 +124,10 @@ class STTService:
                             **server_config
                         )
                         
-                        # 启动服务器
+                        # 启动服务器（返回时服务器已就绪）
                         if not self.server_manager.start():
                             self.logger.error("启动本地FunASR服务器失败")
                             return False
-                            
-                        # 等待服务器初始化
-                        self.logger.info("等待FunASR服务器初始化...")
-                        time.sleep(2)
             
             # 配置客户端
             host = self.settings.get_setting("host")
@@ -116,6 +135,13 @@ class STTService:
             use_ssl = self.settings.get_setting("use_ssl")
             
             self.adapter.set_server(host, port, use_ssl)
+            self.adapter.configure_session(
+                reconnect_base_delay=self.settings.get_setting("reconnect_base_delay"),
+                reconnect_max_delay=self.settings.get_setting("reconnect_max_delay"),
+                max_buffered_ms=self.settings.get_setting("max_buffered_ms")
+            )
+            self._configure_frame_gate()
+            self._configure_echo_suppression()
             
             self.is_initialized = True
             self.logger.info("STT服务初始化完成")
@@ -153,7 +179,9 @@ class STTService:
                     
                     if auto_start:
                         # 创建服务器管理器
-                        self.server_manager = ServerManager()
+                        self.server_manager = ServerManager(
+                            persistent=self.settings.get_setting("persistent_models")
+                        )
                         
                         # 配置服务器
                         host = self.settings.get_setting("host")
@@ -166,14 +194,11 @@ class STTService:
                             **server_config
                         )
                         
-                        # 启动服务器
-                        if not self.server_manager.start():
+                        # 启动服务器（返回时服务器已就绪），模型加载较慢，放到线程中执行
+                        loop = asyncio.get_running_loop()
+                        if not await loop.run_in_executor(None, self.server_manager.start):
                             self.logger.error("启动本地FunASR服务器失败")
                             return False
-                            
-                        # 等待服务器初始化
-                        self.logger.info("等待FunASR服务器初始化...")
-                        await asyncio.sleep(3)
             
             # 配置客户端
             host = self.settings.get_setting("host")
@@ -181,6 +206,13 @@ class STTService:
             use_ssl = self.settings.get_setting("use_ssl")
             
             self.adapter.set_server(host, port, use_ssl)
+            self.adapter.configure_session(
+                reconnect_base_delay=self.settings.get_setting("reconnect_base_delay"),
+                reconnect_max_delay=self.settings.get_setting("reconnect_max_delay"),
+                max_buffered_ms=self.settings.get_setting("max_buffered_ms")
+            )
+            self._configure_frame_gate()
+            self._configure_echo_suppression()
             
             self.is_initialized = True
             self.logger.info("STT服务初始化完成")
@@ -190,6 +222,60 @@ class STTService:
             self.logger.error(f"初始化STT服务失败: {e}")
             return False
 
+    def _configure_frame_gate(self) -> None:
+        """根据设置配置客户端VAD门控"""
+        vad_config = self.settings.get_setting("client_vad") or {}
+        if vad_config.get("enabled", False):
+            self.adapter.set_frame_gate(VoiceActivityGate(**vad_config))
+            self.logger.debug(f"已启用客户端VAD门控: {vad_config}")
+        else:
+            self.adapter.set_frame_gate(None)
+
+    def _configure_echo_suppression(self) -> None:
+        """根据设置配置回声抑制，以TTS播放电平为参考"""
+        config = dict(self.settings.get_setting("echo_suppression") or {})
+        service_manager = ServiceManager()
+        if config.pop("enabled", False) and service_manager.is_service_registered("tts_service"):
+            tts_service = service_manager.get_service("tts_service")
+            self.adapter.set_echo_suppressor(EchoSuppressor(tts_service.get_output_level, **config))
+            self.logger.debug(f"已启用回声抑制: {config}")
+        else:
+            self.adapter.set_echo_suppressor(None)
+
+    def get_echo_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        获取回声抑制统计信息
+        
+        Returns:
+            Optional[Dict[str, Any]]: 被抑制帧数、插话放行帧数等，未启用时为None
+        """
+        suppressor = self.adapter.echo_suppressor
+        return suppressor.get_stats() if suppressor is not None else None
+
+    def get_last_voice_time(self) -> float:
+        """
+        获取最近一次检测到用户语音的时间(time.monotonic)，用于计算语音结束到回复出声的延迟
+        """
+        return self.adapter.last_voice_time
+
+    def get_vad_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        获取客户端VAD门控统计信息
+        
+        Returns:
+            Optional[Dict[str, Any]]: 门控统计（发送/节省的字节数等），未启用门控时为None
+        """
+        gate = self.adapter.frame_gate
+        return gate.get_stats() if gate is not None else None
+
+    def _log_vad_stats(self) -> None:
+        """记录客户端VAD门控节省的流量"""
+        stats = self.get_vad_stats()
+        if stats and stats["bytes_total"]:
+            self.logger.info(f"客户端VAD门控: 发送 {stats['bytes_sent'] / 1024:.1f}KB / "
+                             f"采集 {stats['bytes_total'] / 1024:.1f}KB，"
+                             f"节省 {stats['saved_ratio']:.1%}，语音段 {stats['segments']} 个")
+
     def shutdown(self) -> None:
         """关闭STT服务"""
         if not self.is_initialized:
@@ -235,6 +321,57 @@ class STTService:
         """
         self.segment_callbacks.append(callback)
         
+    def remove_segment_callback(self, callback: Callable[[str], None]) -> None:
+        """
+        移除完整语音片段回调函数，未注册时忽略
+        
+        Args:
+            callback: 通过 add_segment_callback 添加的回调函数
+        """
+        if callback in self.segment_callbacks:
+            self.segment_callbacks.remove(callback)
+        
+    def add_partial_callback(self, callback: Callable[[str], None]) -> None:
+        """
+        添加中间识别结果回调函数
+        
+        Args:
+            callback: 回调函数，接收当前语句累计的中间识别文本
+        """
+        self.partial_callbacks.append(callback)
+        
+    def add_speech_start_callback(self, callback: Callable[[], None]) -> None:
+        """
+        添加开始说话回调函数
+        
+        Args:
+            callback: 无参数的回调函数，用户开始说话时调用
+        """
+        self.speech_start_callbacks.append(callback)
+        
+    def _on_speech_start(self) -> None:
+        """
+        开始说话回调处理
+        """
+        for callback in self.speech_start_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error(f"开始说话回调执行错误: {e}")
+
+    def _on_partial(self, text: str) -> None:
+        """
+        中间结果回调处理
+        
+        Args:
+            text: 当前语句累计的中间识别文本
+        """
+        for callback in self.partial_callbacks:
+            try:
+                callback(text)
+            except Exception as e:
+                self.logger.error(f"中间结果回调执行错误: {e}")
+
     def _on_segment(self, text: str) -> None:
         """
         内部回调处理
@@ -263,11 +400,14 @@ class STTService:
                 return False
                 
         if self.recognition_thread and self.recognition_thread.is_alive():
-            self.logger.info("语音识别已在运行")
+            if self.adapter.is_paused:
+                self.adapter.resume()
+                self.logger.info("语音识别已恢复")
+            else:
+                self.logger.info("语音识别已在运行")
             return True
         
-        # 设置客户端回调
-        self.adapter.add_segment_callback(self._on_segment)
+        self.adapter.resume()
         
         # 在新线程中启动语音识别
         def run_recognition():
@@ -293,11 +433,14 @@ class STTService:
                 return False
                 
         if self.recognition_thread and self.recognition_thread.is_alive():
-            self.logger.info("语音识别已在运行")
+            if self.adapter.is_paused:
+                self.adapter.resume()
+                self.logger.info("语音识别已恢复")
+            else:
+                self.logger.info("语音识别已在运行")
             return True
         
-        # 设置客户端回调
-        self.adapter.add_segment_callback(self._on_segment)
+        self.adapter.resume()
         
         # 在新线程中启动语音识别
         def run_recognition():
@@ -309,12 +452,25 @@ class STTService:
         )
         self.recognition_thread.start()
         
-        # 等待一会，确保线程启动
-        await asyncio.sleep(1)
+        # 等待识别会话连接到服务器
+        if not await self.adapter.wait_connected(timeout=5):
+            self.logger.warning("语音识别会话尚未连接到服务器，将在后台继续重连")
         
         self.logger.info("语音识别已启动")
         return True
 
+    def pause_recognition(self) -> None:
+        """
+        暂停语音识别
+        
+        识别会话、服务器连接和本地服务器都保持运行，再次调用 start_recognition
+        即可立即恢复，无需重新连接或等待服务器启动
+        """
+        if self.recognition_thread and self.recognition_thread.is_alive():
+            self.adapter.pause()
+            self._log_vad_stats()
+            self.logger.info("语音识别已暂停")
+
     def stop_recognition(self) -> None:
         """停止语音识别"""
         if not self.adapter:
@@ -328,6 +484,9 @@ class STTService:
             self.recognition_thread.join(timeout=2)
             
         self.recognition_thread = None
+        self._log_vad_stats()
+        if self.adapter.frame_gate is not None:
+            self.adapter.frame_gate.reset()
         self.logger.info("语音识别已停止")
         
     async def stop_recognition_async(self) -> None:
@@ -346,17 +505,21 @@ class STTService:
                 await asyncio.sleep(0.1)
             
         self.recognition_thread = None
+        self._log_vad_stats()
+        if self.adapter.frame_gate is not None:
+            self.adapter.frame_gate.reset()
         self.logger.info("语音识别已停止")
 
     def is_recognition_active(self) -> bool:
         """
-        检查语音识别是否正在运行
+        检查语音识别是否正在运行（暂停状态不算运行）
         
         Returns:
             bool: 是否正在运行
         """
         return (self.recognition_thread is not None and 
-                self.recognition_thread.is_alive())
+                self.recognition_thread.is_alive() and
+                not self.adapter.is_paused)
                 
     def get_last_text(self) -> str:
         """
@@ -14,12 +14,43 @@ DEFAULT_SETTINGS = {
     # 服务器设置
     "use_local_server": True,       # 是否使用本地服务器
     "auto_start_server": True,      # 是否自动启动本地服务器
+    "persistent_models": True,      # 模型常驻内存，重启STT服务时无需重新加载
+    
+    # 会话设置（识别会话常驻，语音开关只暂停/恢复采集）
+    "reconnect_base_delay": 0.5,    # 断线重连初始等待时间(秒)
+    "reconnect_max_delay": 10.0,    # 断线重连最长等待时间(秒)
+    "max_buffered_ms": 3000,        # 连接不可用时最多缓存的音频(毫秒)
+    
+    # 客户端VAD门控（静音帧不发送到服务器）
+    # 默认关闭：固定的能量阈值可能把音量较小的麦克风整段过滤掉，启用前请按实际麦克风调整 energy_threshold
+    "client_vad": {
+        "enabled": False,           # 是否启用客户端门控
+        "energy_threshold": 300,    # 最低能量阈值（int16 RMS）
+        "noise_ratio": 3.0,         # 能量需超过环境噪声估计的倍数
+        "zcr_min": 0.01,            # 语音帧最小过零率
+        "zcr_max": 0.5,             # 语音帧最大过零率
+        "start_frames": 2,          # 连续多少帧语音后开始发送
+        "pre_roll_ms": 300,         # 开始发送时补发的预录音频(毫秒)
+        "hangover_ms": 600          # 语音结束后继续发送的时长(毫秒)
+    },
+    
+    # 回声抑制（扬声器播放的语音不被当作用户说话）
+    "echo_suppression": {
+        "enabled": True,            # 是否启用
+        "mode": "duck",             # mute: 播放期间静音麦克风；duck: 只放行明显高于回声的插话
+        "tail_ms": 300,             # 播放电平统计窗口，覆盖回声延迟与混响(毫秒)
+        "margin": 2.0               # duck模式下插话电平需超过回声估计的倍数
+    },
     
     # 服务器配置
     "server_config": {
         "device": "cuda",           # 设备：cuda或cpu
         "ngpu": 1,                  # GPU数量
         "ncpu": 4,                  # CPU核心数
+        "asr_batch_size": 1,        # 跨连接离线ASR最大批大小（1为不批处理；开启后每个请求最多多等待asr_batch_wait_ms）
+        "asr_batch_wait_ms": 10,    # 凑批最长等待时间(毫秒)
+        "warmup": True,             # 加载模型后执行预热推理
+        "startup_timeout": 30,      # 等待服务器就绪的最长时间(秒)
         
         # 模型配置
         "models": {
@@ -0,0 +1,131 @@
+"""
+客户端语音活动门控
+在发送到FunASR服务器之前过滤静音帧，只发送语音段及其前后的少量填充，
+降低长时间静音时的带宽占用和服务器VAD负载
+"""
+from collections import deque
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+class VoiceActivityGate:
+    """
+    基于短时能量和过零率的轻量语音活动门控
+
+    - 能量阈值随环境噪声自适应：门关闭时用指数滑动平均估计噪声能量，
+      阈值取 max(energy_threshold, 噪声能量 * noise_ratio)
+    - 过零率用于排除能量较高但明显不是语音的帧（如低频嗡声、高频噪声）
+    - 连续 start_frames 帧判定为语音后开门，并补发 pre_roll_ms 的预录帧，避免吞掉开头
+    - 语音结束后继续发送 hangover_ms 的填充再关门，避免截断尾音
+    """
+
+    def __init__(self, frame_ms: int = 60, energy_threshold: float = 300.0,
+                 noise_ratio: float = 3.0, zcr_min: float = 0.01, zcr_max: float = 0.5,
+                 start_frames: int = 2, pre_roll_ms: int = 300, hangover_ms: int = 600,
+                 **_ignored):
+        """
+        Args:
+            frame_ms: 每帧时长(毫秒)
+            energy_threshold: 最低能量阈值（int16 RMS）
+            noise_ratio: 能量需超过噪声估计的倍数
+            zcr_min: 语音帧最小过零率
+            zcr_max: 语音帧最大过零率
+            start_frames: 连续多少帧语音后开门
+            pre_roll_ms: 开门时补发的预录音频时长(毫秒)
+            hangover_ms: 语音结束后继续发送的时长(毫秒)
+        """
+        self.frame_ms = frame_ms
+        self.energy_threshold = energy_threshold
+        self.noise_ratio = noise_ratio
+        self.zcr_min = zcr_min
+        self.zcr_max = zcr_max
+        self.start_frames = max(1, start_frames)
+        self.hangover_frames = max(0, hangover_ms // frame_ms)
+        self._pre_roll: deque = deque(maxlen=max(self.start_frames, pre_roll_ms // frame_ms))
+
+        self.is_open = False
+        self.last_voiced = False  # 最近一帧是否判定为语音
+        self._voiced_run = 0
+        self._hangover_left = 0
+        self._noise_energy = energy_threshold / noise_ratio if noise_ratio else 0.0
+
+        self.stats = {"frames_total": 0, "frames_sent": 0, "bytes_total": 0, "bytes_sent": 0, "segments": 0}
+
+    def _is_voiced(self, frame: bytes) -> bool:
+        samples = np.frombuffer(frame, dtype=np.int16)
+        if samples.size == 0:
+            return False
+        energy = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2)))
+        signs = np.signbit(samples)
+        zcr = float(np.count_nonzero(signs[1:] != signs[:-1])) / samples.size
+
+        threshold = max(self.energy_threshold, self._noise_energy * self.noise_ratio)
+        voiced = energy >= threshold and self.zcr_min <= zcr <= self.zcr_max
+        if not voiced and not self.is_open:
+            # 只在门关闭期间更新噪声估计，避免把语音算进噪声
+            self._noise_energy = 0.95 * self._noise_energy + 0.05 * energy
+        return voiced
+
+    def process(self, frame: bytes) -> List[bytes]:
+        """
+        处理一帧音频
+
+        Args:
+            frame: 16bit单声道PCM音频帧
+
+        Returns:
+            List[bytes]: 需要发送的音频帧（门关闭时为空，开门时包含预录帧）
+        """
+        self.stats["frames_total"] += 1
+        self.stats["bytes_total"] += len(frame)
+        voiced = self._is_voiced(frame)
+        self.last_voiced = voiced
+
+        if self.is_open:
+            if voiced:
+                self._hangover_left = self.hangover_frames
+            elif self._hangover_left > 0:
+                self._hangover_left -= 1
+            else:
+                self.is_open = False
+                self._voiced_run = 0
+                self._pre_roll.append(frame)
+                return []
+            return self._emit([frame])
+
+        self._pre_roll.append(frame)
+        self._voiced_run = self._voiced_run + 1 if voiced else 0
+        if self._voiced_run < self.start_frames:
+            return []
+
+        self.is_open = True
+        self._hangover_left = self.hangover_frames
+        self.stats["segments"] += 1
+        frames = list(self._pre_roll)
+        self._pre_roll.clear()
+        return self._emit(frames)
+
+    def _emit(self, frames: List[bytes]) -> List[bytes]:
+        self.stats["frames_sent"] += len(frames)
+        self.stats["bytes_sent"] += sum(len(f) for f in frames)
+        return frames
+
+    def reset(self) -> None:
+        """重置门控状态（保留噪声估计和统计）"""
+        self.is_open = False
+        self._voiced_run = 0
+        self._hangover_left = 0
+        self._pre_roll.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取门控统计信息
+
+        Returns:
+            dict: 总帧数/字节数、实际发送帧数/字节数、节省字节数及比例、语音段数
+        """
+        stats = dict(self.stats)
+        stats["bytes_saved"] = stats["bytes_total"] - stats["bytes_sent"]
+        stats["saved_ratio"] = stats["bytes_saved"] / stats["bytes_total"] if stats["bytes_total"] else 0.0
+        return stats
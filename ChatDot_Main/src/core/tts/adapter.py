@@ -1,13 +1,17 @@
 import requests
+from functools import partial
 from global_managers.logger_manager import LoggerManager
+from utils.cancellation import close_connection
 
 class TTSAdapter:
-    def __init__(self, server_url: str = None):
+    def __init__(self, server_url: str = None, chunk_size: int = 8192):
         """
         初始化 TTS 客户端
         :param server_url: TTS 后端的服务器地址
+        :param chunk_size: 流式读取的块大小(字节)
         """
         self.server_url = server_url
+        self.chunk_size = chunk_size
 
     def set_server_url(self, server_url: str):
         """
@@ -68,9 +72,10 @@ class TTSAdapter:
         except Exception as e:
             return {"error": f"请求失败: {str(e)}"}
 
-    def synthesize(self, text: str, text_lang: str, ref_audio_path: str, prompt_lang: str, prompt_text: str, text_split_method: str, batch_size: int, media_type: str, streaming_mode: bool):
+    def synthesize(self, text: str, text_lang: str, ref_audio_path: str, prompt_lang: str, prompt_text: str, text_split_method: str, batch_size: int, media_type: str, streaming_mode: bool, cancel_token=None):
         """
         调用 TTS 后端进行语音合成（非流式）
+        :param cancel_token: 取消令牌，取消时关闭连接
         """
         if not self.server_url:
             raise ValueError("TTS 后端 URL 未设置")
@@ -90,17 +95,27 @@ class TTSAdapter:
 
         try:
             LoggerManager().get_logger().debug(f"tts.adapter: 请求 URL: {url}, 参数: {params}")
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                return response.content  # 返回完整的音频数据
-            else:
-                return {"error": f"请求失败，状态码: {response.status_code}", "details": response.text}
+            with requests.get(url, params=params, stream=cancel_token is not None) as response:
+                close = partial(close_connection, response)
+                if cancel_token is not None:
+                    cancel_token.add_callback(close)
+                try:
+                    if response.status_code == 200:
+                        return response.content  # 返回完整的音频数据
+                    else:
+                        return {"error": f"请求失败，状态码: {response.status_code}", "details": response.text}
+                finally:
+                    if cancel_token is not None:
+                        cancel_token.remove_callback(close)
         except Exception as e:
+            if cancel_token is not None and cancel_token.is_cancelled:
+                return {"error": "请求已取消"}
             return {"error": f"请求失败: {str(e)}"}
 
-    def synthesize_stream(self, text: str, text_lang: str, ref_audio_path: str, prompt_lang: str, prompt_text: str, text_split_method: str, batch_size: int, media_type: str, streaming_mode: bool):
+    def synthesize_stream(self, text: str, text_lang: str, ref_audio_path: str, prompt_lang: str, prompt_text: str, text_split_method: str, batch_size: int, media_type: str, streaming_mode: bool, cancel_token=None):
         """
         调用 TTS 后端进行语音合成（流式）
+        :param cancel_token: 取消令牌，取消时关闭连接并结束生成器
         """
         if not self.server_url:
             raise ValueError("TTS 后端 URL 未设置")
@@ -121,13 +136,25 @@ class TTSAdapter:
         try:
             LoggerManager().get_logger().debug(f"tts.adapter: 请求 URL: {url}, 参数: {params}")
             with requests.get(url, params=params, stream=True) as response:
-                if response.status_code == 200:
-                    for chunk in response.iter_content(chunk_size=1024):
-                        if chunk:
-                            yield chunk
-                else:
-                    yield {"error": f"请求失败，状态码: {response.status_code}", "details": response.text}
+                close = partial(close_connection, response)
+                if cancel_token is not None:
+                    # 阻塞在读取上时由取消方关闭连接
+                    cancel_token.add_callback(close)
+                try:
+                    if response.status_code == 200:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            if cancel_token is not None and cancel_token.is_cancelled:
+                                return
+                            if chunk:
+                                yield chunk
+                    else:
+                        yield {"error": f"请求失败，状态码: {response.status_code}", "details": response.text}
+                finally:
+                    if cancel_token is not None:
+                        cancel_token.remove_callback(close)
         except Exception as e:
+            if cancel_token is not None and cancel_token.is_cancelled:
+                return
             yield {"error": f"请求失败: {str(e)}"}
 
 # 测试用 main 函数
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from utils.path_utils import get_core_path
+from global_managers.logger_manager import LoggerManager
+
+DEFAULT_CACHE_DIR = os.path.join(get_core_path(), "SECRETS", "persistence", "tts", "audio_cache")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    规范化缓存文本：全角/半角统一、合并空白
+    标点会影响语气，因此保留
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class AudioCache:
+    """
+    合成音频缓存
+    - 以(规范化文本, 预设, 参考音频, 参考文本, 语言, 模型权重, 音频格式)的哈希为键
+    - 内存层: 按字节数限制的 LRU
+    - 磁盘层: 每条一个文件，超过容量时删除最久未使用的文件
+    """
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, memory_bytes: int = 32 * 1024 * 1024,
+                 disk_bytes: int = 256 * 1024 * 1024, max_text_chars: int = 50):
+        """
+        :param cache_dir: 磁盘缓存目录
+        :param memory_bytes: 内存层容量(字节)
+        :param disk_bytes: 磁盘层容量(字节)，0 表示不使用磁盘层
+        :param max_text_chars: 只缓存不超过该长度的文本，重复出现的多是问候语、语气词等短句
+        """
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_text_chars = max_text_chars
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk_size = None  # 磁盘层字节数，首次写入时统计
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(text: str, **params) -> str:
+        """
+        计算缓存键
+        :param text: 合成文本
+        :param params: 影响合成结果的参数
+        :return: 十六进制哈希
+        """
+        payload = json.dumps([normalize_text(text), params], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, text: str) -> bool:
+        """
+        文本是否适合缓存
+        """
+        return 0 < len(normalize_text(text)) <= self.max_text_chars
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".bin")
+
+    def get(self, key: str):
+        """
+        查找缓存
+        :param key: 缓存键
+        :return: 音频数据，未命中返回 None
+        """
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return audio
+
+        audio = None
+        if self.disk_bytes:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    audio = f.read()
+                os.utime(path)  # 记录最近使用时间，用于淘汰
+            except OSError:
+                audio = None
+
+        with self._lock:
+            if audio is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self._put_memory(key, audio)
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        """
+        写入缓存
+        :param key: 缓存键
+        :param audio: 完整的音频数据
+        """
+        if not audio:
+            return
+        with self._lock:
+            self._put_memory(key, audio)
+            self.stats["stores"] += 1
+        if self.disk_bytes:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(audio)
+                try:
+                    # 同一键可能已被写入（例如两个相同的短句都未命中），覆盖时扣除旧文件大小
+                    old_size = os.stat(path).st_size
+                except FileNotFoundError:
+                    old_size = 0
+                os.replace(tmp_path, path)
+                if self._disk_size is None:
+                    self._disk_size = sum(size for _, size, _ in self._disk_entries())
+                else:
+                    self._disk_size += len(audio) - old_size
+                if self._disk_size > self.disk_bytes:
+                    self._prune_disk()
+            except OSError as e:
+                LoggerManager().get_logger().warning(f"写入TTS音频缓存失败: {e}")
+
+    def _put_memory(self, key: str, audio: bytes):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        if len(audio) > self.memory_bytes:
+            return
+        self._memory[key] = audio
+        self._memory_size += len(audio)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _disk_entries(self) -> list:
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".bin"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _prune_disk(self):
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_size = total
+
+    def invalidate(self, clear_disk: bool = False):
+        """
+        使缓存失效
+        模型权重是缓存键的一部分，切换模型后旧条目不会再命中，默认只释放内存层
+        :param clear_disk: 是否同时删除磁盘层（例如同一路径的权重文件被重新训练）
+        """
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self.stats["invalidations"] += 1
+        if clear_disk:
+            for _, _, path in self._disk_entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._disk_size = None
+
+    def get_stats(self) -> dict:
+        """
+        获取统计信息
+        :return: 命中/未命中次数、命中率、内存层条目数与字节数
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_size"] = self._memory_size
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,248 @@
+import struct
+import time
+from global_managers.logger_manager import LoggerManager
+
+# 需要解码的压缩格式（GPT-SoVITS 的 media_type）
+COMPRESSED_MEDIA_TYPES = ("ogg", "aac")
+
+# AAC编码器在开头插入的静音采样数（FFmpeg的aac编码器为1024），ADTS中没有记录，按惯例丢弃
+AAC_PRIMING_SAMPLES = 1024
+
+
+def is_available() -> bool:
+    """
+    解码依赖 PyAV (pip install av)，未安装时只能使用 wav
+    """
+    try:
+        import av  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _xiph_lacing(packets: list) -> bytes:
+    """按 Xiph 方式打包 Vorbis 头部包，作为解码器的 extradata"""
+    data = bytearray([len(packets) - 1])
+    for packet in packets[:-1]:
+        size = len(packet)
+        data += b"\xff" * (size // 255) + bytes([size % 255])
+    for packet in packets:
+        data += packet
+    return bytes(data)
+
+
+class _OggStream:
+    """Ogg 中的一个逻辑流"""
+
+    def __init__(self):
+        self.partial = bytearray()  # 跨页的不完整数据包
+        self.headers = []           # 编解码器头部包
+        self.codec = None
+        self.resampler = None
+        self.pre_skip = 0           # OpusHead中的pre-skip，开头的这些采样由解码器丢弃
+        self.decoded = 0            # 已输出的采样数（解码器采样率）
+        self.end = None             # 有效采样总数，由最后一页的granule位置得到
+
+
+class StreamDecoder:
+    """
+    压缩音频增量解码器
+    - ogg: 自行解析 Ogg 页得到数据包，再交给 Vorbis/Opus 解码器；
+      服务端流式输出时每块都是一个完整的 Ogg 流，这些流首尾相接（链式 Ogg），按序列号逐个初始化解码器
+    - aac: ADTS 帧流，由解码器的 parser 按帧切分
+    数据可以在任意位置被拆分，输出为指定格式的16位PCM
+
+    编码器在每段开头和结尾补的静音会在段与段之间形成停顿，因此需要去掉：
+    - ogg: Opus的pre-skip由解码器按OpusHead丢弃；结尾按最后一页的granule位置截断
+    - aac: 丢弃开头的 AAC_PRIMING_SAMPLES 个采样；ADTS中没有总长度，结尾最后一帧的填充（不足一帧）无法去掉
+    """
+
+    def __init__(self, media_type: str, output_format):
+        """
+        :param media_type: ogg 或 aac
+        :param output_format: 输出的 AudioFormat（16位）
+        """
+        import av
+        self._av = av
+        self.media_type = media_type
+        self.output_format = output_format
+        self._layout = "mono" if output_format.channels == 1 else "stereo"
+        self.decode_seconds = 0.0  # 解码占用的CPU时间
+        self.reset()
+
+    def reset(self):
+        """
+        丢弃解码状态，开始新的一段音频
+        """
+        self._buffer = bytearray()
+        self._streams = {}
+        self._aac = None
+        self._aac_resampler = None
+        self._aac_skip = AAC_PRIMING_SAMPLES
+
+    def _new_resampler(self):
+        return self._av.AudioResampler(format="s16", layout=self._layout, rate=self.output_format.rate)
+
+    def feed(self, data: bytes) -> bytes:
+        """
+        解码数据块
+        :param data: 任意长度的压缩数据
+        :return: 解码得到的PCM
+        """
+        start_time = time.thread_time()
+        try:
+            if self.media_type == "aac":
+                return self._decode_aac(data)
+            self._buffer += data
+            return self._decode_ogg_pages()
+        finally:
+            self.decode_seconds += time.thread_time() - start_time
+
+    def flush(self) -> bytes:
+        """
+        取出解码器中剩余的数据（一段音频结束时调用）
+        :return: PCM
+        """
+        start_time = time.thread_time()
+        try:
+            if self.media_type == "aac" and self._aac is not None:
+                return self._decode_aac(None)
+            return b""
+        finally:
+            self.decode_seconds += time.thread_time() - start_time
+
+    def _resample(self, resampler, frames) -> bytes:
+        pcm = bytearray()
+        for frame in frames:
+            for output in resampler.resample(frame):
+                pcm += output.to_ndarray().tobytes()
+        return bytes(pcm)
+
+    def _decode_aac(self, data) -> bytes:
+        if self._aac is None:
+            self._aac = self._av.CodecContext.create("aac", "r")
+            self._aac_resampler = self._new_resampler()
+        pcm = bytearray()
+        for packet in self._aac.parse(data):
+            pcm += self._resample(self._aac_resampler, self._skip_priming(self._aac.decode(packet)))
+        if data is None:
+            pcm += self._resample(self._aac_resampler, self._skip_priming(self._aac.decode(None)))
+            pcm += self._resample(self._aac_resampler, [None])
+        return bytes(pcm)
+
+    def _skip_priming(self, frames):
+        """丢弃AAC开头编码器插入的采样"""
+        for frame in frames:
+            if self._aac_skip >= frame.samples:
+                self._aac_skip -= frame.samples
+                continue
+            if self._aac_skip:
+                frame = self._slice_frame(frame, self._aac_skip, frame.samples)
+                self._aac_skip = 0
+            yield frame
+
+    def _limit_frames(self, stream: _OggStream, frames):
+        """丢弃超出有效采样总数的部分（最后一个数据包中的填充）"""
+        for frame in frames:
+            samples = frame.samples
+            if stream.end is not None:
+                samples = min(samples, stream.end - stream.decoded)
+                if samples <= 0:
+                    continue
+                if samples < frame.samples:
+                    frame = self._slice_frame(frame, 0, samples)
+            stream.decoded += samples
+            yield frame
+
+    def _slice_frame(self, frame, start: int, stop: int):
+        """取音频帧中[start, stop)范围的采样"""
+        array = frame.to_ndarray()
+        if frame.format.is_planar:
+            array = array[:, start:stop]
+        else:
+            channels = len(frame.layout.channels)
+            array = array[:, start * channels:stop * channels]
+        sliced = self._av.AudioFrame.from_ndarray(array.copy(), format=frame.format.name, layout=frame.layout.name)
+        sliced.sample_rate = frame.sample_rate
+        return sliced
+
+    def _decode_ogg_pages(self) -> bytes:
+        pcm = bytearray()
+        while True:
+            start = self._buffer.find(b"OggS")
+            if start < 0:
+                # 保留可能是被截断的页头
+                del self._buffer[:max(0, len(self._buffer) - 3)]
+                break
+            if start:
+                del self._buffer[:start]
+            if len(self._buffer) < 27:
+                break
+            header_type = self._buffer[5]
+            granule = struct.unpack("<q", self._buffer[6:14])[0]
+            serial = struct.unpack("<I", self._buffer[14:18])[0]
+            segment_count = self._buffer[26]
+            header_size = 27 + segment_count
+            if len(self._buffer) < header_size:
+                break
+            lacing = self._buffer[27:header_size]
+            page_size = header_size + sum(lacing)
+            if len(self._buffer) < page_size:
+                break
+            body = bytes(self._buffer[header_size:page_size])
+            del self._buffer[:page_size]
+
+            if header_type & 0x02:
+                # 新的逻辑流开始
+                self._streams[serial] = _OggStream()
+            stream = self._streams.get(serial)
+            if stream is None:
+                continue
+            if header_type & 0x04 and granule >= 0:
+                # 最后一页的granule位置是含pre-skip的采样总数（48kHz/采样率），之后的是编码器的填充
+                stream.end = granule - stream.pre_skip
+            position = 0
+            for size in lacing:
+                stream.partial += body[position:position + size]
+                position += size
+                if size < 255:
+                    pcm += self._decode_ogg_packet(stream, bytes(stream.partial))
+                    stream.partial = bytearray()
+            if header_type & 0x04:
+                # 逻辑流结束
+                pcm += self._drain(stream)
+                del self._streams[serial]
+        return bytes(pcm)
+
+    def _decode_ogg_packet(self, stream: _OggStream, packet: bytes) -> bytes:
+        if stream.codec is None:
+            stream.headers.append(packet)
+            first = stream.headers[0]
+            if first.startswith(b"OpusHead"):
+                if len(stream.headers) < 2:  # OpusHead + OpusTags
+                    return b""
+                codec = self._av.CodecContext.create("opus", "r")
+                codec.extradata = first
+                stream.pre_skip = struct.unpack("<H", first[10:12])[0]
+            elif first.startswith(b"\x01vorbis"):
+                if len(stream.headers) < 3:  # 标识头 + 注释头 + 码本头
+                    return b""
+                codec = self._av.CodecContext.create("vorbis", "r")
+                codec.extradata = _xiph_lacing(stream.headers)
+            else:
+                LoggerManager().get_logger().warning("tts/audio_decoder: 不支持的 Ogg 编码")
+                stream.codec = False
+                return b""
+            stream.codec = codec
+            stream.resampler = self._new_resampler()
+            return b""
+        if stream.codec is False:
+            return b""
+        return self._resample(stream.resampler, self._limit_frames(stream, stream.codec.decode(self._av.Packet(packet))))
+
+    def _drain(self, stream: _OggStream) -> bytes:
+        if not stream.codec:
+            return b""
+        pcm = self._resample(stream.resampler, self._limit_frames(stream, stream.codec.decode(None)))
+        # 取出重采样器中剩余的采样
+        return pcm + self._resample(stream.resampler, [None])
@@ -1,16 +1,27 @@
 import pyaudio
-import queue
 import threading
-import io
-import wave
 import time
+from collections import deque
 import numpy as np
 from global_managers.logger_manager import LoggerManager
+from global_managers.trace_manager import TraceManager
+from global_managers.metrics_manager import MetricsManager
+from tts.audio_stream import AudioFormat, PcmConverter, RingBuffer, WavStreamParser, crossfade, fade
+from tts.audio_decoder import COMPRESSED_MEDIA_TYPES, StreamDecoder
 
 # 全局输出设备索引
 AUDIO_OUTPUT_DEVICE_INDEX = 8
 
 class AudioPlayer:
+    """
+    音频播放器（PyAudio 回调模式）
+    - feed_data 把数据交给增量WAV解析器，PCM写入环形缓冲区；声卡回调从缓冲区取数据
+    - 抖动缓冲：缓冲区积累到 jitter_ms 的音频（或一段音频已全部送达）后才开始出声，
+      播放中数据耗尽时记为一次欠载，重新积累后继续播放
+    - 只打开一个固定格式的输出流，各段音频先转换（位宽/声道/重采样）为输出格式，不再为每段重建流
+    - 相邻两段音频之间做短暂的交叉淡化，逐句合成的语音连续播放
+    - 压缩格式(ogg/aac)由增量解码器直接解码为输出格式
+    """
     _instance = None
     _lock = threading.Lock()
 
@@ -22,98 +33,371 @@ class AudioPlayer:
 
     def __init__(self, output_device_index=AUDIO_OUTPUT_DEVICE_INDEX):
         if not hasattr(self, 'initialized'):
-            self.audio_queue = queue.Queue()
-            self.play_thread = None
-            self.stop_flag = False
-            self.first_chunk = True
             self.pyaudio = pyaudio.PyAudio()
             self.stream = None
             self.output_device_index = output_device_index
+            self.jitter_ms = 120           # 开始播放前至少缓冲的音频时长
+            self.buffer_seconds = 10.0     # 环形缓冲区容量(秒)
+            self.frames_per_buffer = 1024  # 每次回调的帧数
+            self.crossfade_ms = 10         # 相邻两段之间的交叉淡化时长
+            self.parser = WavStreamParser()
+            self._decoders = {}            # 各压缩格式的解码器
+            self._decoder = None           # 当前段使用的解码器，wav 时为 None
+            self.format = AudioFormat(1, 32000, 2)  # 输出流的固定格式（GPT-SoVITS 默认输出32kHz单声道）
+            self.converter = PcmConverter(self.format)
+            self.ring = None
+            self.bytes_per_second = 0      # 输出格式每秒字节数
+            self._frame_size = 0
+            self._jitter_bytes = 0
+            self._crossfade_bytes = 0
+            self._tail = b""               # 暂不写入缓冲区的末尾数据，用于与下一段交叉淡化
+            self._segment_start = False    # 下一块数据是新一段音频的开头
+            self._tail_lock = threading.Lock()
+            self._flush_until = None       # 请求回调丢弃该写位置之前的数据
+            self._buffering = True         # 抖动缓冲中，尚未开始出声
+            self._ended = True             # 当前音频已全部送达
+            self._last_feed = 0.0
+            self._generation = 0           # 每次stop加一，等待写入的数据据此丢弃
+            self._feed_lock = threading.Lock()
+            self._stream_lock = threading.Lock()
+            self._space_event = threading.Event()
+            self._output_levels = deque(maxlen=64)  # 最近输出的(时间, RMS)，用于STT回声抑制
+            self._output_event = threading.Event()  # 每次开始出声时置位
+            self.last_output_start = 0.0   # 最近一次开始出声的时间(time.monotonic)
+            self._trace_id = None          # 当前音频所属的trace，首次出声时记录 audio.start
+            self._trace_pending = False
+            self.stats = {
+                "underruns": 0,        # 播放中缓冲区耗尽的次数
+                "underrun_bytes": 0,   # 欠载时补的静音字节数
+                "played_bytes": 0,     # 已播放的音频字节数
+                "fed_bytes": 0,        # 写入缓冲区的音频字节数
+                "dropped_bytes": 0,    # 停止播放时丢弃的字节数
+                "input_bytes": 0,      # 收到的原始（可能是压缩的）数据字节数
+                "decoded_bytes": 0,    # 压缩数据解码得到的PCM字节数
+                "decode_seconds": 0.0, # 解码占用的CPU时间
+            }
+            # 音频回调中只做计数，缓冲时长在采集时读取
+            metrics = MetricsManager()
+            self._underrun_counter = metrics.counter("audio_underruns_total", "播放中缓冲区耗尽的次数")
+            metrics.gauge("audio_buffered_seconds", "播放缓冲区中的音频时长(秒)").set_function(self.get_buffered_seconds)
             self.initialized = True
             #LoggerManager().get_logger().debug("AudioPlayer 初始化完成")
 
-    def start(self):
-        """启动播放线程"""
-        if self.play_thread is None or not self.play_thread.is_alive():
-            self.stop_flag = False
-            self.first_chunk = True  # 重置标志，用于识别头部WAV
-            self.play_thread = threading.Thread(target=self._play_from_queue)
-            self.play_thread.daemon = True
-            self.play_thread.start()
-            #LoggerManager().get_logger().debug("音频播放线程已启动")
+    def configure(self, jitter_ms=None, buffer_seconds=None, frames_per_buffer=None, crossfade_ms=None,
+                  output_rate=None, output_channels=None):
+        """
+        设置播放参数，缓冲区容量、回调帧数和输出格式在下次打开输出流时生效
+        :param jitter_ms: 开始播放前至少缓冲的音频时长(毫秒)
+        :param buffer_seconds: 环形缓冲区容量(秒)
+        :param frames_per_buffer: 每次回调的帧数
+        :param crossfade_ms: 相邻两段之间的交叉淡化时长(毫秒)，0 表示不淡化
+        :param output_rate: 输出流采样率
+        :param output_channels: 输出流声道数
+        """
+        if jitter_ms is not None:
+            self.jitter_ms = jitter_ms
+        if buffer_seconds is not None:
+            self.buffer_seconds = buffer_seconds
+        if frames_per_buffer is not None:
+            self.frames_per_buffer = frames_per_buffer
+        if crossfade_ms is not None:
+            self.crossfade_ms = crossfade_ms
+        if output_rate or output_channels:
+            audio_format = AudioFormat(output_channels or self.format.channels, output_rate or self.format.rate, 2)
+            if audio_format != self.format:
+                self.format = audio_format
+                self.converter = PcmConverter(audio_format)
+                self._decoders.clear()
+                self._close_stream()
+        self._update_sizes()
+
+    def _update_sizes(self):
+        """按输出格式计算各缓冲长度"""
+        self._frame_size = self.format.channels * self.format.sample_width
+        self.bytes_per_second = self.format.rate * self._frame_size
+        self._jitter_bytes = int(self.bytes_per_second * self.jitter_ms / 1000)
+        self._crossfade_bytes = int(self.format.rate * self.crossfade_ms / 1000) * self._frame_size
+
+    def start(self, media_type="wav", trace_id=None):
+        """
+        开始新的一段音频（例如一次合成响应）
+        :param media_type: 音频格式，wav 时下一个数据块应以WAV头开始；ogg/aac 使用解码器
+        :param trace_id: 所属的trace，该trace的音频第一次出声时记录 audio.start
+        """
+        if trace_id and trace_id != self._trace_id:
+            self._trace_id = trace_id
+            self._trace_pending = True
+        with self._feed_lock:
+            self._flush_decoder(self._generation)
+            self._decoder = self._get_decoder(media_type)
+            self.parser.begin()
+            self.converter.reset()
+            self._segment_start = True
+            self._ended = False
+
+    def _get_decoder(self, media_type):
+        """获取压缩格式的解码器，wav 返回 None"""
+        if media_type not in COMPRESSED_MEDIA_TYPES:
+            return None
+        decoder = self._decoders.get(media_type)
+        if decoder is None:
+            decoder = StreamDecoder(media_type, self.format)
+            self._decoders[media_type] = decoder
+        decoder.reset()
+        return decoder
+
+    def _flush_decoder(self, generation):
+        """写入解码器中剩余的数据"""
+        if self._decoder is None:
+            return
+        decode_seconds = self._decoder.decode_seconds
+        pcm = self._decoder.flush()
+        self.stats["decode_seconds"] += self._decoder.decode_seconds - decode_seconds
+        self.stats["decoded_bytes"] += len(pcm)
+        if pcm and self.stream is not None:
+            self._enqueue(pcm, generation)
+
+    def end_stream(self):
+        """当前音频已全部送达，缓冲区中剩余的数据播完后不计为欠载"""
+        with self._feed_lock:
+            self._flush_decoder(self._generation)
+            with self._tail_lock:
+                tail, self._tail = self._tail, b""
+                if tail and self.ring is not None:
+                    self._write(memoryview(fade(tail, fade_in=False)), self._generation)
+            self._ended = True
 
     def is_playing(self):
         """检查是否有音频正在播放"""
-        return self.stream is not None and self.stream.is_active() or not self.audio_queue.empty()
+        return self.ring is not None and self.ring.available() > 0
+
+    def get_queue_depth(self):
+        """获取缓冲区中等待播放的字节数"""
+        return self.ring.available() if self.ring is not None else 0
+
+    def get_buffered_seconds(self):
+        """获取缓冲区中尚未播放的音频时长(秒)"""
+        return self.audio_seconds(self.get_queue_depth())
+
+    def audio_seconds(self, size):
+        """按当前音频格式计算指定字节数的音频时长(秒)"""
+        return size / self.bytes_per_second if self.bytes_per_second else 0.0
+
+    def get_output_level(self, window_ms=300):
+        """
+        获取最近输出音频的电平，供STT回声抑制参考
+        :param window_ms: 统计的时间窗口(毫秒)，应覆盖回声路径延迟与混响
+        :return: 窗口内各回调块RMS的最大值（16位整数刻度），未出声时为0
+        """
+        since = time.monotonic() - window_ms / 1000
+        return max((level for t, level in list(self._output_levels) if t >= since), default=0.0)
+
+    def wait_output_start(self, since, timeout):
+        """
+        等待 since 之后第一次开始出声
+        :param since: time.monotonic() 时间
+        :param timeout: 最长等待时间(秒)
+        :return: 开始出声的时间，超时返回 None
+        """
+        deadline = time.monotonic() + timeout
+        while self.last_output_start < since:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self._output_event.wait(remaining)
+            self._output_event.clear()
+        return self.last_output_start
+
+    def get_stats(self):
+        """
+        获取播放统计信息
+        :return: 欠载次数、播放/写入/丢弃字节数、缓冲时长
+        """
+        stats = dict(self.stats)
+        stats["buffered_seconds"] = self.get_buffered_seconds()
+        audio_seconds = self.audio_seconds(stats["fed_bytes"])
+        decoded_seconds = self.audio_seconds(stats["decoded_bytes"])
+        # 每秒音频的传输字节数、解码CPU时间
+        stats["input_bytes_per_audio_second"] = stats["input_bytes"] / audio_seconds if audio_seconds else 0.0
+        stats["decode_cpu_per_audio_second"] = stats["decode_seconds"] / decoded_seconds if decoded_seconds else 0.0
+        return stats
 
     def stop(self):
-        """停止播放"""
-        self.stop_flag = True
-        
-        # 清空队列
-        while not self.audio_queue.empty():
-            try:
-                self.audio_queue.get_nowait()
-            except queue.Empty:
-                break
-        
-        # 停止并关闭流
-        if self.stream:
-            if self.stream.is_active():
-                self.stream.stop_stream()
-            self.stream.close()
-            self.stream = None
-        
+        """停止播放，丢弃缓冲区中的数据，输出流保持打开"""
+        self._generation += 1
+        self._space_event.set()  # 唤醒等待缓冲区空间的写入方，使其放弃写入
+        with self._feed_lock:
+            with self._stream_lock:
+                if self.ring is not None:
+                    self.stats["dropped_bytes"] += self.ring.available()
+                    if self.stream is not None and self.stream.is_active():
+                        # 缓冲区只能由消费者清空，交给回调在下一次执行时处理；
+                        # 只丢弃此刻之前写入的数据，之后新写入的音频照常播放
+                        self._flush_until = self.ring.write_position
+                    else:
+                        self.ring.clear()
+            self.parser.reset()
+            self.converter.reset()
+            if self._decoder is not None:
+                self._decoder.reset()
+            with self._tail_lock:
+                self._tail = b""
+        self._buffering = True
+        self._ended = True
         #LoggerManager().get_logger().debug("音频播放已停止")
 
-    def _play_from_queue(self):
-        """从队列中获取并播放音频数据"""
-        while not self.stop_flag:
-            try:
-                # 非阻塞方式获取数据
+    def _close_stream(self):
+        """关闭输出流"""
+        with self._stream_lock:
+            if self.stream:
+                if self.stream.is_active():
+                    self.stream.stop_stream()
+                self.stream.close()
+                self.stream = None
+            if self.ring is not None:
+                self.ring.clear()
+
+    def feed_data(self, audio_data: bytes):
+        """
+        添加音频数据，缓冲区满时等待（对合成请求形成背压）
+        :param audio_data: WAV数据块，可以在任意位置被拆分
+        """
+        if not audio_data:
+            return
+        generation = self._generation
+        with self._feed_lock:
+            self._ended = False
+            self.stats["input_bytes"] += len(audio_data)
+            if self._decoder is not None:
+                decode_seconds = self._decoder.decode_seconds
                 try:
-                    chunk = self.audio_queue.get(timeout=0.5)
-                except queue.Empty:
+                    pcm = self._decoder.feed(audio_data)
+                except Exception as e:
+                    LoggerManager().get_logger().warning(f"tts/audio_player: 音频解码失败: {e}")
+                    return
+                finally:
+                    self.stats["decode_seconds"] += self._decoder.decode_seconds - decode_seconds
+                self.stats["decoded_bytes"] += len(pcm)
+                if pcm:
+                    self._ensure_stream()
+                    self._enqueue(pcm, generation)
+                return
+            for audio_format, pcm in self.parser.feed(audio_data):
+                if audio_format is None or not pcm:
                     continue
-                
-                # 检查是否为WAV数据
-                if len(chunk) >= 44 and chunk.startswith(b'RIFF'):
-                    LoggerManager().get_logger().debug("收到WAV头部数据，开始播放音频")
-                    # 解析WAV头获取音频参数
-                    wav_file = wave.open(io.BytesIO(chunk))
-                    
-                    # 如果流存在且参数不同，则关闭重建
-                    if self.stream:
-                        self.stream.stop_stream()
-                        self.stream.close()
-                    
-                    # 创建新的音频流
-                    self.stream = self.pyaudio.open(
-                        format=self.pyaudio.get_format_from_width(wav_file.getsampwidth()),
-                        channels=wav_file.getnchannels(),
-                        rate=wav_file.getframerate(),
-                        output=True,
-                        output_device_index=self.output_device_index
-                    )
-                    
-                    # 跳过WAV头，播放剩余部分
-                    if len(chunk) > 44:
-                        audio_data = chunk[44:]
-                        if audio_data and self.stream:
-                            self.stream.write(audio_data)
+                try:
+                    pcm = self.converter.convert(audio_format, pcm)
+                except ValueError as e:
+                    LoggerManager().get_logger().warning(f"tts/audio_player: 音频格式转换失败: {e}")
+                    continue
+                if pcm:
+                    self._ensure_stream()
+                    self._enqueue(pcm, generation)
+
+    def _ensure_stream(self):
+        """输出流未打开时打开，之后一直复用"""
+        if self.stream is not None:
+            return
+        with self._stream_lock:
+            LoggerManager().get_logger().debug(f"打开音频输出流: {self.format}")
+            self._update_sizes()
+            self.ring = RingBuffer(max(int(self.bytes_per_second * self.buffer_seconds),
+                                       self._frame_size * self.frames_per_buffer * 2))
+            self._buffering = True
+            self._flush_until = None
+            self.stream = self.pyaudio.open(
+                format=self.pyaudio.get_format_from_width(self.format.sample_width),
+                channels=self.format.channels,
+                rate=self.format.rate,
+                output=True,
+                output_device_index=self.output_device_index,
+                frames_per_buffer=self.frames_per_buffer,
+                stream_callback=self._callback
+            )
+
+    def _enqueue(self, pcm: bytes, generation):
+        """
+        写入输出格式的PCM，末尾 crossfade_ms 的数据先保留，
+        新一段音频开头时与其交叉淡化；回调缺数据时会直接取走保留的数据
+        """
+        with self._tail_lock:
+            data = self._tail + pcm
+            if self._segment_start:
+                self._segment_start = False
+                head = len(self._tail)
+                size = min(head, len(pcm))
+                size -= size % self._frame_size
+                if size:
+                    # 上一段的末尾与这一段的开头重叠混合
+                    data = self._tail[:head - size] + crossfade(self._tail[head - size:], pcm[:size]) + pcm[size:]
                 else:
-                    # 如果是音频数据，直接播放
-                    if self.stream:
-                        self.stream.write(chunk)
-                    
-            except Exception as e:
-                LoggerManager().get_logger().warning(f"tts/audio_player: 音频播放错误: {e}")
-    
+                    # 上一段已播完，淡入避免爆音
+                    size = min(self._crossfade_bytes, len(pcm))
+                    size -= size % self._frame_size
+                    data = fade(pcm[:size], fade_in=True) + pcm[size:]
+            keep = min(self._crossfade_bytes, len(data))
+            self._tail = data[len(data) - keep:]
+            self._write(memoryview(data)[:len(data) - keep], generation)
 
-    def feed_data(self, audio_data: bytes):
-        """添加音频数据到播放队列"""
-        if audio_data:
-            self.audio_queue.put(audio_data)
+    def _write(self, data, generation):
+        """写入环形缓冲区，空间不足时等待回调取走数据"""
+        while data and generation == self._generation:
+            written = self.ring.write(data)
+            data = data[written:]
+            self.stats["fed_bytes"] += written
+            self._last_feed = time.monotonic()
+            if data:
+                self._space_event.wait(0.05)
+                self._space_event.clear()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """声卡回调，在PyAudio的线程中执行，不能阻塞"""
+        size = frame_count * self._frame_size
+        ring = self.ring
+        flush_until = self._flush_until
+        if flush_until is not None:
+            ring.skip_to(flush_until)
+            if self._flush_until == flush_until:
+                self._flush_until = None
+        available = ring.available()
+
+        if self._buffering:
+            # 抖动缓冲：数据足够，或已全部送达，或一段时间没有新数据时开始播放
+            waited = time.monotonic() - self._last_feed >= self.jitter_ms / 1000
+            if available and (available >= self._jitter_bytes or self._ended or waited):
+                self._buffering = False
+                self.last_output_start = time.monotonic()
+                self._output_event.set()
+                if self._trace_pending:
+                    self._trace_pending = False
+                    TraceManager().event("audio.start", trace_id=self._trace_id)
+            else:
+                return bytes(size), pyaudio.paContinue
+
+        data = ring.read(size)
+        self._space_event.set()
+        if len(data) < size and self._tail_lock.acquire(blocking=False):
+            # 缓冲区不够时取走为交叉淡化保留的末尾数据；写入方持有锁时不等待
+            try:
+                tail = self._tail[:size - len(data)]
+                self._tail = self._tail[len(tail):]
+                data += tail
+            finally:
+                self._tail_lock.release()
+        self.stats["played_bytes"] += len(data)
+        if data:
+            samples = np.frombuffer(data, dtype="<i2").astype(np.float32)
+            self._output_levels.append((time.monotonic(), float(np.sqrt(np.mean(samples * samples)))))
+        if len(data) < size:
+            if not self._ended:
+                # 音频尚未送达完毕缓冲区却已耗尽，会听到停顿
+                self.stats["underruns"] += 1
+                self.stats["underrun_bytes"] += size - len(data)
+                TraceManager().event("audio.underrun", trace_id=self._trace_id)
+                self._underrun_counter.inc()
+            self._buffering = True
+            data += bytes(size - len(data))
+        return data, pyaudio.paContinue
 
     def __del__(self):
         """析构函数，确保资源释放"""
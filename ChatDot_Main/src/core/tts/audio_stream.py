@@ -0,0 +1,329 @@
+import struct
+from collections import namedtuple
+import numpy as np
+from global_managers.logger_manager import LoggerManager
+
+# PCM 音频格式：声道数、采样率、每个采样的字节数
+AudioFormat = namedtuple("AudioFormat", ["channels", "rate", "sample_width"])
+
+_UNKNOWN_SIZES = (0, 0xFFFFFFFF)  # 流式WAV头中未知的长度字段
+
+
+class RingBuffer:
+    """
+    单生产者单消费者环形缓冲区
+    写位置只由生产者修改、读位置只由消费者修改，读写数据时无需加锁
+    读写位置是单调递增的计数，取模后才是缓冲区下标
+    """
+    def __init__(self, capacity: int):
+        """
+        :param capacity: 容量(字节)
+        """
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._read = 0
+        self._write = 0
+
+    def available(self) -> int:
+        """
+        可读取的字节数
+        """
+        return self._write - self._read
+
+    def free(self) -> int:
+        """
+        可写入的字节数
+        """
+        return self.capacity - (self._write - self._read)
+
+    def write(self, data) -> int:
+        """
+        写入数据（生产者调用）
+        :param data: bytes 或 memoryview
+        :return: 实际写入的字节数，缓冲区满时可能小于数据长度
+        """
+        size = min(len(data), self.free())
+        if size <= 0:
+            return 0
+        data = memoryview(data)
+        position = self._write % self.capacity
+        first = min(size, self.capacity - position)
+        self._buffer[position:position + first] = data[:first]
+        if size > first:
+            self._buffer[:size - first] = data[first:size]
+        self._write += size
+        return size
+
+    def read(self, size: int) -> bytes:
+        """
+        读取数据（消费者调用）
+        :param size: 最多读取的字节数
+        :return: 数据，可用数据不足时较短
+        """
+        size = min(size, self.available())
+        if size <= 0:
+            return b""
+        position = self._read % self.capacity
+        first = min(size, self.capacity - position)
+        data = bytes(self._buffer[position:position + first])
+        if size > first:
+            data += bytes(self._buffer[:size - first])
+        self._read += size
+        return data
+
+    @property
+    def write_position(self) -> int:
+        """
+        当前写位置，可用于 skip_to
+        """
+        return self._write
+
+    def skip_to(self, position: int):
+        """
+        丢弃写位置 position 之前的数据（消费者调用）
+        """
+        self._read = max(self._read, min(position, self._write))
+
+    def clear(self):
+        """
+        丢弃所有数据，只能在消费者停止时调用
+        """
+        self._read = self._write
+
+
+class WavStreamParser:
+    """
+    增量 WAV/RIFF 解析器
+    - 头部可以被拆分在任意多个数据块中，解析完成前先缓存
+    - 按块头遍历 fmt/data 等子块，不假设头部固定为44字节
+    - 流式响应中 data 长度未知时，把之后的数据都视为PCM
+    - 输出的PCM按完整的采样帧对齐，不完整的帧留到下次
+    """
+    def __init__(self):
+        self.format = None
+        self.reset()
+
+    def reset(self):
+        """
+        丢弃解析状态，下一个数据块应以RIFF头开始
+        """
+        self._pending = bytearray()
+        self._state = "riff"
+        self._remaining = None  # 当前子块(data/跳过的子块)剩余字节数，None表示长度未知
+
+    def begin(self):
+        """
+        开始新的音频流（例如新的一次合成响应）
+        """
+        self.reset()
+
+    def in_unbounded_data(self) -> bool:
+        """
+        是否正处于长度未知的data子块中
+        """
+        return self._state == "data" and self._remaining is None
+
+    def feed(self, data: bytes) -> list:
+        """
+        解析数据块
+        :param data: 任意长度的数据块
+        :return: [(AudioFormat, pcm_bytes), ...]
+        """
+        # 长度未知的data中不会再出现WAV头，只有新响应的第一个数据块会以RIFF开头
+        if self.in_unbounded_data() and data[:4] == b"RIFF" and data[8:12] in (b"WAVE", b""):
+            self.begin()
+
+        self._pending += data
+        output = []
+        while self._pending:
+            if self._state == "data":
+                pcm = self._take_pcm()
+                if pcm:
+                    output.append((self.format, pcm))
+                if self._state == "data":
+                    break
+            elif self._state == "skip":
+                size = min(self._remaining, len(self._pending))
+                del self._pending[:size]
+                self._remaining -= size
+                if self._remaining:
+                    break
+                self._state = "chunk"
+            elif not self._parse_header():
+                break
+        return output
+
+    def _parse_header(self) -> bool:
+        """
+        解析RIFF头或子块头
+        :return: 是否有进展，数据不足时返回False
+        """
+        if self._state == "riff" or (self._state == "chunk" and self._pending[:4] == b"RIFF"):
+            if len(self._pending) < 12:
+                if b"RIFF".startswith(bytes(self._pending[:4])):
+                    return False
+            elif self._pending[:4] == b"RIFF" and self._pending[8:12] == b"WAVE":
+                del self._pending[:12]
+                self._state = "chunk"
+                return True
+            if self.format is None:
+                LoggerManager().get_logger().warning("tts/audio_stream: 缺少WAV头，丢弃音频数据")
+                self._pending.clear()
+                return False
+            # 没有WAV头，按上一个格式作为PCM续流
+            self._state = "data"
+            self._remaining = None
+            return True
+
+        if len(self._pending) < 8:
+            return False
+        chunk_id = bytes(self._pending[:4])
+        size = struct.unpack("<I", self._pending[4:8])[0]
+
+        if chunk_id == b"data":
+            del self._pending[:8]
+            self._state = "data"
+            self._remaining = None if size in _UNKNOWN_SIZES else size
+            return True
+
+        padded = size + (size & 1)  # 子块按2字节对齐
+        if chunk_id == b"fmt ":
+            if len(self._pending) < 8 + padded:
+                return False
+            audio_format, channels, rate, _, _, bits = struct.unpack("<HHIIHH", self._pending[8:24])
+            if audio_format not in (1, 0xFFFE):
+                LoggerManager().get_logger().warning(f"tts/audio_stream: 不支持的WAV编码: {audio_format}")
+            self.format = AudioFormat(channels, rate, bits // 8)
+            del self._pending[:8 + padded]
+            return True
+
+        # 其他子块(LIST等)直接跳过
+        del self._pending[:8]
+        self._state = "skip"
+        self._remaining = padded
+        return True
+
+    def _take_pcm(self) -> bytes:
+        """
+        取出完整采样帧的PCM数据
+        """
+        size = len(self._pending)
+        if self._remaining is not None:
+            size = min(size, self._remaining)
+        frame_size = self.format.channels * self.format.sample_width if self.format else 1
+        if self._remaining is None or size < self._remaining:
+            size -= size % frame_size
+        pcm = bytes(self._pending[:size])
+        del self._pending[:size]
+        if self._remaining is not None:
+            self._remaining -= size
+            if self._remaining == 0:
+                self._state = "chunk"
+                self._remaining = None
+        return pcm
+
+
+class PcmConverter:
+    """
+    PCM 格式转换器，把任意格式的音频转换为输出流的固定格式(16位整数)
+    - 采样位宽：8/16/24/32位整数
+    - 声道：多声道取平均混为单声道，单声道复制为多声道
+    - 采样率：线性插值重采样，跨数据块保持插值位置，块边界处连续
+    格式与输出一致时直接返回原数据
+    """
+    def __init__(self, output_format: AudioFormat):
+        """
+        :param output_format: 输出格式，sample_width 须为2
+        """
+        self.output_format = output_format
+        self.reset()
+
+    def reset(self):
+        """
+        新的一段音频开始时调用，清除重采样状态
+        """
+        self._position = 0.0   # 下一个输出采样在输入中的位置（相对于_last）
+        self._last = None      # 上一个数据块的最后一帧
+
+    def convert(self, audio_format: AudioFormat, pcm: bytes) -> bytes:
+        """
+        转换一段PCM数据
+        :param audio_format: 输入格式
+        :param pcm: 完整采样帧的PCM数据
+        :return: 输出格式的PCM数据
+        """
+        if audio_format == self.output_format:
+            return pcm
+        samples = self._to_float(audio_format.sample_width, pcm).reshape(-1, audio_format.channels)
+        samples = self._convert_channels(samples, self.output_format.channels)
+        if audio_format.rate != self.output_format.rate:
+            samples = self._resample(samples, audio_format.rate / self.output_format.rate)
+        return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+    @staticmethod
+    def _to_float(sample_width: int, pcm: bytes) -> np.ndarray:
+        if sample_width == 1:
+            return (np.frombuffer(pcm, dtype=np.uint8).astype(np.float32) - 128) / 128
+        if sample_width == 2:
+            return np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768
+        if sample_width == 3:
+            raw = np.frombuffer(pcm, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+            values = np.where(values & 0x800000, values - 0x1000000, values)
+            return values.astype(np.float32) / 8388608
+        if sample_width == 4:
+            return np.frombuffer(pcm, dtype="<i4").astype(np.float32) / 2147483648
+        raise ValueError(f"不支持的采样位宽: {sample_width}")
+
+    @staticmethod
+    def _convert_channels(samples: np.ndarray, channels: int) -> np.ndarray:
+        if samples.shape[1] == channels:
+            return samples
+        mono = samples.mean(axis=1, keepdims=True)
+        return np.repeat(mono, channels, axis=1)
+
+    def _resample(self, samples: np.ndarray, step: float) -> np.ndarray:
+        """
+        线性插值重采样
+        :param samples: (帧数, 声道数)
+        :param step: 每个输出采样在输入中前进的距离（输入采样率/输出采样率）
+        """
+        if self._last is not None:
+            samples = np.vstack([self._last, samples])
+        if len(samples) < 2:
+            self._last = samples[-1:] if len(samples) else self._last
+            return np.zeros((0, samples.shape[1]), dtype=np.float32)
+        count = int(np.ceil((len(samples) - 1 - self._position) / step))
+        positions = self._position + np.arange(max(count, 0)) * step
+        index = np.arange(len(samples))
+        output = np.stack([np.interp(positions, index, samples[:, c]) for c in range(samples.shape[1])], axis=1)
+        # 下一块数据从本块最后一帧开始插值
+        self._position = self._position + max(count, 0) * step - (len(samples) - 1)
+        self._last = samples[-1:]
+        return output.astype(np.float32)
+
+
+def crossfade(previous: bytes, following: bytes) -> bytes:
+    """
+    对两段16位PCM做等功率交叉淡化
+    :param previous: 前一段的末尾
+    :param following: 后一段的开头，长度与 previous 相同
+    :return: 混合后的数据
+    """
+    a = np.frombuffer(previous, dtype="<i2").astype(np.float32)
+    b = np.frombuffer(following, dtype="<i2").astype(np.float32)
+    t = np.linspace(0.0, np.pi / 2, len(a), dtype=np.float32)
+    mixed = a * np.cos(t) + b * np.sin(t)
+    return np.clip(mixed, -32768, 32767).astype("<i2").tobytes()
+
+
+def fade(pcm: bytes, fade_in: bool) -> bytes:
+    """
+    对16位PCM做淡入或淡出，避免突然开始/结束时的爆音
+    :param pcm: 数据
+    :param fade_in: True 为淡入，False 为淡出
+    """
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+    ramp = np.linspace(0.0, 1.0, len(samples), dtype=np.float32)
+    samples *= ramp if fade_in else ramp[::-1]
+    return samples.astype("<i2").tobytes()
@@ -0,0 +1,96 @@
+"""
+TTS压缩音频解码测试
+用PyAV把合成的类语音信号编码为 ogg(opus) 和 aac，按流式读取的块大小喂给 StreamDecoder，
+统计每秒音频的传输字节数与解码CPU占用，并与同采样率的16位单声道WAV对比；
+输出时长与输入的差值是每段开头结尾残留的编码器静音
+（FFmpeg写Ogg Opus时granule位置多计了一次pre-skip，因此opus每段仍多出pre-skip个采样）
+
+用法（在core目录下，需要 pip install av）: python -m tts.decode_benchmark
+"""
+import io
+import math
+
+import numpy as np
+
+from tts.audio_decoder import StreamDecoder, is_available
+from tts.audio_stream import AudioFormat
+
+RATE = 32000                # GPT-SoVITS 默认输出采样率
+SEGMENT_SECONDS = 2.0       # 每段音频时长，服务端每段输出一个完整的 Ogg 流
+STREAM_CHUNK_SIZE = 8192    # 与 stream_chunk_size 设置的默认值一致
+
+
+def make_speech(seconds: float, rate: int = RATE, seed: int = 0) -> np.ndarray:
+    """
+    生成类语音信号：基频起伏的谐波音节（每秒约4个），音节间有短停顿，叠加少量噪声
+    :return: int16 单声道PCM
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    f0 = 160 + 40 * np.sin(2 * math.pi * 0.7 * t) + 20 * np.sin(2 * math.pi * 3.1 * t)
+    phase = 2 * math.pi * np.cumsum(f0) / rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 20))
+    syllable = np.clip(np.sin(2 * math.pi * 4 * t), 0, None) ** 0.5
+    signal = voice * syllable * 0.2 + rng.normal(0, 0.003, len(t))
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+
+
+def encode(pcm: np.ndarray, container_format: str, codec: str, rate: int = RATE) -> bytes:
+    """用PyAV把PCM编码为一个完整的文件"""
+    import av
+    output = io.BytesIO()
+    with av.open(output, "w", format=container_format) as container:
+        stream = container.add_stream(codec, rate=48000 if codec == "libopus" else rate)
+        stream.layout = "mono"
+        frame = av.AudioFrame.from_ndarray(pcm.reshape(1, -1), format="s16", layout="mono")
+        frame.rate = rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return output.getvalue()
+
+
+def run(media_type: str, segments: list) -> tuple:
+    """
+    按流式读取的块大小逐段解码，每段开始时像 AudioPlayer.start 一样 flush 并 reset 解码器
+    :return: (PCM字节数, 解码CPU秒数)
+    """
+    decoder = StreamDecoder(media_type, AudioFormat(1, RATE, 2))
+    pcm_bytes = 0
+    for data in segments:
+        decoder.reset()
+        for position in range(0, len(data), STREAM_CHUNK_SIZE):
+            pcm_bytes += len(decoder.feed(data[position:position + STREAM_CHUNK_SIZE]))
+        pcm_bytes += len(decoder.flush())
+    return pcm_bytes, decoder.decode_seconds
+
+
+def main(seconds: float = 60.0):
+    if not is_available():
+        print("未安装PyAV (pip install av)")
+        return
+    pcm = make_speech(seconds)
+    segment = int(SEGMENT_SECONDS * RATE)
+    segments = [pcm[i:i + segment] for i in range(0, len(pcm), segment)]
+    cases = [
+        ("ogg/opus", "ogg", lambda s: encode(s, "ogg", "libopus")),
+        ("aac", "aac", lambda s: encode(s, "adts", "aac")),
+    ]
+    print(f"音频时长 {seconds:.0f}s，{RATE}Hz 单声道，每段 {SEGMENT_SECONDS:.0f}s，读取块 {STREAM_CHUNK_SIZE}B")
+    print(f"{'格式':<12}{'KB/秒音频':>12}{'解码CPU(%核)':>16}{'输出时长(s)':>14}")
+    print(f"{'wav':<12}{RATE * 2 / 1000:>12.1f}{0.0:>16.2f}{seconds:>14.2f}")
+    for name, media_type, encoder in cases:
+        try:
+            encoded = [encoder(s) for s in segments]
+        except Exception as e:
+            print(f"{name:<12}编码失败: {e}")
+            continue
+        pcm_bytes, cpu_seconds = run(media_type, encoded)
+        size = sum(len(data) for data in encoded)
+        print(f"{name:<12}{size / seconds / 1000:>12.1f}{cpu_seconds / seconds * 100:>16.2f}"
+              f"{pcm_bytes / 2 / RATE:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
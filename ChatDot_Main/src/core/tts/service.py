@@ -5,10 +5,18 @@ from tts.settings import TTSSettings
 from tts.persistence import TTSPersistence
 from tts.audio_player import AudioPlayer
 from tts.audio_player import player
+from tts.audio_cache import AudioCache
+from tts import audio_decoder
 import time
 from typing import List, Dict, Optional
 from global_managers.logger_manager import LoggerManager
+from global_managers.trace_manager import TraceManager
+from global_managers.metrics_manager import MetricsManager
 from tts.tts_handle.manager import TTSHandleManager
+from tts.tts_handle.segmenter import IncrementalSegmenter, SENTENCE_END_PUNCTUATION
+from utils.cancellation import CancellationToken
+
+logger = LoggerManager().get_logger(__name__)
 
 class TTSService:
     """
@@ -22,6 +30,15 @@ class TTSService:
         
         # 初始化TTS处理器管理器
         self.handler_manager = TTSHandleManager()
+        # 备用处理方法使用的句子分割器
+        self._legacy_segmenter = IncrementalSegmenter(SENTENCE_END_PUNCTUATION)
+        
+        # 合成音频缓存，initialize时按设置创建
+        self.audio_cache = None
+        # 服务端实际加载的模型权重（直接切换模型时可能与设置不同）
+        self._loaded_weights = {}
+        # 当前合成请求共用的取消令牌，stop_playing 时取消并换新
+        self._cancel_token = CancellationToken()
 
     def initialize(self):
         """
@@ -38,18 +55,104 @@ class TTSService:
 
         # 检查是否需要初始化
         if not self.settings.get_setting("initialize"):
-            LoggerManager().get_logger().debug("TTS 初始化被禁用，跳过初始化")
+            logger.debug("TTS 初始化被禁用，跳过初始化")
             return
 
+        self._configure_audio_cache()
+        player.configure(**(self.settings.get_setting("audio_player") or {}))
+
         # 设置客户端 URL
         url = self.settings.get_setting("url")
         if url:
-            self.adapter = TTSAdapter(server_url=url)
+            self.adapter = TTSAdapter(server_url=url, chunk_size=self.settings.get_setting("stream_chunk_size"))
         else:
-            LoggerManager().get_logger().warning("警告: TTS URL 未设置，无法初始化客户端")
+            logger.warning("警告: TTS URL 未设置，无法初始化客户端")
 
         self._initialized = True
         
+    def _configure_audio_cache(self):
+        """按设置创建合成音频缓存"""
+        config = self.settings.get_setting("audio_cache") or {}
+        if not config.get("enabled", True):
+            self.audio_cache = None
+            return
+        self.audio_cache = AudioCache(
+            memory_bytes=int(config.get("memory_mb", 32) * 1024 * 1024),
+            disk_bytes=int(config.get("disk_mb", 256) * 1024 * 1024),
+            max_text_chars=config.get("max_text_chars", 50)
+        )
+
+    def _media_type(self) -> str:
+        """实际请求的音频格式，压缩格式的解码依赖未安装时退回 wav"""
+        media_type = self.settings.get_setting("media_type")
+        if media_type in audio_decoder.COMPRESSED_MEDIA_TYPES and not audio_decoder.is_available():
+            if not getattr(self, "_decoder_warned", False):
+                logger.warning(f"未安装 PyAV (pip install av)，无法解码 {media_type}，改用 wav")
+                self._decoder_warned = True
+            return "wav"
+        return media_type
+
+    def _audio_cache_key(self, text: str) -> str:
+        """计算合成音频的缓存键，包含所有影响合成结果的参数"""
+        get = self.settings.get_setting
+        return AudioCache.make_key(
+            text,
+            preset=get("current_preset"),
+            ref_audio_path=get("ref_audio_path"),
+            prompt_text=get("prompt_text"),
+            prompt_lang=get("prompt_lang"),
+            text_lang=get("text_lang"),
+            text_split_method=get("text_split_method"),
+            media_type=self._media_type(),
+            gpt_weights_path=self._loaded_weights.get("gpt", get("gpt_weights_path")),
+            sovits_weights_path=self._loaded_weights.get("sovits", get("sovits_weights_path")),
+        )
+
+    def _invalidate_audio_cache(self):
+        """模型或预设变化后释放缓存"""
+        if self.audio_cache:
+            self.audio_cache.invalidate()
+
+    def get_playback_stats(self) -> dict:
+        """
+        获取播放器统计信息（欠载次数、缓冲时长等）
+        """
+        return player.get_stats()
+
+    def get_output_level(self, window_ms: int = 300) -> float:
+        """
+        获取最近播放音频的电平（16位整数RMS），供STT回声抑制使用
+        """
+        return player.get_output_level(window_ms)
+
+    def wait_output_start(self, since: float, timeout: float):
+        """
+        等待 since(time.monotonic) 之后音频开始出声
+        :return: 开始出声的时间，超时返回 None
+        """
+        return player.wait_output_start(since, timeout)
+
+    def get_audio_cache_stats(self) -> dict:
+        """
+        获取合成音频缓存统计
+        :return: 统计信息，未启用缓存时为空
+        """
+        return self.audio_cache.get_stats() if self.audio_cache else {}
+
+    def _cache_stream(self, key: str, stream, cancel_token=None):
+        """透传流式音频块，完整接收后写入缓存（被取消的不完整音频不缓存）"""
+        chunks = []
+        for chunk in stream:
+            if isinstance(chunk, bytes):
+                chunks.append(chunk)
+            else:
+                chunks = None
+            yield chunk
+            if chunks is None:
+                return
+        if chunks and not (cancel_token and cancel_token.is_cancelled):
+            self.audio_cache.put(key, b"".join(chunks))
+
     def is_tts_enabled(self) -> bool:
         """
         检查 TTS 是否启用
@@ -64,7 +167,7 @@ class TTSService:
         Returns:
             bool: 是否有音频在播放
         """
-        #LoggerManager().get_logger().debug("检查是否有音频正在播放...")
+        #logger.debug("检查是否有音频正在播放...")
         if hasattr(self, '_text_buffer') and self._text_buffer:
             return True  # 缓冲区有内容，视为正在播放
         return player.is_playing() if hasattr(player, 'is_playing') else False
@@ -74,11 +177,17 @@ class TTSService:
         停止所有正在播放的TTS音频
         """
         # 清空缓冲区
-        LoggerManager().get_logger().debug("停止播放音频，清空缓冲区")
+        logger.debug("停止播放音频，清空缓冲区")
         if hasattr(self, '_text_buffer'):
             self._text_buffer = ""
         if hasattr(self, '_processed_sentences'):
             self._processed_sentences.clear()
+        handler = self.handler_manager.get_current_handler()
+        if handler:
+            handler.reset()
+        # 中断正在进行的合成请求
+        cancel_token, self._cancel_token = self._cancel_token, CancellationToken()
+        cancel_token.cancel("tts.stop_playing")
         # 停止播放器
         player.stop()
     
@@ -98,7 +207,9 @@ class TTSService:
         try:
             result = self.adapter.set_gpt_weights(weights_path)
             if result == "success":
-                LoggerManager().get_logger().debug(f"成功切换GPT模型: {weights_path}")
+                self._loaded_weights["gpt"] = weights_path
+                self._invalidate_audio_cache()
+                logger.debug(f"成功切换GPT模型: {weights_path}")
                 return True
             return {"error": f"切换GPT模型失败: {result}"}
         except Exception as e:
@@ -120,7 +231,9 @@ class TTSService:
         try:
             result = self.adapter.set_sovits_weights(weights_path)
             if result == "success":
-                LoggerManager().get_logger().debug(f"成功切换Sovits模型: {weights_path}")
+                self._loaded_weights["sovits"] = weights_path
+                self._invalidate_audio_cache()
+                logger.debug(f"成功切换Sovits模型: {weights_path}")
                 return True
             return {"error": f"切换Sovits模型失败: {result}"}
         except Exception as e:
@@ -196,6 +309,7 @@ class TTSService:
 
             # 3. 更新当前预设ID
             self.update_setting("current_preset", preset_id)
+            self._invalidate_audio_cache()
             
             # 4. 更新相关设置
             for key, value in preset.items():
@@ -208,10 +322,11 @@ class TTSService:
             return {"error": f"切换预设时发生错误: {str(e)}"}
     #endregion
 
-    def text_to_speech(self, text: str):
+    def text_to_speech(self, text: str, cancel_token: CancellationToken = None):
         """
         调用 TTS 客户端进行语音合成
         :param text: 文本内容
+        :param cancel_token: 取消令牌，取消时中断合成请求
         :return: 音频数据（字节流）或生成器
         """
         if not self.settings.get_setting("initialize"):
@@ -227,15 +342,24 @@ class TTSService:
         prompt_text = self.settings.get_setting("prompt_text")
         text_split_method = self.settings.get_setting("text_split_method")
         batch_size = self.settings.get_setting("batch_size")
-        media_type = self.settings.get_setting("media_type")
+        media_type = self._media_type()
         streaming_mode = self.settings.get_setting("streaming_mode")
 
         if not text_lang or not ref_audio_path or not prompt_lang or not prompt_text:
             raise ValueError(f"TTS 设置不完整，当前缺失的参数：{', '.join([param for param in ['text_lang', 'ref_audio_path', 'prompt_lang', 'prompt_text'] if not self.settings.get_setting(param)])}")
+
+        # 命中缓存时直接返回完整音频，不请求服务端
+        cache_key = None
+        if self.audio_cache and self.audio_cache.is_cacheable(text):
+            cache_key = self._audio_cache_key(text)
+            cached = self.audio_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("TTS缓存命中: %s", text)
+                return cached
                              
         if streaming_mode:
-            #LoggerManager().get_logger().debug("使用流式合成")
-            return self.adapter.synthesize_stream(
+            #logger.debug("使用流式合成")
+            stream = self.adapter.synthesize_stream(
                 text=text,
                 text_lang=text_lang,
                 ref_audio_path=ref_audio_path,
@@ -244,11 +368,13 @@ class TTSService:
                 text_split_method=text_split_method,
                 batch_size=batch_size,
                 media_type=media_type,
-                streaming_mode=True
+                streaming_mode=True,
+                cancel_token=cancel_token
             )
+            return self._cache_stream(cache_key, stream, cancel_token) if cache_key else stream
         else:
-            #LoggerManager().get_logger().debug("使用非流式合成")
-            return self.adapter.synthesize(
+            #logger.debug("使用非流式合成")
+            result = self.adapter.synthesize(
                 text=text,
                 text_lang=text_lang,
                 ref_audio_path=ref_audio_path,
@@ -257,18 +383,35 @@ class TTSService:
                 text_split_method=text_split_method,
                 batch_size=batch_size,
                 media_type=media_type,
-                streaming_mode=False
+                streaming_mode=False,
+                cancel_token=cancel_token
             )
+            if cache_key and isinstance(result, bytes):
+                self.audio_cache.put(cache_key, result)
+            return result
 
     def play_text_to_speech(self, text: str, force_play=True):
         """
         播放合成的语音
         """
-        LoggerManager().get_logger().debug("开始播放合成语音...")
-        result = self.text_to_speech(text)
+        with TraceManager().span("tts.synthesize", chars=len(text)) as span_attrs:
+            self._play_text_to_speech(text, force_play, span_attrs)
+
+    def _play_text_to_speech(self, text: str, force_play: bool, span_attrs: dict):
+        logger.debug("开始播放合成语音...")
+        start_time = time.time()
+        request_start = time.monotonic()
+        media_type = self._media_type()
+        cancel_token = self._cancel_token
+        result = self.text_to_speech(text, cancel_token)
         
+        if cancel_token.is_cancelled:
+            span_attrs["cancelled"] = True
+            return
         if not isinstance(result, (bytes, types.GeneratorType)):
-            LoggerManager().get_logger().debug(f"合成失败: {result}")
+            logger.debug("合成失败: %s", result)
+            span_attrs["error"] = str(result)
+            MetricsManager().counter("tts_errors_total", "TTS合成失败次数").inc()
             return
 
         try:
@@ -276,32 +419,61 @@ class TTSService:
                 # 强制停止任何正在播放的音频
                 player.stop()
             
-            # 重新启动播放器
-            player.start()
+            # 开始新的一段音频
+            player.start(media_type, trace_id=TraceManager().current_trace_id())
+            fed_bytes = player.stats["fed_bytes"]
             
             if isinstance(result, bytes):
                 # 非流式模式：直接播放完整音频
-                LoggerManager().get_logger().debug(f"播放完整音频，大小: {len(result)} 字节")
+                logger.debug("播放完整音频，大小: %d 字节", len(result))
+                span_attrs["complete"] = True  # 非流式或缓存命中
                 player.feed_data(result)
+                total_size = len(result)
             else:
                 # 流式模式：逐块处理
                 chunk_count = 0
                 total_size = 0
                 for chunk in result:
+                    if cancel_token.is_cancelled:
+                        # 被打断，剩余音频不再播放
+                        span_attrs["cancelled"] = True
+                        return
                     if isinstance(chunk, bytes):
+                        if not chunk_count:
+                            TraceManager().record("tts.first_byte", request_start, time.monotonic())
+                            MetricsManager().histogram("tts_first_byte_ms", "TTS请求到首个音频块的耗时(毫秒)").observe(
+                                (time.monotonic() - request_start) * 1000)
                         chunk_count += 1
                         chunk_size = len(chunk)
                         total_size += chunk_size
-                        #LoggerManager().get_logger().debug(f"处理第 {chunk_count} 个音频块，大小: {chunk_size} 字节")
+                        #logger.debug(f"处理第 {chunk_count} 个音频块，大小: {chunk_size} 字节")
+                        # 播放缓冲区满时feed_data会等待，不需要额外延迟
                         player.feed_data(chunk)
-                        # 添加小延迟，防止缓冲区溢出
-                        time.sleep(0.01)
                     else:
-                        LoggerManager().get_logger().warning(f"处理音频块失败: {chunk}")
+                        logger.warning(f"处理音频块失败: {chunk}")
                         break
-                LoggerManager().get_logger().debug(f"流式处理完成，共处理 {chunk_count} 个音频块，总大小 {total_size} 字节")
+                logger.debug("流式处理完成，共处理 %d 个音频块，总大小 %d 字节", chunk_count, total_size)
+            span_attrs["bytes"] = total_size
+            if cancel_token.is_cancelled:
+                span_attrs["cancelled"] = True
+                return
+            if force_play:
+                # 单独播放的音频已全部送达
+                player.end_stream()
+            synth_seconds = time.time() - start_time
+            audio_seconds = player.audio_seconds(player.stats["fed_bytes"] - fed_bytes)
+            metrics = MetricsManager()
+            metrics.histogram("tts_synthesize_ms", "一段文本合成并送入播放缓冲区的耗时(毫秒)").observe(synth_seconds * 1000)
+            metrics.counter("tts_audio_seconds_total", "合成的音频总时长(秒)").inc(audio_seconds)
+            self._report_synthesis(text, synth_seconds, audio_seconds)
         except Exception as e:
-            LoggerManager().get_logger().warning(f"播放音频时发生错误: {e}")
+            logger.warning(f"播放音频时发生错误: {e}")
+
+    def _report_synthesis(self, text: str, synth_seconds: float, audio_seconds: float):
+        """把合成耗时和音频时长反馈给当前TTS处理器"""
+        handler = self.handler_manager.get_current_handler()
+        if handler:
+            handler.on_synthesized(text, synth_seconds, audio_seconds)
             
     def realtime_play_text_to_speech(self, text_chunk=None, force_process=False):
         """
@@ -320,60 +492,50 @@ class TTSService:
         if not handler:
             # 降级到默认处理方式（旧的逻辑）
             self._legacy_realtime_play_text_to_speech(text_chunk, force_process)
-            return
-        
-        # 使用处理器处理文本
-        process_text, self._text_buffer = handler.process_text_chunk(
-            text_chunk, 
-            self._text_buffer,
-            force_process
-        )
+        else:
+            # 使用处理器处理文本
+            handler.on_playback_state(player.get_buffered_seconds())
+            process_text, self._text_buffer = handler.process_text_chunk(
+                text_chunk, 
+                self._text_buffer,
+                force_process
+            )
+            
+            # 处理得到的文本
+            if process_text and process_text.strip():
+                TraceManager().event("tts.segment", chars=len(process_text), buffered_seconds=round(player.get_buffered_seconds(), 3))
+                logger.debug("TTS处理器[%s]处理文本: %s", handler.__class__.__name__, process_text)
+                self.play_text_to_speech(process_text, force_play=False)
         
-        # 处理得到的文本
-        if process_text and process_text.strip():
-            LoggerManager().get_logger().debug(f"TTS处理器[{handler.__class__.__name__}]处理文本: {process_text}")
-            self.play_text_to_speech(process_text, force_play=False)
+        if force_process:
+            # 本轮回复的音频已全部送达，之后缓冲区耗尽不计为欠载
+            player.end_stream()
             
     def _legacy_realtime_play_text_to_speech(self, text_chunk=None, force_process=False):
         """
         旧的实时文本转语音处理，作为备用方法
         """
-        # 添加新文本到缓冲区
-        if text_chunk:
-            self._text_buffer += text_chunk
-        
-        # 定义句子结束标点
-        sentence_end_punctuation = ["。", "！", "？", ".", "!", "?", "\n"]
-        
         # 缓冲区为空直接返回
-        if not self._text_buffer:
+        if not self._text_buffer and not text_chunk:
             return
         
         # 强制处理模式 - 用于处理最后剩余的文本
         if force_process:
+            self._text_buffer += text_chunk or ""
+            self._legacy_segmenter.reset()
             if self._text_buffer.strip():
-                LoggerManager().get_logger().debug(f"强制处理剩余文本: {self._text_buffer}")
+                logger.debug("强制处理剩余文本: %s", self._text_buffer)
                 self.play_text_to_speech(self._text_buffer, force_play=False)
                 self._text_buffer = ""
             return
         
-        # 寻找句子结束标点
-        process_index = -1
-        for punct in sentence_end_punctuation:
-            pos = self._text_buffer.rfind(punct)
-            if pos > process_index:
-                process_index = pos
+        # 寻找句子结束标点，只扫描新增的文本
+        process_text, self._text_buffer = self._legacy_segmenter.split(text_chunk, self._text_buffer)
         
         # 如果找到标点，处理到该标点为止的文本
-        if process_index >= 0:
-            # 提取要处理的文本（包括标点）
-            process_text = self._text_buffer[:process_index + 1]
-            # 保留剩余文本在缓冲区
-            self._text_buffer = self._text_buffer[process_index + 1:]
-            
-            if process_text.strip():
-                LoggerManager().get_logger().debug(f"处理句子: {process_text}")
-                self.play_text_to_speech(process_text, force_play=False)
+        if process_text.strip():
+            logger.debug("处理句子: %s", process_text)
+            self.play_text_to_speech(process_text, force_play=False)
                 
     #region TTS处理器管理
     def get_tts_handler(self) -> str:
@@ -410,15 +572,31 @@ class TTSService:
         # URL 相关设置
         elif key == "url":
             if not self.adapter:
-                self.adapter = TTSAdapter(value)
+                self.adapter = TTSAdapter(value, chunk_size=self.settings.get_setting("stream_chunk_size"))
             else:
                 self.adapter.set_server_url(value)
         
+        # 合成音频缓存设置
+        elif key == "audio_cache":
+            self._configure_audio_cache()
+        
+        # 流式读取块大小
+        elif key == "stream_chunk_size" and self.adapter:
+            self.adapter.chunk_size = value
+        
+        # 播放器设置
+        elif key == "audio_player":
+            player.configure(**(value or {}))
+        
         # 模型相关设置
         elif key == "gpt_model_path":
             self.adapter.set_gpt_weights(value)
+            self._loaded_weights["gpt"] = value
+            self._invalidate_audio_cache()
         elif key == "sovits_model_path":
             self.adapter.set_sovits_weights(value)
+            self._loaded_weights["sovits"] = value
+            self._invalidate_audio_cache()
         
         # TTS 处理器相关设置
         elif key == "tts_handler" and hasattr(self, "handler_manager"):
@@ -442,6 +620,9 @@ class TTSService:
             "batch_size": self.settings.get_setting("batch_size"),
             "media_type": self.settings.get_setting("media_type"),
             "streaming_mode": self.settings.get_setting("streaming_mode"),
+            "stream_chunk_size": self.settings.get_setting("stream_chunk_size"),
+            "audio_cache": self.settings.get_setting("audio_cache"),
+            "audio_player": self.settings.get_setting("audio_player"),
             
             # 模型配置
             "sovits_model_path": self.settings.get_setting("sovits_model_path"),
@@ -462,7 +643,7 @@ class TTSService:
         """
         self.stop_playing()
         self.save_config()
-        LoggerManager().get_logger().debug("TTS服务已关闭")
+        logger.debug("TTS服务已关闭")
 
 
 if __name__ == "__main__":
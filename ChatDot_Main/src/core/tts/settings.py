@@ -12,8 +12,28 @@ DEFAULT_TTS_SETTINGS = {
     "prompt_lang": "zh",
     "text_split_method": "cut5",
     "batch_size": 1,
-    "media_type": "wav",
+    "media_type": "wav",  # wav / ogg / aac，服务端在远程时压缩格式可大幅减少传输量（需要 pip install av）；aac 每段结尾会留下不足一帧(32kHz时最多32ms)的编码填充，需要无缝衔接时用 ogg
     "streaming_mode": True,
+    "stream_chunk_size": 8192,  # 流式读取的块大小(字节)
+    
+    # 合成音频缓存：重复的问候语、语气词等直接从缓存播放
+    "audio_cache": {
+        "enabled": True,
+        "memory_mb": 32,       # 内存层容量
+        "disk_mb": 256,        # 磁盘层容量，0 表示不使用磁盘
+        "max_text_chars": 50,  # 只缓存不超过该长度的文本
+    },
+    
+    # 播放器：开始出声前的抖动缓冲、环形缓冲区容量、每次回调的帧数、
+    # 段间交叉淡化时长、输出流的固定采样率和声道数（不同格式的音频会先转换）
+    "audio_player": {
+        "jitter_ms": 120,
+        "buffer_seconds": 10.0,
+        "frames_per_buffer": 1024,
+        "crossfade_ms": 10,
+        "output_rate": 32000,
+        "output_channels": 1,
+    },
     
     # 模型配置
     "gpt_weights_path": None,
@@ -17,6 +17,30 @@ class BaseTTSHandler:
         """
         raise NotImplementedError("必须实现process_text_chunk方法")
     
+    def on_playback_state(self, buffered_seconds: float) -> None:
+        """
+        播放状态反馈，处理文本前调用，默认忽略
+        
+        Args:
+            buffered_seconds: 播放器中尚未播放的音频时长(秒)
+        """
+        pass
+    
+    def on_synthesized(self, text: str, synth_seconds: float, audio_seconds: float) -> None:
+        """
+        合成结果反馈，每段文本合成完成后调用，默认忽略
+        
+        Args:
+            text: 合成的文本
+            synth_seconds: 合成耗时(秒)
+            audio_seconds: 合成得到的音频时长(秒)
+        """
+        pass
+    
+    def reset(self) -> None:
+        """一轮回复结束或被打断时调用，清除处理器的内部状态"""
+        pass
+    
     def get_handler_info(self) -> Dict[str, Any]:
         """获取处理器信息"""
         return {
@@ -0,0 +1,86 @@
+"""
+TTS处理器分割性能测试
+模拟LLM逐token输出，比较旧的按标点逐个rfind的实现与增量分割器的耗时，并检查两者输出一致
+
+用法（在core目录下）: python -m tts.tts_handle.benchmark
+"""
+import random
+import time
+
+from tts.tts_handle.segmenter import SENTENCE_END_PUNCTUATION, SEMANTIC_SEPARATORS
+from tts.tts_handle.providers.sentence import ContextHandler as SentenceHandler
+from tts.tts_handle.providers.semantic import ContextHandler as SemanticHandler
+
+
+class _RfindHandler:
+    """旧实现：每次对整个缓冲区按每个标点调用rfind"""
+
+    def __init__(self, punctuation):
+        self.punctuation = list(punctuation)
+
+    def process_text_chunk(self, text_chunk, buffer, force_process=False):
+        new_buffer = buffer + (text_chunk or "")
+        if force_process:
+            return new_buffer.strip(), ""
+        last_pos = -1
+        for punct in self.punctuation:
+            pos = new_buffer.rfind(punct)
+            if pos > last_pos:
+                last_pos = pos
+        if last_pos >= 0:
+            return new_buffer[:last_pos + 1], new_buffer[last_pos + 1:]
+        return "", new_buffer
+
+
+def make_tokens(sentence_chars: int, sentences: int, separators: str, seed: int = 0) -> list:
+    """生成模拟的token流，每个token 1~3个字符"""
+    rng = random.Random(seed)
+    text = []
+    for _ in range(sentences):
+        for i in range(sentence_chars):
+            text.append(rng.choice(separators) if i and i % 40 == 0 else chr(0x4e00 + rng.randrange(2000)))
+        text.append(rng.choice("。！？"))
+    text = "".join(text)
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 3)
+        tokens.append(text[pos:pos + step])
+        pos += step
+    return tokens
+
+
+def run(handler, tokens: list) -> tuple:
+    """按服务的调用方式处理token流，返回(输出片段, 耗时秒)"""
+    buffer = ""
+    outputs = []
+    start_time = time.perf_counter()
+    for token in tokens:
+        text, buffer = handler.process_text_chunk(token, buffer)
+        if text:
+            outputs.append(text)
+    text, buffer = handler.process_text_chunk("", buffer, True)
+    if text:
+        outputs.append(text)
+    return outputs, time.perf_counter() - start_time
+
+
+def main():
+    cases = [
+        ("sentence", SentenceHandler, SENTENCE_END_PUNCTUATION),
+        ("semantic", SemanticHandler, SEMANTIC_SEPARATORS),
+    ]
+    print(f"{'处理器':<10}{'句长':>8}{'token数':>10}{'旧实现(ms)':>14}{'新实现(ms)':>14}{'加速比':>10}")
+    for name, handler_class, punctuation in cases:
+        # 长句时旧实现的重复扫描最明显；句中每40字插入一个逗号，只对语义处理器是分割点
+        for sentence_chars in (50, 500, 5000):
+            tokens = make_tokens(sentence_chars, 20, SEMANTIC_SEPARATORS)
+            old_outputs, old_time = run(_RfindHandler(punctuation), tokens)
+            new_outputs, new_time = run(handler_class(), tokens)
+            assert old_outputs == new_outputs, f"{name} 输出不一致"
+            print(f"{name:<10}{sentence_chars:>8}{len(tokens):>10}{old_time * 1000:>14.2f}"
+                  f"{new_time * 1000:>14.2f}{old_time / new_time:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
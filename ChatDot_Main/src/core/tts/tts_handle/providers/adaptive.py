@@ -0,0 +1,134 @@
+from tts.tts_handle.base import BaseTTSHandler
+from tts.tts_handle.segmenter import IncrementalSegmenter, SENTENCE_END_PUNCTUATION, SEMANTIC_SEPARATORS
+from typing import Tuple, Dict, Any
+
+class ContextHandler(BaseTTSHandler):
+    """
+    自适应TTS处理器
+
+    - 首段：遇到第一个语义分隔符（或达到首段上限）立即合成，尽快出声
+    - 之后：根据实测的合成速度和播放器中剩余的音频时长计算分段长度，
+      播放器缓冲越多，分段越长（语调更自然、请求更少）；缓冲快耗尽时缩短分段，避免播放中断
+    """
+
+    def __init__(self, first_min_chars=4, first_max_chars=16, min_chars=8, max_chars=120,
+                 safety=0.7, seconds_per_char=0.22, real_time_factor=0.5, smoothing=0.3):
+        """
+        Args:
+            first_min_chars: 首段最少字符数
+            first_max_chars: 首段最多字符数，没有分隔符时到此长度直接切分
+            min_chars: 之后分段的最少字符数
+            max_chars: 之后分段的最多字符数
+            safety: 只使用播放器剩余音频时长的这一比例来估算，留出网络抖动的余量
+            seconds_per_char: 每个字符对应音频时长的初始估计(秒)
+            real_time_factor: 合成耗时与音频时长之比的初始估计
+            smoothing: 实测值的指数平滑系数
+        """
+        self.first_min_chars = first_min_chars
+        self.first_max_chars = first_max_chars
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.safety = safety
+        self.seconds_per_char = seconds_per_char
+        self.real_time_factor = real_time_factor
+        self.smoothing = smoothing
+
+        self.sentence_segmenter = IncrementalSegmenter(SENTENCE_END_PUNCTUATION)
+        self.semantic_segmenter = IncrementalSegmenter(SENTENCE_END_PUNCTUATION + SEMANTIC_SEPARATORS)
+        self.buffered_seconds = 0.0  # 播放器中剩余的音频时长
+        self._first_segment = True
+        # 上次未切分而原样返回的缓冲区及其中最后的句末/语义分割点，下次只扫描新增部分
+        self._pending = None
+        self._boundaries = (-1, -1)
+        self.stats = {"segments": 0, "chars": 0, "underruns": 0}
+
+    def target_chars(self) -> int:
+        """当前分段的目标字符数"""
+        if self._first_segment:
+            return self.first_min_chars
+        # 下一段必须在播放器剩余音频播完前合成出来：字符数 × 每字音频时长 × 实时率 ≤ 剩余时长
+        budget = self.buffered_seconds * self.safety
+        chars = int(budget / (self.seconds_per_char * self.real_time_factor))
+        return max(self.min_chars, min(self.max_chars, chars))
+
+    def process_text_chunk(self, text_chunk: str, buffer: str, force_process: bool = False) -> Tuple[str, str]:
+        """按自适应长度切分文本"""
+        # 缓冲区是上次原样返回的结果时只需扫描新增部分，否则从头扫描
+        if buffer is self._pending or buffer == self._pending:
+            start = len(buffer)
+            sentence_index, semantic_index = self._boundaries
+        else:
+            start = 0
+            sentence_index, semantic_index = -1, -1
+        self._pending = None
+        new_buffer = buffer + (text_chunk or "")
+
+        if not new_buffer:
+            return "", new_buffer
+
+        if force_process:
+            self.reset()
+            return new_buffer.strip(), ""
+
+        target = self.target_chars()
+        if len(new_buffer) < target:
+            return "", new_buffer
+
+        # 优先在句末切分，其次在语义分隔符处切分
+        index = self.sentence_segmenter.rfind_boundary(new_buffer, start)
+        if index >= 0:
+            sentence_index = index
+        index = self.semantic_segmenter.rfind_boundary(new_buffer, start)
+        if index >= 0:
+            semantic_index = index
+        cut = sentence_index + 1
+        if cut < target:
+            cut = semantic_index + 1
+        if cut < target:
+            # 没有合适的分隔符，超过上限后强制切分
+            limit = self.first_max_chars if self._first_segment else min(self.max_chars, target * 2)
+            if len(new_buffer) < limit:
+                self._pending = new_buffer
+                self._boundaries = (sentence_index, semantic_index)
+                return "", new_buffer
+            if cut < self.min_chars:
+                cut = len(new_buffer)
+
+        process_text = new_buffer[:cut]
+        if self.buffered_seconds <= 0 and not self._first_segment:
+            self.stats["underruns"] += 1  # 播放器已播完，下一段到达前会有停顿
+        self._first_segment = False
+        self.stats["segments"] += 1
+        self.stats["chars"] += len(process_text)
+        return process_text, new_buffer[cut:]
+
+    def on_playback_state(self, buffered_seconds: float) -> None:
+        self.buffered_seconds = max(0.0, buffered_seconds)
+
+    def on_synthesized(self, text: str, synth_seconds: float, audio_seconds: float) -> None:
+        chars = len(text.strip())
+        if chars <= 0 or audio_seconds <= 0:
+            return
+        alpha = self.smoothing
+        self.seconds_per_char += alpha * (audio_seconds / chars - self.seconds_per_char)
+        self.real_time_factor += alpha * (synth_seconds / audio_seconds - self.real_time_factor)
+
+    def reset(self) -> None:
+        self._first_segment = True
+        self._pending = None
+        self.buffered_seconds = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取分段统计信息"""
+        stats = dict(self.stats)
+        stats["avg_chars"] = stats["chars"] / stats["segments"] if stats["segments"] else 0.0
+        stats["seconds_per_char"] = self.seconds_per_char
+        stats["real_time_factor"] = self.real_time_factor
+        stats["target_chars"] = self.target_chars()
+        return stats
+
+    def get_handler_info(self) -> Dict[str, Any]:
+        return {
+            "name": "自适应处理器",
+            "description": "首段尽快合成以缩短首次出声时间，之后根据合成速度和播放缓冲调整分段长度"
+        }
@@ -1,36 +1,25 @@
 from tts.tts_handle.base import BaseTTSHandler
+from tts.tts_handle.segmenter import IncrementalSegmenter, SENTENCE_END_PUNCTUATION
 from typing import Tuple, Dict, Any
 
 class ContextHandler(BaseTTSHandler):
     """基于句子的TTS处理器，根据句子结束标点分割文本"""
     
+    def __init__(self):
+        # 句子结束标点，增量扫描
+        self.segmenter = IncrementalSegmenter(SENTENCE_END_PUNCTUATION)
+    
     def process_text_chunk(self, text_chunk: str, buffer: str, force_process: bool = False) -> Tuple[str, str]:
         """按句子切分文本"""
-        new_buffer = buffer + (text_chunk or "")
-        
-        if not new_buffer:
-            return "", new_buffer
+        if not buffer and not text_chunk:
+            return "", ""
             
+        process_text, remaining_buffer = self.segmenter.split(text_chunk, buffer, force_process)
         if force_process:
-            return new_buffer.strip(), ""
-            
-        # 句子结束标点
-        sentence_end_punctuation = ["。", "！", "？", ".", "!", "?", "\n"]
-        
-        # 寻找句子结束标点
-        process_index = -1
-        for punct in sentence_end_punctuation:
-            pos = new_buffer.rfind(punct)
-            if pos > process_index:
-                process_index = pos
-                
-        # 处理找到的句子
-        if process_index >= 0:
-            process_text = new_buffer[:process_index + 1]
-            remaining_buffer = new_buffer[process_index + 1:]
-            return process_text, remaining_buffer
+            return process_text.strip(), ""
             
-        return "", new_buffer
+        # 返回找到的句子（未找到时为空）
+        return process_text, remaining_buffer
         
     def get_handler_info(self) -> Dict[str, Any]:
         return {
@@ -1,4 +1,5 @@
 from tts.tts_handle.base import BaseTTSHandler
+from tts.tts_handle.segmenter import IncrementalSegmenter, SENTENCE_END_PUNCTUATION
 from typing import Tuple, Dict, Any
 
 class ContextHandler(BaseTTSHandler):
@@ -11,20 +12,20 @@ class ContextHandler(BaseTTSHandler):
         """初始化处理器状态。"""
         self._buffer = ""  # 用于累积跨块的文本
         self._in_tts_tag = False  # 标记当前是否在<tts>标签内
-        # 定义句子结束标点
-        self._sentence_end_punctuation = ["。", "！", "？", ".", "!", "?", "\n"]
+        self._returned = ""  # 上次返回的缓冲区，其中已扫描过的部分下次不再重复扫描
+        # 句子结束标点
+        self._segmenter = IncrementalSegmenter(SENTENCE_END_PUNCTUATION)
         self._start_tag = "<tts>"
         self._end_tag = "</tts>"
 
-    def _find_last_sentence_end(self, text: str) -> int:
-        """在文本中查找最后一个句子结束标点的位置。""" 
-        last_pos = -1
-        for punct in self._sentence_end_punctuation:
-            # 使用rfind从右侧查找最后一个标点
-            pos = text.rfind(punct)
-            if pos > last_pos:
-                last_pos = pos
-        return last_pos
+    def _find_last_sentence_end(self, text: str, start: int = 0) -> int:
+        """在文本中查找最后一个句子结束标点的位置，start之前的部分已确认没有标点。"""
+        return self._segmenter.rfind_boundary(text, start)
+
+    @staticmethod
+    def _tag_search_start(scanned: int, tag: str) -> int:
+        """已扫描部分的末尾可能是被切断的标签，需要从标签长度之前开始查找。"""
+        return max(0, scanned - len(tag) + 1)
 
     def process_text_chunk(self, text_chunk: str, buffer: str, force_process: bool = False) -> Tuple[str, str]:
         """
@@ -40,6 +41,8 @@ class ContextHandler(BaseTTSHandler):
             - processed_text: 本次调用提取到的、属于<tts>标签内的完整句子组合。
             - new_buffer: 更新后的缓冲区内容，供下一次调用使用。
         """
+        # 缓冲区是上次返回的结果时，其中的内容已扫描过（无完整标签、标签内无句末标点）
+        scanned = len(buffer) if buffer is self._returned or buffer == self._returned else 0
         # 合并旧缓冲区和新文本块
         self._buffer = buffer + (text_chunk or "")
         processed_text = "" # 本次调用要返回的文本
@@ -53,7 +56,7 @@ class ContextHandler(BaseTTSHandler):
 
             if not self._in_tts_tag:
                 # 当前不在<tts>标签内，查找起始标签
-                start_tag_index = self._buffer.find(self._start_tag)
+                start_tag_index = self._buffer.find(self._start_tag, self._tag_search_start(scanned, self._start_tag))
                 if start_tag_index != -1:
                     # 找到起始标签，丢弃标签前的内容，更新缓冲区和状态
                     self._buffer = self._buffer[start_tag_index + len(self._start_tag):]
@@ -68,14 +71,14 @@ class ContextHandler(BaseTTSHandler):
 
             elif self._in_tts_tag:
                 # 当前在<tts>标签内，查找结束标签
-                end_tag_index = self._buffer.find(self._end_tag)
+                end_tag_index = self._buffer.find(self._end_tag, self._tag_search_start(scanned, self._end_tag))
                 if end_tag_index != -1:
                     # 找到结束标签
                     content_in_tag = self._buffer[:end_tag_index]
                     remaining_after_tag = self._buffer[end_tag_index + len(self._end_tag):]
 
                     # 在标签内容中查找最后一个句子结束标点
-                    last_punct_index = self._find_last_sentence_end(content_in_tag)
+                    last_punct_index = self._find_last_sentence_end(content_in_tag, min(scanned, len(content_in_tag)))
 
                     if last_punct_index != -1:
                         # 找到完整句子
@@ -95,7 +98,7 @@ class ContextHandler(BaseTTSHandler):
                     self._in_tts_tag = False
                 else:
                     # 未找到结束标签，当前缓冲区全部内容都在<tts>标签内（或其开始部分）
-                    last_punct_index = self._find_last_sentence_end(self._buffer)
+                    last_punct_index = self._find_last_sentence_end(self._buffer, scanned)
                     if last_punct_index != -1:
                         # 在当前缓冲区（标签内）找到完整句子
                         sentences_to_add = self._buffer[:last_punct_index + 1].strip()
@@ -123,8 +126,11 @@ class ContextHandler(BaseTTSHandler):
             # 防止无限循环：如果缓冲区和标签状态在一轮处理后没有变化，则退出
             if self._buffer == initial_buffer_state and self._in_tts_tag == initial_tag_state:
                 break
+            # 缓冲区已改变，之后需要从头扫描
+            scanned = 0
 
         # 返回本次处理累积的文本和最终的缓冲区状态
+        self._returned = self._buffer
         return processed_text, self._buffer
 
     def get_handler_info(self) -> Dict[str, Any]:
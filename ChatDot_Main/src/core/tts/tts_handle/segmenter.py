@@ -0,0 +1,74 @@
+import re
+from typing import Tuple
+
+# 常用分割标点
+SENTENCE_END_PUNCTUATION = "。！？.!?\n"
+SEMANTIC_SEPARATORS = "，；,;：:、"
+
+
+class IncrementalSegmenter:
+    """
+    增量文本分割器，供TTS处理器共用
+
+    流式输出时缓冲区每次只增加一个小文本块，旧实现每次都对整个缓冲区按每个标点调用rfind，
+    已扫描过的文本被反复扫描。本分割器记住上次返回的缓冲区（其中已确认没有分割点），
+    下次只扫描新增的部分；分割点用预编译正则一次查找，与标点数量无关。
+    """
+
+    def __init__(self, punctuation: str):
+        """
+        Args:
+            punctuation: 分割标点（单个字符的集合）
+        """
+        self.punctuation = frozenset(punctuation)
+        chars = "".join(re.escape(c) for c in sorted(self.punctuation))
+        # 匹配"其后再无分割标点"的标点，即最后一个分割点
+        self._last_boundary = re.compile(f"[{chars}][^{chars}]*\\Z")
+        self._pending = ""  # 上次返回的缓冲区，已确认其中没有分割点
+
+    def rfind_boundary(self, text: str, start: int = 0) -> int:
+        """
+        查找text[start:]中最后一个分割标点的位置
+
+        Args:
+            text: 文本
+            start: 开始扫描的位置，之前的部分视为已扫描
+
+        Returns:
+            int: 位置，未找到返回-1
+        """
+        match = self._last_boundary.search(text, start)
+        return match.start() if match else -1
+
+    def split(self, text_chunk: str, buffer: str, force_process: bool = False) -> Tuple[str, str]:
+        """
+        把新文本块追加到缓冲区，并在最后一个分割点处切分
+
+        Args:
+            text_chunk: 新的文本块
+            buffer: 当前缓冲区
+            force_process: 是否返回整个缓冲区
+
+        Returns:
+            tuple[str, str]: (到最后一个分割点为止的文本, 剩余缓冲区)
+        """
+        # 缓冲区是上次返回的结果时只需扫描新增部分，否则从头扫描
+        start = len(buffer) if buffer is self._pending or buffer == self._pending else 0
+        new_buffer = buffer + (text_chunk or "")
+
+        if force_process:
+            self._pending = ""
+            return new_buffer, ""
+
+        index = self.rfind_boundary(new_buffer, start)
+        if index >= 0:
+            remaining = new_buffer[index + 1:]
+            self._pending = remaining
+            return new_buffer[:index + 1], remaining
+
+        self._pending = new_buffer
+        return "", new_buffer
+
+    def reset(self) -> None:
+        """清除扫描状态"""
+        self._pending = ""
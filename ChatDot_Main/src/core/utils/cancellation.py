@@ -0,0 +1,125 @@
+import socket
+import threading
+from global_managers.logger_manager import LoggerManager
+
+
+class CancellationToken:
+    """
+    取消令牌，一轮回复中的各环节（LLM请求、TTS合成、Live2D分发、音频播放）共用一个令牌
+    - 循环中通过 is_cancelled 检查
+    - 阻塞在网络读取等操作上的环节通过 add_callback 注册回调（例如关闭连接），取消时立即执行
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def is_cancelled(self) -> bool:
+        """是否已取消"""
+        return self._event.is_set()
+
+    def cancel(self, reason: str = None) -> bool:
+        """
+        取消，并执行已注册的回调
+
+        Args:
+            reason: 取消原因，用于日志
+
+        Returns:
+            bool: 本次调用是否执行了取消（已取消过时返回False）
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        LoggerManager().get_logger().debug(f"取消当前回复: {reason}")
+        for callback in callbacks:
+            self._run(callback)
+        return True
+
+    def add_callback(self, callback) -> None:
+        """
+        注册取消时执行的回调，已取消时立即执行
+
+        Args:
+            callback: 无参数的可调用对象
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        self._run(callback)
+
+    def remove_callback(self, callback) -> None:
+        """
+        移除回调（对应的操作已正常结束时调用）
+
+        Args:
+            callback: 之前注册的回调
+        """
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        等待取消
+
+        Args:
+            timeout: 超时时间(秒)
+
+        Returns:
+            bool: 是否已取消
+        """
+        return self._event.wait(timeout)
+
+    @staticmethod
+    def _run(callback) -> None:
+        try:
+            callback()
+        except Exception as e:
+            LoggerManager().get_logger().warning(f"取消回调执行失败: {e}")
+
+
+def close_connection(response) -> None:
+    """
+    关闭流式响应的连接
+    另一个线程可能正阻塞在读取上，单纯 close() 要等到下一块数据到达才会返回，
+    因此先 shutdown 底层 socket 使读取立即结束
+    支持 requests 的 Response 与 openai 的 Stream（httpx）
+
+    获取socket依赖库的内部结构，版本变化后可能失效，此时退化为普通 close()（读取线程要等下一块数据才会结束），
+    并输出一条debug日志：
+    - requests/urllib3: response.raw._fp.fp.raw._sock 是私有属性，在 requests 2.34 + urllib3 2.8 上验证
+    - httpx: response.extensions["network_stream"] 是httpx文档中的响应扩展，
+      get_extra_info("socket") 由 httpcore 1.x 提供，按 openai 1.x 的 Stream.response 访问
+
+    Args:
+        response: 流式响应对象
+    """
+    sock = None
+    try:
+        # requests / urllib3
+        sock = response.raw._fp.fp.raw._sock
+    except AttributeError:
+        try:
+            # openai Stream -> httpx.Response -> httpcore 网络流
+            stream = response.response.extensions["network_stream"]
+            sock = stream.get_extra_info("socket")
+        except (AttributeError, KeyError, TypeError):
+            pass
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    else:
+        LoggerManager().get_logger(__name__).debug(
+            "close_connection: 未找到 %s 的底层socket，只能关闭响应，读取线程可能要等到下一块数据才结束",
+            type(response).__name__)
+    response.close()
@@ -41,9 +41,10 @@ class STTThread(QThread):
     text_recognized = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, stt_service):
+    def __init__(self, stt_service, chat_service=None):
         super().__init__()
         self.stt_service = stt_service
+        self.chat_service = chat_service  # 用于判断全双工对话是否占用麦克风
         self.is_running = True
     
     def run(self):
@@ -56,13 +57,12 @@ class STTThread(QThread):
         
         async def run_recognition():
             try:
-                # 初始化STT服务
+                # 初始化STT服务（已初始化时直接返回）
                 if not await self.stt_service.initialize_async():
                     self.error_occurred.emit("无法初始化语音识别服务")
                     return
                 
-                # 设置回调
-                self.stt_service.segment_callbacks = []
+                # 设置回调（只添加自己的回调，不影响其他使用者如全双工对话）
                 self.stt_service.add_segment_callback(on_segment_recognized)
                 
                 # 开始识别
@@ -77,12 +77,14 @@ class STTThread(QThread):
             except Exception as e:
                 self.error_occurred.emit(f"语音识别过程中出错: {str(e)}")
             finally:
-                # 确保服务正确关闭
+                self.stt_service.remove_segment_callback(on_segment_recognized)
+                # 只暂停采集，识别会话与本地服务器保持运行，下次开启语音输入时立即恢复
+                # 期间开始了全双工对话时麦克风归对话使用，不暂停
                 try:
-                    await self.stt_service.stop_recognition_async()
-                    await self.stt_service.shutdown_async()
+                    if self.chat_service is None or not self.chat_service.is_duplex_running():
+                        self.stt_service.pause_recognition()
                 except Exception as e:
-                    self.error_occurred.emit(f"关闭语音识别服务时出错: {str(e)}")
+                    self.error_occurred.emit(f"暂停语音识别时出错: {str(e)}")
         
         # 创建新的事件循环
         loop = asyncio.new_event_loop()
@@ -252,6 +254,10 @@ class ChatWindow(QMainWindow):
 
     def start_voice_input(self):
         """开始语音输入"""
+        if self.chat_service.is_duplex_running():
+            # 全双工对话占用麦克风，语音输入结束时的暂停识别会关闭对话的麦克风
+            QMessageBox.information(self, "语音输入", "语音对话进行中，请先结束语音对话")
+            return
         stt_service = self.service_manager.get_service("stt_service")
         
         # 设置按钮为激活状态
@@ -265,7 +271,7 @@ class ChatWindow(QMainWindow):
         self.is_voice_active = True
         
         # 创建并启动语音识别线程
-        self.speech_thread = STTThread(stt_service)
+        self.speech_thread = STTThread(stt_service, self.chat_service)
         self.speech_thread.text_recognized.connect(self.on_speech_recognized)
         self.speech_thread.error_occurred.connect(self.on_speech_error)
         self.speech_thread.start()
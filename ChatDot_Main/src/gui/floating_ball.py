@@ -266,6 +266,13 @@ class FloatingBall(QWidget):
         stt_action.triggered.connect(self.toggle_stt)
         voice_menu.addAction(stt_action)
         
+        # 全双工语音对话开关
+        chat_service = self.service_manager.get_service("chat_service")
+        duplex_running = chat_service.is_duplex_running()
+        duplex_action = QAction("语音对话 (进行中)" if duplex_running else "语音对话 (未开始)", self)
+        duplex_action.triggered.connect(self.toggle_duplex)
+        voice_menu.addAction(duplex_action)
+        
         context_menu.addSeparator()
         setting_action = QAction("设置", self)
         setting_action.triggered.connect(self.openSettingWindow)
@@ -298,6 +305,20 @@ class FloatingBall(QWidget):
         except Exception as e:
             QMessageBox.warning(self, "操作失败", f"切换STT状态失败: {str(e)}")
 
+    def toggle_duplex(self):
+        """开始/结束全双工语音对话"""
+        try:
+            chat_service = self.service_manager.get_service("chat_service")
+            if chat_service.is_duplex_running():
+                chat_service.stop_duplex()
+                QMessageBox.information(self, "语音对话", "已结束语音对话")
+            elif chat_service.start_duplex() is not None:
+                QMessageBox.information(self, "语音对话", "语音对话已开始，直接说话即可，回复时可随时插话")
+            else:
+                QMessageBox.warning(self, "语音对话", "启动语音对话失败，请检查STT设置")
+        except Exception as e:
+            QMessageBox.warning(self, "操作失败", f"切换语音对话失败: {str(e)}")
+
     def openSettingWindow(self):
         setting_window = SettingWindow(self)
         # 设置为非模态窗口
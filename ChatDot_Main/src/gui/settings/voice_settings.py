@@ -402,6 +402,12 @@ class VoiceSettingsPage(QWidget):
         if not self.stt_enabled.isChecked():
             QMessageBox.warning(self, "STT未启用", "请先启用STT功能")
             return
+        
+        chat_service = self.service_manager.get_service("chat_service")
+        if chat_service.is_duplex_running():
+            # 测试结束时会停止识别，全双工对话的麦克风也会被关闭
+            QMessageBox.warning(self, "STT测试", "语音对话进行中，请先结束语音对话再测试")
+            return
             
         from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton
         import asyncio
@@ -424,6 +430,9 @@ class VoiceSettingsPage(QWidget):
         
         # STT测试函数
         async def run_stt_test():
+            def on_speech_recognized(text):
+                result_label.setText(f"识别结果: {text}")
+            
             try:
                 # 初始化STT
                 if not await self.stt_service.initialize_async():
@@ -432,11 +441,7 @@ class VoiceSettingsPage(QWidget):
                 
                 status_label.setText("请开始说话...")
                 
-                # 添加回调
-                def on_speech_recognized(text):
-                    result_label.setText(f"识别结果: {text}")
-                
-                self.stt_service.segment_callbacks = []  # 清除现有回调
+                # 添加回调（只添加自己的回调，不影响其他使用者）
                 self.stt_service.add_segment_callback(on_speech_recognized)
                 
                 # 启动识别
@@ -451,6 +456,7 @@ class VoiceSettingsPage(QWidget):
             except Exception as e:
                 status_label.setText(f"测试过程中出错: {str(e)}")
             finally:
+                self.stt_service.remove_segment_callback(on_speech_recognized)
                 # 停止识别并关闭
                 try:
                     await self.stt_service.stop_recognition_async()